@@ -0,0 +1,180 @@
+"""Compare estimated plan costs of the Daily/Monthly hot queries with and without the 0004 indexes.
+
+Run against a scratch copy of the MIS database (created from MISDB.sql), never production:
+
+    BENCH_DATABASE_URL=mssql+pyodbc://... python -m benchmarks.index_plan_costs --seed --years 5
+
+--seed adds synthetic Daily rows (one per active source name per day, times --per-day) and
+Monthly rows for the given number of years; --cleanup removes them again afterwards.
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import date
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.migrations import MIGRATIONS_DIR, split_batches, INDEX_PATTERN  # noqa: E402
+
+INDEX_MIGRATION = os.path.join(MIGRATIONS_DIR, '0004_daily_monthly_indexes.sql')
+SEED_COMMENT = 'benchmark-seed'
+COST_PATTERN = re.compile(r'StatementSubTreeCost="([0-9.Ee+-]+)"')
+
+SEED_DAILY = """
+WITH days AS (
+    SELECT TOP (DATEDIFF(DAY, :start, :end)) DATEADD(DAY, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) - 1, :start) AS d
+    FROM sys.all_objects a CROSS JOIN sys.all_objects b
+), copies AS (
+    SELECT TOP (:perDay) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS n FROM sys.all_objects
+)
+INSERT INTO Daily (sourceType, sourceName, status, [date], productionVolume, operationHours,
+                   serviceInterruption, totalHoursServiceInterruption, electricityConsumption,
+                   comment, isActive, encodedAt, branchId)
+SELECT sn.sourceTypeId, sn.id, 1 + ABS(CHECKSUM(NEWID())) % 3, days.d,
+       ABS(CHECKSUM(NEWID())) % 5000, 24, ABS(CHECKSUM(NEWID())) % 3, ABS(CHECKSUM(NEWID())) % 6,
+       ABS(CHECKSUM(NEWID())) % 900, :comment, 1, days.d, sn.branchId
+FROM sourceName sn CROSS JOIN days CROSS JOIN copies
+"""
+
+SEED_MONTHLY = """
+WITH months AS (
+    SELECT TOP (:months) DATEADD(MONTH, ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) - 1, :start) AS m
+    FROM sys.all_objects
+)
+INSERT INTO Monthly (branchId, sourceType, sourceName, status, month, year, comment, isActive)
+SELECT sn.branchId, sn.sourceTypeId, sn.id, 1 + ABS(CHECKSUM(NEWID())) % 3,
+       DATENAME(MONTH, months.m), YEAR(months.m), :comment, 1
+FROM sourceName sn CROSS JOIN months
+"""
+
+# Stand-ins for the stored procedures' filters, with literal values so SHOWPLAN can cost them
+QUERIES = {
+    'daily sums (branch, type, month)': """
+        SELECT SUM(productionVolume), SUM(operationHours), SUM(serviceInterruption),
+               SUM(totalHoursServiceInterruption), SUM(electricityConsumption)
+        FROM Daily WHERE branchId = {branch} AND sourceType = {source_type}
+            AND [date] >= '{month_start}' AND [date] < DATEADD(MONTH, 1, '{month_start}')""",
+    'daily completion (source name, month)': """
+        SELECT DISTINCT DAY([date]) FROM Daily
+        WHERE sourceName = {source_name} AND status = 1
+            AND [date] >= '{month_start}' AND [date] < DATEADD(MONTH, 1, '{month_start}')""",
+    'daily report page (date, id)': """
+        SELECT TOP 101 id, [date], branchId, status FROM Daily ORDER BY [date] DESC, id DESC""",
+    'pending daily per branch': """
+        SELECT branchId, COUNT(*) FROM Daily WHERE status = 2 GROUP BY branchId""",
+    'monthly lookup (branch, source, period)': """
+        SELECT id, status FROM Monthly
+        WHERE branchId = {branch} AND sourceName = {source_name} AND [year] = {year} AND [month] = '{month_name}'""",
+    'pending monthly per branch': """
+        SELECT branchId, COUNT(*) FROM Monthly WHERE status = 2 GROUP BY branchId""",
+}
+
+
+def plan_cost(connection, sql):
+    cursor = connection.cursor()
+    cursor.execute('SET SHOWPLAN_XML ON')
+    try:
+        cursor.execute(sql)
+        plan = cursor.fetchone()[0]
+    finally:
+        cursor.execute('SET SHOWPLAN_XML OFF')
+    return sum(float(cost) for cost in COST_PATTERN.findall(plan))
+
+def plan_costs(engine, params):
+    connection = engine.raw_connection()
+    try:
+        return {name: plan_cost(connection, sql.format(**params)) for name, sql in QUERIES.items()}
+    finally:
+        connection.close()
+
+def drop_indexes(engine):
+    with open(INDEX_MIGRATION, encoding='utf-8') as f:
+        indexes = INDEX_PATTERN.findall(f.read())
+    with engine.begin() as connection:
+        for name, table in indexes:
+            connection.exec_driver_sql(
+                f"IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{name}' AND object_id = OBJECT_ID('dbo.{table}')) "
+                f"DROP INDEX {name} ON dbo.{table}"
+            )
+
+def create_indexes(engine):
+    with open(INDEX_MIGRATION, encoding='utf-8') as f:
+        batches = split_batches(f.read())
+    with engine.begin() as connection:
+        for batch in batches:
+            connection.exec_driver_sql(batch)
+
+def update_statistics(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql('UPDATE STATISTICS dbo.Daily WITH FULLSCAN')
+        connection.exec_driver_sql('UPDATE STATISTICS dbo.Monthly WITH FULLSCAN')
+
+def seed(engine, years, per_day):
+    start = date(date.today().year - years, 1, 1)
+    end = date(date.today().year, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(text(SEED_DAILY), {'start': start, 'end': end, 'perDay': per_day, 'comment': SEED_COMMENT})
+        connection.execute(text(SEED_MONTHLY), {'start': start, 'months': years * 12, 'comment': SEED_COMMENT})
+
+def cleanup(engine):
+    with engine.begin() as connection:
+        connection.execute(text('DELETE FROM Daily WHERE comment = :comment'), {'comment': SEED_COMMENT})
+        connection.execute(text('DELETE FROM Monthly WHERE comment = :comment'), {'comment': SEED_COMMENT})
+
+def sample_params(engine):
+    with engine.connect() as connection:
+        row = connection.execute(text(
+            'SELECT TOP 1 branchId, sourceType, sourceName, [date] FROM Daily ORDER BY [date] DESC'
+        )).fetchone()
+        counts = connection.execute(text(
+            'SELECT (SELECT COUNT(*) FROM Daily), (SELECT COUNT(*) FROM Monthly)'
+        )).fetchone()
+    if not row:
+        raise SystemExit('Daily is empty; run with --seed first')
+    month_start = row.date.replace(day=1)
+    return {
+        'branch': row.branchId, 'source_type': row.sourceType, 'source_name': row.sourceName,
+        'month_start': month_start.isoformat(), 'year': month_start.year,
+        'month_name': month_start.strftime('%B'),
+    }, counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', action='store_true', help='insert synthetic Daily/Monthly rows first')
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--per-day', type=int, default=1, help='daily rows per source name per day')
+    parser.add_argument('--cleanup', action='store_true', help='delete the synthetic rows afterwards')
+    args = parser.parse_args()
+
+    url = os.getenv('BENCH_DATABASE_URL')
+    if not url:
+        raise SystemExit('Set BENCH_DATABASE_URL to a scratch MIS database')
+    engine = create_engine(url)
+
+    try:
+        if args.seed:
+            seed(engine, args.years, args.per_day)
+        params, (daily_rows, monthly_rows) = sample_params(engine)
+        print(f'Daily rows: {daily_rows:,}  Monthly rows: {monthly_rows:,}')
+
+        drop_indexes(engine)
+        update_statistics(engine)
+        before = plan_costs(engine, params)
+
+        create_indexes(engine)
+        update_statistics(engine)
+        after = plan_costs(engine, params)
+    finally:
+        if args.cleanup:
+            cleanup(engine)
+
+    width = max(len(name) for name in QUERIES)
+    print(f"{'query':<{width}}  {'before':>10}  {'after':>10}  {'ratio':>7}")
+    for name in QUERIES:
+        ratio = before[name] / after[name] if after[name] else float('inf')
+        print(f'{name:<{width}}  {before[name]:>10.4f}  {after[name]:>10.4f}  {ratio:>6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
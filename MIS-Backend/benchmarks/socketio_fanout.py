@@ -0,0 +1,143 @@
+"""Measure Socket.IO fan-out across several worker processes sharing the Redis message queue.
+
+Starts --workers server processes, connects --clients admin clients to each of them and
+publishes --events dailyDataChanged events from a separate write-only emitter, the same
+path a route on any worker takes. Every client must receive every event; the report gives
+delivery counts and end-to-end latency percentiles.
+
+Needs a reachable Redis and the Socket.IO client extras (pip install "python-socketio[client]"):
+
+    SOCKETIO_MESSAGE_QUEUE=redis://localhost:6379/1 python -m benchmarks.socketio_fanout --workers 4 --clients 50
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import jwt
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+EVENT = 'dailyDataChanged'
+ADMIN_ROOM = 'branch_all'
+
+
+def serve(port):
+    from main import create_app
+    from config import socketio
+    app = create_app()
+    socketio.run(app, host='127.0.0.1', port=port, allow_unsafe_werkzeug=True)
+
+def start_workers(args, env):
+    workers = []
+    for index in range(args.workers):
+        port = args.base_port + index
+        workers.append(subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.socketio_fanout', '--serve', str(port)],
+            cwd=BACKEND_DIR, env=env
+        ))
+    return workers
+
+def admin_token(secret, user_id):
+    now = datetime.utcnow()
+    return jwt.encode({'user_id': user_id, 'roleId': 1, 'branchId': None,
+                       'iat': now, 'exp': now + timedelta(hours=1)}, secret, algorithm='HS256')
+
+def connect_clients(args, secret, latencies, lock):
+    import socketio as socketio_client
+
+    clients = []
+    for worker in range(args.workers):
+        url = f'http://127.0.0.1:{args.base_port + worker}'
+        for index in range(args.clients):
+            client = socketio_client.Client(reconnection=False)
+
+            @client.on(EVENT)
+            def on_event(data, received=latencies):
+                latency = time.time() - data['changes']['sentAt']
+                with lock:
+                    received.append(latency)
+
+            client.connect(url, auth={'token': admin_token(secret, worker * args.clients + index + 1)},
+                           transports=['websocket'], wait_timeout=10)
+            clients.append(client)
+    return clients
+
+def wait_for_port(port, timeout=30):
+    import socket
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f'worker on port {port} did not start')
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--clients', type=int, default=25, help='clients per worker')
+    parser.add_argument('--events', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=0.01, help='seconds between events')
+    parser.add_argument('--base-port', type=int, default=5100)
+    parser.add_argument('--max-p95', type=float, default=0.5, help='fail when p95 latency exceeds this')
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    message_queue = os.getenv('SOCKETIO_MESSAGE_QUEUE', 'redis://localhost:6379/1')
+    channel = os.getenv('SOCKETIO_CHANNEL', 'mis-socketio')
+    secret = os.getenv('JWS_SECRET_KEY', 'default-secret-key')
+    env = dict(os.environ, REDIS_AVAILABLE='true', AUTH_TRUST_CLAIMS='true',
+               SOCKETIO_MESSAGE_QUEUE=message_queue, SOCKETIO_CHANNEL=channel,
+               DATABASE_URL=os.getenv('DATABASE_URL', 'sqlite://'))
+
+    from flask_socketio import SocketIO
+    emitter = SocketIO(message_queue=message_queue, channel=channel)
+
+    latencies, lock = [], threading.Lock()
+    workers = start_workers(args, env)
+    clients = []
+    try:
+        for index in range(args.workers):
+            wait_for_port(args.base_port + index)
+        clients = connect_clients(args, secret, latencies, lock)
+
+        for index in range(args.events):
+            emitter.emit(EVENT, {'recordType': 'daily', 'action': 'loadTest', 'recordId': index,
+                                 'changes': {'sentAt': time.time()}}, to=ADMIN_ROOM)
+            time.sleep(args.interval)
+
+        expected = args.events * len(clients)
+        deadline = time.time() + 10
+        while len(latencies) < expected and time.time() < deadline:
+            time.sleep(0.1)
+    finally:
+        for client in clients:
+            client.disconnect()
+        for worker in workers:
+            worker.terminate()
+
+    print(f'{args.workers} workers x {args.clients} clients, {args.events} events')
+    print(f'delivered: {len(latencies):,} of {expected:,}')
+    if latencies:
+        print('latency p50 {:.1f} ms  p95 {:.1f} ms  p99 {:.1f} ms  max {:.1f} ms'.format(
+            *(1000 * percentile(latencies, q) for q in (0.5, 0.95, 0.99)), 1000 * max(latencies)))
+    if len(latencies) < expected or (latencies and percentile(latencies, 0.95) > args.max_p95):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
 from flask_caching import Cache
+from flask_socketio import SocketIO
+from utils.pool import engine_options
 
 load_dotenv()
 
@@ -12,6 +14,54 @@ class Config:
     #Database Config
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool, sized for the morning encoding bursts
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    # Worker threads for concurrent stored procedure calls; keep below pool size + overflow
+    ASYNC_DB_WORKERS = int(os.getenv('ASYNC_DB_WORKERS', 8))
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+                                               DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_POOL_TIMEOUT)
+    # Apply pending scripts from migrations/ when the app starts (SQL Server only)
+    RUN_MIGRATIONS = os.getenv('RUN_MIGRATIONS', 'false').lower() == 'true'
+
+    #Realtime
+    # Changes published within this many seconds go out as one summarized event per branch
+    SOCKETIO_COALESCE_WINDOW = float(os.getenv('SOCKETIO_COALESCE_WINDOW', 0.25))
+
+    #Authorization
+    # Trust roleId/branchId from verified tokens instead of loading the user on every request
+    AUTH_TRUST_CLAIMS = os.getenv('AUTH_TRUST_CLAIMS', 'false').lower() == 'true'
+
+    #Query tracking
+    # A statement shape run this many times in one request is flagged as a likely N+1
+    N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+    # Share of production requests whose query totals are logged; flagged requests always are
+    QUERY_LOG_SAMPLE_RATE = float(os.getenv('QUERY_LOG_SAMPLE_RATE', 0.01))
+
+    # Statements at least this slow (seconds) are kept in the slow query log
+    SLOW_QUERY_SECONDS = float(os.getenv('SLOW_QUERY_SECONDS', 1.0))
+    # Share of slow statements recorded, to keep the log cheap when everything is slow
+    SLOW_QUERY_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_SAMPLE_RATE', 1.0))
+    # Entries kept in memory for /api/admin/slow-queries
+    SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', 200))
+    # Also append entries to this rotating file when set
+    SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE')
+
+    #Metrics
+    # Bearer token Prometheus must send to scrape /metrics; unset leaves the endpoint open
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+    #Logging
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    # 'json' for one structured object per line, 'text' for plain lines while developing
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    # Share of high-frequency events (socket connects and the like) that are written
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 0.1))
+    # Records waiting for the writer thread; beyond this they are dropped rather than block a request
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
 
     #Flask Environment
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
@@ -30,11 +80,21 @@ if REDIS_AVAILABLE:
         'CACHE_REDIS_DB': 0,
         'CACHE_DEFAULT_TIMEOUT': 300
     }
+    # Socket.IO emits fan out through Redis pub/sub so every worker and host reaches its own clients
+    SOCKETIO_CONFIG = {
+        'message_queue': os.getenv('SOCKETIO_MESSAGE_QUEUE', 'redis://localhost:6379/1'),
+        'channel': os.getenv('SOCKETIO_CHANNEL', 'mis-socketio')
+    }
 else:
     CACHE_CONFIG = {
         'CACHE_TYPE': 'simple',  # Use simple in-memory cache for development
         'CACHE_DEFAULT_TIMEOUT': 300
     }
+    # Single process: emits are delivered in-process
+    SOCKETIO_CONFIG = {}
 
 # Create cache instance
-cache = Cache()
\ No newline at end of file
+cache = Cache()
+
+# Socket.IO server, bound to the app in create_app()
+socketio = SocketIO()
\ No newline at end of file
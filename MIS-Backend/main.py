@@ -1,6 +1,5 @@
 from flask import Flask
-from flask_socketio import SocketIO
-from config import cache, CACHE_CONFIG
+from config import cache, socketio, CACHE_CONFIG, SOCKETIO_CONFIG
 from flask_cors import CORS
 from config import Config
 from models.db import db
@@ -20,6 +19,15 @@ from routes.requiredFields import required_fields_bp
 from routes.approvalRoute import approval_bp
 from routes.monthlyRoutes import monthly_bp
 from routes.sourceForBranch import source_for_branch_bp
+from routes.adminRoutes import admin_bp
+from routes.metricsRoutes import metrics_bp
+import socket_events  # noqa: F401  registers the Socket.IO handlers
+from utils.migrations import apply_migrations, require_migrations
+from utils.pool import init_pool_metrics
+from utils.metrics import init_metrics
+from utils.queries import init_query_tracking
+from utils.log import init_logging
+from utils.auth import init_auth
 
 
 
@@ -28,10 +36,21 @@ def create_app():
     app = Flask(__name__)
     app.config.from_mapping(CACHE_CONFIG)
     app.config.from_object(Config)
+    init_logging(app)
 
     db.init_app(app)
+    init_pool_metrics(app)
+    init_metrics(app)
+    init_query_tracking(app)
     cache.init_app(app)
+    init_auth(app)
+    with app.app_context():
+        if app.config['RUN_MIGRATIONS']:
+            apply_migrations()
+        else:
+            require_migrations()
     CORS(app, resources={r"/api/*": {"origins": ["http://localhost:5173", "http://localhost:5174"]}})
+    socketio.init_app(app, cors_allowed_origins=["http://localhost:5173", "http://localhost:5174"], **SOCKETIO_CONFIG)
 
 
 
@@ -51,8 +70,10 @@ def create_app():
     app.register_blueprint(approval_bp)
     app.register_blueprint(monthly_bp)
     app.register_blueprint(source_for_branch_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(metrics_bp)
     return app
 
 if __name__ == '__main__':
     app = create_app()
-    app.run(debug=True)
+    socketio.run(app, debug=True)
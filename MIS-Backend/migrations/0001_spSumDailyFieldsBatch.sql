@@ -0,0 +1,48 @@
+-- Set-based daily sums for POST /api/daily-sums/batch
+-- Replaces one EXEC spSumDailyFields per batch item with a single call.
+-- @requests is a JSON array of {branchId, sourceTypeId, year, month} objects.
+-- One row is returned per distinct requested tuple; the sums are NULL when the
+-- tuple has no daily records, same as spSumDailyFields.
+
+CREATE OR ALTER PROCEDURE [dbo].[spSumDailyFieldsBatch]
+    @requests NVARCHAR(MAX)
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    WITH requested AS (
+        SELECT DISTINCT
+            branchId,
+            sourceTypeId,
+            [year],
+            [month],
+            DATEFROMPARTS([year], [month], 1) AS monthStart
+        FROM OPENJSON(@requests)
+        WITH (
+            branchId INT '$.branchId',
+            sourceTypeId INT '$.sourceTypeId',
+            [year] INT '$.year',
+            [month] INT '$.month'
+        )
+    )
+    SELECT
+        r.branchId,
+        r.sourceTypeId,
+        r.[year],
+        r.[month],
+        SUM(d.productionVolume) AS productionVolume,
+        SUM(d.operationHours) AS operationHours,
+        SUM(d.serviceInterruption) AS serviceInterruption,
+        SUM(d.totalHoursServiceInterruption) AS totalHoursServiceInterruption,
+        SUM(d.electricityConsumption) AS electricityConsumption
+    FROM requested r
+    LEFT JOIN Daily d
+        ON d.branchId = r.branchId
+        AND d.sourceType = r.sourceTypeId
+        AND d.[date] >= r.monthStart
+        AND d.[date] < DATEADD(MONTH, 1, r.monthStart)
+    GROUP BY r.branchId, r.sourceTypeId, r.[year], r.[month];
+END
+GO
+
+PRINT 'spSumDailyFieldsBatch stored procedure created successfully!';
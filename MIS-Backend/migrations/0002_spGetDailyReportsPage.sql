@@ -0,0 +1,76 @@
+-- Keyset-paginated daily report listing for GET /api/daily
+-- Rows are ordered newest first on (date, id). Pass the last row's date and id
+-- as @CursorDate/@CursorId to fetch the next page. Branch admins and encoders
+-- (roles 3 and 4) only ever see their own branch.
+-- With @CountOnly = 1 the procedure returns the filtered row count instead.
+
+CREATE OR ALTER PROCEDURE [dbo].[spGetDailyReportsPage]
+    @UserRoleId INT,
+    @UserBranchId INT = NULL,
+    @BranchId INT = NULL,
+    @SourceTypeId INT = NULL,
+    @SourceNameId INT = NULL,
+    @StatusId INT = NULL,
+    @StatusName VARCHAR(32) = NULL,
+    @DateFrom DATE = NULL,
+    @DateTo DATE = NULL,
+    @CursorDate DATE = NULL,
+    @CursorId INT = NULL,
+    @PageSize INT = 100,
+    @CountOnly BIT = 0
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    IF @UserRoleId IN (3, 4)
+        SET @BranchId = @UserBranchId;
+
+    IF @CountOnly = 1
+    BEGIN
+        SELECT COUNT(*) AS totalCount
+        FROM Daily d
+        LEFT JOIN Status s ON s.id = d.status
+        WHERE (@BranchId IS NULL OR d.branchId = @BranchId)
+            AND (@SourceTypeId IS NULL OR d.sourceType = @SourceTypeId)
+            AND (@SourceNameId IS NULL OR d.sourceName = @SourceNameId)
+            AND (@StatusId IS NULL OR d.status = @StatusId)
+            AND (@StatusName IS NULL OR s.statusName = @StatusName)
+            AND (@DateFrom IS NULL OR d.[date] >= @DateFrom)
+            AND (@DateTo IS NULL OR d.[date] <= @DateTo)
+        OPTION (RECOMPILE);
+        RETURN;
+    END
+
+    SELECT TOP (@PageSize)
+        d.*,
+        st.sourceType AS sourceTypeName,
+        sn.sourceName AS sourceNameName,
+        s.statusName,
+        u.userName,
+        b.branchName,
+        a.areaName
+    FROM Daily d
+    LEFT JOIN sourceType st ON st.id = d.sourceType
+    LEFT JOIN sourceName sn ON sn.id = d.sourceName
+    LEFT JOIN Status s ON s.id = d.status
+    LEFT JOIN [User] u ON u.id = d.byUser
+    LEFT JOIN Branch b ON b.id = d.branchId
+    LEFT JOIN Area a ON a.id = d.areaId
+    WHERE (@BranchId IS NULL OR d.branchId = @BranchId)
+        AND (@SourceTypeId IS NULL OR d.sourceType = @SourceTypeId)
+        AND (@SourceNameId IS NULL OR d.sourceName = @SourceNameId)
+        AND (@StatusId IS NULL OR d.status = @StatusId)
+        AND (@StatusName IS NULL OR s.statusName = @StatusName)
+        AND (@DateFrom IS NULL OR d.[date] >= @DateFrom)
+        AND (@DateTo IS NULL OR d.[date] <= @DateTo)
+        AND (
+            @CursorDate IS NULL
+            OR d.[date] < @CursorDate
+            OR (d.[date] = @CursorDate AND d.id < @CursorId)
+        )
+    ORDER BY d.[date] DESC, d.id DESC
+    OPTION (RECOMPILE);
+END
+GO
+
+PRINT 'spGetDailyReportsPage stored procedure created successfully!';
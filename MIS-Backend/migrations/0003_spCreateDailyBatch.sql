@@ -0,0 +1,68 @@
+-- Set-based daily inserts for POST /api/daily/bulk
+-- @rows is a JSON array of daily records that already passed validation, each
+-- carrying the rowIndex of its position in the request body. The branch comes
+-- from the record's source name, resolved by the API before the call.
+-- Returns one (rowIndex, id) pair per inserted record.
+
+CREATE OR ALTER PROCEDURE [dbo].[spCreateDailyBatch]
+    @rows NVARCHAR(MAX),
+    @byUser INT
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    -- MERGE rather than INSERT so OUTPUT can map each new id back to its rowIndex
+    MERGE INTO Daily AS target
+    USING (
+        SELECT *
+        FROM OPENJSON(@rows)
+        WITH (
+            rowIndex INT '$.rowIndex',
+            monthlyId INT '$.monthlyId',
+            sourceType INT '$.sourceType',
+            sourceName INT '$.sourceName',
+            [date] DATE '$.date',
+            productionVolume FLOAT '$.productionVolume',
+            operationHours FLOAT '$.operationHours',
+            serviceInterruption FLOAT '$.serviceInterruption',
+            totalHoursServiceInterruption FLOAT '$.totalHoursServiceInterruption',
+            electricityConsumption FLOAT '$.electricityConsumption',
+            VFDFrequency FLOAT '$.VFDFrequency',
+            spotFlow FLOAT '$.spotFlow',
+            spotPressure FLOAT '$.spotPressure',
+            timeSpotMeasurements FLOAT '$.timeSpotMeasurements',
+            lineVoltage1 FLOAT '$.lineVoltage1',
+            lineVoltage2 FLOAT '$.lineVoltage2',
+            lineVoltage3 FLOAT '$.lineVoltage3',
+            lineCurrent1 FLOAT '$.lineCurrent1',
+            lineCurrent2 FLOAT '$.lineCurrent2',
+            lineCurrent3 FLOAT '$.lineCurrent3',
+            comment VARCHAR(1024) '$.comment',
+            isActive BIT '$.isActive',
+            branchId INT '$.branchId',
+            areaId INT '$.areaId'
+        )
+    ) AS source
+    ON 1 = 0
+    WHEN NOT MATCHED THEN
+        INSERT (
+            monthlyId, sourceType, sourceName, status, byUser, [date],
+            productionVolume, operationHours, serviceInterruption, totalHoursServiceInterruption,
+            electricityConsumption, VFDFrequency, spotFlow, spotPressure, timeSpotMeasurements,
+            lineVoltage1, lineVoltage2, lineVoltage3, lineCurrent1, lineCurrent2, lineCurrent3,
+            comment, isActive, encodedAt, branchId, areaId
+        )
+        VALUES (
+            source.monthlyId, source.sourceType, source.sourceName, 2, @byUser, source.[date],
+            source.productionVolume, source.operationHours, source.serviceInterruption,
+            source.totalHoursServiceInterruption, source.electricityConsumption, source.VFDFrequency,
+            source.spotFlow, source.spotPressure, source.timeSpotMeasurements,
+            source.lineVoltage1, source.lineVoltage2, source.lineVoltage3,
+            source.lineCurrent1, source.lineCurrent2, source.lineCurrent3,
+            source.comment, ISNULL(source.isActive, 1), GETUTCDATE(), source.branchId, source.areaId
+        )
+    OUTPUT source.rowIndex, inserted.id;
+END
+GO
+
+PRINT 'spCreateDailyBatch stored procedure created successfully!';
@@ -0,0 +1,59 @@
+-- Covering and filtered indexes for the Daily/Monthly hot paths
+-- Daily and Monthly only have their identity primary keys, so the sums,
+-- completion checks, report listings and dashboard counts all scan the table.
+-- Every index is created only when missing, so the script can be re-applied.
+
+-- spSumDailyFields / spSumDailyFieldsBatch: branch + source type + month range, summing these columns
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Daily_Branch_SourceType_Date' AND object_id = OBJECT_ID('dbo.Daily'))
+    CREATE NONCLUSTERED INDEX IX_Daily_Branch_SourceType_Date
+        ON dbo.Daily (branchId, sourceType, [date])
+        INCLUDE (productionVolume, operationHours, serviceInterruption,
+                 totalHoursServiceInterruption, electricityConsumption, sourceName, status);
+GO
+
+-- spValidateDailyCompletion: which days of the month a source name has accepted records for
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Daily_SourceName_Date_Status' AND object_id = OBJECT_ID('dbo.Daily'))
+    CREATE NONCLUSTERED INDEX IX_Daily_SourceName_Date_Status
+        ON dbo.Daily (sourceName, [date], status)
+        INCLUDE (branchId);
+GO
+
+-- spGetAllDailyReports / spGetDailyReportsPage: newest first, keyset on (date, id)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Daily_Date_Id' AND object_id = OBJECT_ID('dbo.Daily'))
+    CREATE NONCLUSTERED INDEX IX_Daily_Date_Id
+        ON dbo.Daily ([date] DESC, id DESC)
+        INCLUDE (branchId, sourceType, sourceName, status);
+GO
+
+-- GetDashboardStats / approval counts: pending daily records per branch
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Daily_Pending' AND object_id = OBJECT_ID('dbo.Daily'))
+    CREATE NONCLUSTERED INDEX IX_Daily_Pending
+        ON dbo.Daily (branchId, [date])
+        INCLUDE (sourceType, sourceName)
+        WHERE status = 2;
+GO
+
+-- Active records only, the common case for encoder views
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Daily_Active_Branch_SourceName' AND object_id = OBJECT_ID('dbo.Daily'))
+    CREATE NONCLUSTERED INDEX IX_Daily_Active_Branch_SourceName
+        ON dbo.Daily (branchId, sourceName, [date])
+        INCLUDE (status)
+        WHERE isActive = 1;
+GO
+
+-- Monthly lookups by branch, source name and period (duplicate checks, filtered listings)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Monthly_Branch_SourceName_Year_Month' AND object_id = OBJECT_ID('dbo.Monthly'))
+    CREATE NONCLUSTERED INDEX IX_Monthly_Branch_SourceName_Year_Month
+        ON dbo.Monthly (branchId, sourceName, [year], [month])
+        INCLUDE (sourceType, status);
+GO
+
+-- GetDashboardStats / approval counts: pending monthly records per branch
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Monthly_Pending' AND object_id = OBJECT_ID('dbo.Monthly'))
+    CREATE NONCLUSTERED INDEX IX_Monthly_Pending
+        ON dbo.Monthly (branchId, [year], [month])
+        INCLUDE (sourceType, sourceName)
+        WHERE status = 2;
+GO
+
+PRINT 'Daily/Monthly indexes created successfully!';
@@ -0,0 +1,159 @@
+-- Per (branch, source type, source name, month) rollup of Daily
+-- Holds the running sums the monthly form needs and the number of distinct
+-- days with an accepted daily record, so sums and completion checks read one
+-- row instead of re-aggregating the month. The API refreshes the affected row
+-- in the same transaction whenever a daily record is created, updated or
+-- approved.
+
+IF OBJECT_ID('dbo.DailyMonthlyRollup', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.DailyMonthlyRollup (
+        branchId INT NOT NULL,
+        sourceType INT NOT NULL,
+        sourceName INT NOT NULL,
+        [year] INT NOT NULL,
+        [month] INT NOT NULL,
+        productionVolume FLOAT NULL,
+        operationHours FLOAT NULL,
+        serviceInterruption FLOAT NULL,
+        totalHoursServiceInterruption FLOAT NULL,
+        electricityConsumption FLOAT NULL,
+        dailyCount INT NOT NULL DEFAULT 0,
+        acceptedDays INT NOT NULL DEFAULT 0,
+        updatedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+        CONSTRAINT PK_DailyMonthlyRollup PRIMARY KEY (branchId, sourceType, sourceName, [year], [month])
+    );
+
+    -- Backfill from the existing history
+    INSERT INTO dbo.DailyMonthlyRollup (
+        branchId, sourceType, sourceName, [year], [month],
+        productionVolume, operationHours, serviceInterruption, totalHoursServiceInterruption,
+        electricityConsumption, dailyCount, acceptedDays
+    )
+    SELECT
+        d.branchId, d.sourceType, d.sourceName, YEAR(d.[date]), MONTH(d.[date]),
+        SUM(d.productionVolume), SUM(d.operationHours), SUM(d.serviceInterruption),
+        SUM(d.totalHoursServiceInterruption), SUM(d.electricityConsumption),
+        COUNT(*),
+        COUNT(DISTINCT CASE WHEN s.statusName = 'Accepted' THEN DAY(d.[date]) END)
+    FROM Daily d
+    LEFT JOIN Status s ON s.id = d.status
+    WHERE d.branchId IS NOT NULL AND d.sourceType IS NOT NULL
+        AND d.sourceName IS NOT NULL AND d.[date] IS NOT NULL
+    GROUP BY d.branchId, d.sourceType, d.sourceName, YEAR(d.[date]), MONTH(d.[date]);
+END
+GO
+
+-- Recompute the rollup rows for a JSON array of
+-- {branchId, sourceType, sourceName, year, month} keys from their Daily rows
+CREATE OR ALTER PROCEDURE [dbo].[spRefreshDailyMonthlyRollup]
+    @keys NVARCHAR(MAX)
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    WITH requested AS (
+        SELECT DISTINCT
+            branchId, sourceType, sourceName, [year], [month],
+            DATEFROMPARTS([year], [month], 1) AS monthStart
+        FROM OPENJSON(@keys)
+        WITH (
+            branchId INT '$.branchId',
+            sourceType INT '$.sourceType',
+            sourceName INT '$.sourceName',
+            [year] INT '$.year',
+            [month] INT '$.month'
+        )
+    ),
+    aggregated AS (
+        SELECT
+            r.branchId, r.sourceType, r.sourceName, r.[year], r.[month],
+            SUM(d.productionVolume) AS productionVolume,
+            SUM(d.operationHours) AS operationHours,
+            SUM(d.serviceInterruption) AS serviceInterruption,
+            SUM(d.totalHoursServiceInterruption) AS totalHoursServiceInterruption,
+            SUM(d.electricityConsumption) AS electricityConsumption,
+            COUNT(d.id) AS dailyCount,
+            COUNT(DISTINCT CASE WHEN s.statusName = 'Accepted' THEN DAY(d.[date]) END) AS acceptedDays
+        FROM requested r
+        LEFT JOIN Daily d
+            ON d.branchId = r.branchId
+            AND d.sourceType = r.sourceType
+            AND d.sourceName = r.sourceName
+            AND d.[date] >= r.monthStart
+            AND d.[date] < DATEADD(MONTH, 1, r.monthStart)
+        LEFT JOIN Status s ON s.id = d.status
+        GROUP BY r.branchId, r.sourceType, r.sourceName, r.[year], r.[month]
+    )
+    MERGE dbo.DailyMonthlyRollup AS target
+    USING aggregated AS source
+        ON target.branchId = source.branchId
+        AND target.sourceType = source.sourceType
+        AND target.sourceName = source.sourceName
+        AND target.[year] = source.[year]
+        AND target.[month] = source.[month]
+    WHEN MATCHED AND source.dailyCount = 0 THEN
+        DELETE
+    WHEN MATCHED THEN
+        UPDATE SET
+            productionVolume = source.productionVolume,
+            operationHours = source.operationHours,
+            serviceInterruption = source.serviceInterruption,
+            totalHoursServiceInterruption = source.totalHoursServiceInterruption,
+            electricityConsumption = source.electricityConsumption,
+            dailyCount = source.dailyCount,
+            acceptedDays = source.acceptedDays,
+            updatedAt = SYSUTCDATETIME()
+    WHEN NOT MATCHED AND source.dailyCount > 0 THEN
+        INSERT (
+            branchId, sourceType, sourceName, [year], [month],
+            productionVolume, operationHours, serviceInterruption, totalHoursServiceInterruption,
+            electricityConsumption, dailyCount, acceptedDays
+        )
+        VALUES (
+            source.branchId, source.sourceType, source.sourceName, source.[year], source.[month],
+            source.productionVolume, source.operationHours, source.serviceInterruption,
+            source.totalHoursServiceInterruption, source.electricityConsumption,
+            source.dailyCount, source.acceptedDays
+        );
+END
+GO
+
+-- Daily sums now read the rollup: one row per source name instead of every daily record
+CREATE OR ALTER PROCEDURE [dbo].[spSumDailyFieldsBatch]
+    @requests NVARCHAR(MAX)
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    WITH requested AS (
+        SELECT DISTINCT branchId, sourceTypeId, [year], [month]
+        FROM OPENJSON(@requests)
+        WITH (
+            branchId INT '$.branchId',
+            sourceTypeId INT '$.sourceTypeId',
+            [year] INT '$.year',
+            [month] INT '$.month'
+        )
+    )
+    SELECT
+        r.branchId,
+        r.sourceTypeId,
+        r.[year],
+        r.[month],
+        SUM(ru.productionVolume) AS productionVolume,
+        SUM(ru.operationHours) AS operationHours,
+        SUM(ru.serviceInterruption) AS serviceInterruption,
+        SUM(ru.totalHoursServiceInterruption) AS totalHoursServiceInterruption,
+        SUM(ru.electricityConsumption) AS electricityConsumption
+    FROM requested r
+    LEFT JOIN dbo.DailyMonthlyRollup ru
+        ON ru.branchId = r.branchId
+        AND ru.sourceType = r.sourceTypeId
+        AND ru.[year] = r.[year]
+        AND ru.[month] = r.[month]
+    GROUP BY r.branchId, r.sourceTypeId, r.[year], r.[month];
+END
+GO
+
+PRINT 'DailyMonthlyRollup table and procedures created successfully!';
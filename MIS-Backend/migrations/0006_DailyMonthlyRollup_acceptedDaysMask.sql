@@ -0,0 +1,104 @@
+-- Accepted-days bitmap on DailyMonthlyRollup
+-- Bit (day - 1) of acceptedDaysMask is set when that day of the month has an
+-- accepted daily record, so completion checks and the missing-days list are
+-- bit operations on one row. Day 31 is bit 30, which still fits a signed INT.
+
+IF COL_LENGTH('dbo.DailyMonthlyRollup', 'acceptedDaysMask') IS NULL
+    ALTER TABLE dbo.DailyMonthlyRollup ADD acceptedDaysMask INT NOT NULL
+        CONSTRAINT DF_DailyMonthlyRollup_acceptedDaysMask DEFAULT 0;
+GO
+
+-- Backfill the mask for the existing rollup rows
+UPDATE ru
+SET acceptedDaysMask = masks.acceptedDaysMask
+FROM dbo.DailyMonthlyRollup ru
+CROSS APPLY (
+    SELECT ISNULL(SUM(DISTINCT POWER(2, DAY(d.[date]) - 1)), 0) AS acceptedDaysMask
+    FROM Daily d
+    JOIN Status s ON s.id = d.status AND s.statusName = 'Accepted'
+    WHERE d.branchId = ru.branchId
+        AND d.sourceType = ru.sourceType
+        AND d.sourceName = ru.sourceName
+        AND d.[date] >= DATEFROMPARTS(ru.[year], ru.[month], 1)
+        AND d.[date] < DATEADD(MONTH, 1, DATEFROMPARTS(ru.[year], ru.[month], 1))
+) masks;
+GO
+
+-- Recompute the rollup rows for a JSON array of
+-- {branchId, sourceType, sourceName, year, month} keys from their Daily rows
+CREATE OR ALTER PROCEDURE [dbo].[spRefreshDailyMonthlyRollup]
+    @keys NVARCHAR(MAX)
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    WITH requested AS (
+        SELECT DISTINCT
+            branchId, sourceType, sourceName, [year], [month],
+            DATEFROMPARTS([year], [month], 1) AS monthStart
+        FROM OPENJSON(@keys)
+        WITH (
+            branchId INT '$.branchId',
+            sourceType INT '$.sourceType',
+            sourceName INT '$.sourceName',
+            [year] INT '$.year',
+            [month] INT '$.month'
+        )
+    ),
+    aggregated AS (
+        SELECT
+            r.branchId, r.sourceType, r.sourceName, r.[year], r.[month],
+            SUM(d.productionVolume) AS productionVolume,
+            SUM(d.operationHours) AS operationHours,
+            SUM(d.serviceInterruption) AS serviceInterruption,
+            SUM(d.totalHoursServiceInterruption) AS totalHoursServiceInterruption,
+            SUM(d.electricityConsumption) AS electricityConsumption,
+            COUNT(d.id) AS dailyCount,
+            COUNT(DISTINCT CASE WHEN s.statusName = 'Accepted' THEN DAY(d.[date]) END) AS acceptedDays,
+            ISNULL(SUM(DISTINCT CASE WHEN s.statusName = 'Accepted' THEN POWER(2, DAY(d.[date]) - 1) END), 0) AS acceptedDaysMask
+        FROM requested r
+        LEFT JOIN Daily d
+            ON d.branchId = r.branchId
+            AND d.sourceType = r.sourceType
+            AND d.sourceName = r.sourceName
+            AND d.[date] >= r.monthStart
+            AND d.[date] < DATEADD(MONTH, 1, r.monthStart)
+        LEFT JOIN Status s ON s.id = d.status
+        GROUP BY r.branchId, r.sourceType, r.sourceName, r.[year], r.[month]
+    )
+    MERGE dbo.DailyMonthlyRollup AS target
+    USING aggregated AS source
+        ON target.branchId = source.branchId
+        AND target.sourceType = source.sourceType
+        AND target.sourceName = source.sourceName
+        AND target.[year] = source.[year]
+        AND target.[month] = source.[month]
+    WHEN MATCHED AND source.dailyCount = 0 THEN
+        DELETE
+    WHEN MATCHED THEN
+        UPDATE SET
+            productionVolume = source.productionVolume,
+            operationHours = source.operationHours,
+            serviceInterruption = source.serviceInterruption,
+            totalHoursServiceInterruption = source.totalHoursServiceInterruption,
+            electricityConsumption = source.electricityConsumption,
+            dailyCount = source.dailyCount,
+            acceptedDays = source.acceptedDays,
+            acceptedDaysMask = source.acceptedDaysMask,
+            updatedAt = SYSUTCDATETIME()
+    WHEN NOT MATCHED AND source.dailyCount > 0 THEN
+        INSERT (
+            branchId, sourceType, sourceName, [year], [month],
+            productionVolume, operationHours, serviceInterruption, totalHoursServiceInterruption,
+            electricityConsumption, dailyCount, acceptedDays, acceptedDaysMask
+        )
+        VALUES (
+            source.branchId, source.sourceType, source.sourceName, source.[year], source.[month],
+            source.productionVolume, source.operationHours, source.serviceInterruption,
+            source.totalHoursServiceInterruption, source.electricityConsumption,
+            source.dailyCount, source.acceptedDays, source.acceptedDaysMask
+        );
+END
+GO
+
+PRINT 'acceptedDaysMask added to DailyMonthlyRollup successfully!';
@@ -0,0 +1,27 @@
+-- Dashboard stats and approval counts in one round trip for GET /api/dashboard/summary
+-- Wraps GetDashboardStats and GetApprovalCounts and returns their rows as a
+-- single (section, name, value) result set.
+
+CREATE OR ALTER PROCEDURE [dbo].[spGetDashboardSummary]
+    @UserRoleId INT,
+    @UserBranchId INT = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    DECLARE @stats TABLE (MetricName NVARCHAR(128), MetricValue FLOAT);
+    DECLARE @counts TABLE (ApprovalType NVARCHAR(128), [Count] FLOAT);
+
+    INSERT INTO @stats (MetricName, MetricValue)
+    EXEC GetDashboardStats @UserRoleId = @UserRoleId, @UserBranchId = @UserBranchId;
+
+    INSERT INTO @counts (ApprovalType, [Count])
+    EXEC GetApprovalCounts @UserRoleId = @UserRoleId, @UserBranchId = @UserBranchId;
+
+    SELECT 'stats' AS section, MetricName AS name, MetricValue AS value FROM @stats
+    UNION ALL
+    SELECT 'approvalCounts', ApprovalType, [Count] FROM @counts;
+END
+GO
+
+PRINT 'spGetDashboardSummary stored procedure created successfully!';
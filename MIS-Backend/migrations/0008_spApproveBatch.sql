@@ -0,0 +1,38 @@
+-- Set-based approvals for PUT /api/approval-data/bulk and PUT /api/approval-monthly-data/bulk
+-- @ids is a JSON array of record ids that the API already checked for existence and
+-- branch access; @status is a Status id resolved by the API. Every record gets the same
+-- status in a single UPDATE. Only the status changes: comment belongs to the encoder, and
+-- Daily and Monthly have no column for reviewer remarks.
+-- Returns the id of every record that was updated.
+
+CREATE OR ALTER PROCEDURE [dbo].[spApproveDailyBatch]
+    @ids NVARCHAR(MAX),
+    @status INT
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    UPDATE d
+    SET d.status = @status
+    OUTPUT inserted.id
+    FROM Daily d
+    INNER JOIN (SELECT DISTINCT CAST([value] AS INT) AS id FROM OPENJSON(@ids)) AS ids ON ids.id = d.id;
+END
+GO
+
+CREATE OR ALTER PROCEDURE [dbo].[spApproveMonthlyBatch]
+    @ids NVARCHAR(MAX),
+    @status INT
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    UPDATE m
+    SET m.status = @status
+    OUTPUT inserted.id
+    FROM Monthly m
+    INNER JOIN (SELECT DISTINCT CAST([value] AS INT) AS id FROM OPENJSON(@ids)) AS ids ON ids.id = m.id;
+END
+GO
+
+PRINT 'spApproveDailyBatch and spApproveMonthlyBatch stored procedures created successfully!';
@@ -0,0 +1,38 @@
+from .db import db
+
+class DailyMonthlyRollup(db.Model):
+    __tablename__ = 'DailyMonthlyRollup'
+
+    # Maintained by spRefreshDailyMonthlyRollup; the API never writes these rows directly
+    branchId = db.Column(db.Integer, db.ForeignKey('Branch.id'), primary_key=True)
+    sourceType = db.Column(db.Integer, db.ForeignKey('sourceType.id'), primary_key=True)
+    sourceName = db.Column(db.Integer, db.ForeignKey('sourceName.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    productionVolume = db.Column(db.Float)
+    operationHours = db.Column(db.Float)
+    serviceInterruption = db.Column(db.Float)
+    totalHoursServiceInterruption = db.Column(db.Float)
+    electricityConsumption = db.Column(db.Float)
+    dailyCount = db.Column(db.Integer, nullable=False, default=0)
+    acceptedDays = db.Column(db.Integer, nullable=False, default=0)
+    # Bit (day - 1) is set when that day has an accepted daily record
+    acceptedDaysMask = db.Column(db.Integer, nullable=False, default=0)
+    updatedAt = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'branchId': self.branchId,
+            'sourceType': self.sourceType,
+            'sourceName': self.sourceName,
+            'year': self.year,
+            'month': self.month,
+            'productionVolume': self.productionVolume,
+            'operationHours': self.operationHours,
+            'serviceInterruption': self.serviceInterruption,
+            'totalHoursServiceInterruption': self.totalHoursServiceInterruption,
+            'electricityConsumption': self.electricityConsumption,
+            'dailyCount': self.dailyCount,
+            'acceptedDays': self.acceptedDays,
+            'acceptedDaysMask': self.acceptedDaysMask
+        }
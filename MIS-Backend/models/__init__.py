@@ -11,4 +11,5 @@ from .Daily import Daily
 from .branchSourceName import BranchSourceName
 from .branchSource import BranchSource
 from .Branch import Branch
-from .Area import Area
\ No newline at end of file
+from .Area import Area
+from .DailyMonthlyRollup import DailyMonthlyRollup
\ No newline at end of file
@@ -0,0 +1,63 @@
+from flask import Blueprint, jsonify, request
+from utils.auth import token_required, BRANCH_ADMIN_ROLE
+from utils.pool import pool_stats
+from utils.procs import proc_stats
+from utils.queries import slow_query_log
+from utils.async_db import run_proc, gather_procs
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/api/admin/pool-stats', methods=['GET'])
+@token_required
+def get_pool_stats(current_user):
+    if current_user.roleId not in [1, 2]:
+        return jsonify({'message': 'Forbidden'}), 403
+    try:
+        return jsonify(pool_stats())
+    except Exception as e:
+        return jsonify({'message': f'Failed to get pool stats: {str(e)}'}), 500
+
+@admin_bp.route('/api/admin/proc-stats', methods=['GET'])
+@token_required
+def get_proc_stats(current_user):
+    """Calls, rows, error rate and latency histogram per stored procedure since startup"""
+    if current_user.roleId not in [1, 2]:
+        return jsonify({'message': 'Forbidden'}), 403
+    return jsonify(proc_stats())
+
+@admin_bp.route('/api/admin/slow-queries', methods=['GET'])
+@token_required
+def get_slow_queries(current_user):
+    """Most recent slow statements, newest first, with redacted parameters and the calling endpoint"""
+    if current_user.roleId not in [1, 2]:
+        return jsonify({'message': 'Forbidden'}), 403
+    return jsonify(slow_query_log.snapshot(request.args.get('limit', type=int)))
+
+@admin_bp.route('/api/admin/branch-dashboard', methods=['GET'])
+@token_required
+async def get_branch_dashboard(current_user):
+    """Dashboard stats and approval counts for every active branch, fetched concurrently"""
+    if current_user.roleId not in [1, 2]:
+        return jsonify({'message': 'Forbidden'}), 403
+    try:
+        branches = await run_proc('SELECT * FROM vwActiveBranches')
+        calls = []
+        for branch in branches:
+            # Each branch as its branch admin sees it
+            params = {'UserRoleId': BRANCH_ADMIN_ROLE, 'UserBranchId': branch['id']}
+            calls.append(('GetDashboardStats', params))
+            calls.append(('GetApprovalCounts', params))
+        results = await gather_procs(*calls)
+
+        output = []
+        for index, branch in enumerate(branches):
+            stats_rows, count_rows = results[2 * index], results[2 * index + 1]
+            output.append({
+                'branchId': branch['id'],
+                'branchName': branch.get('branchName'),
+                'stats': {row['MetricName']: row['MetricValue'] for row in stats_rows},
+                'approvalCounts': {row['ApprovalType']: row['Count'] for row in count_rows}
+            })
+        return jsonify(output)
+    except Exception as e:
+        return jsonify({'message': f'Failed to get branch dashboard: {str(e)}'}), 500
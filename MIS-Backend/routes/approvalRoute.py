@@ -1,3 +1,4 @@
+import logging
 from flask import Blueprint, request, jsonify
 from models.Daily import Daily
 from models.db import db
@@ -8,16 +9,22 @@ from models.sourceType import SourceType
 from models.sourceName import SourceName
 from models.Monthly import Monthly
 from models.User import User
-from utils.auth import token_required
-from routes.monthlyRoutes import sum_daily_fields
+from utils.auth import token_required, can_access_branch
+from routes.dailyRoutes import to_int
+from utils.cache_util import invalidate, invalidate_many, DAILY_APPROVED, MONTHLY_APPROVED, MONTHLY_UPDATED
+from utils.streaming import stream_format, stream_rows
+from utils.serializers import PLAIN_ROWS
+from utils.rollups import rollup_key, refresh_rollups
+from socket_events import notify_approval_status_change, notify_monthly_data_change
 from flask_cors import cross_origin
-from sqlalchemy import text
+from utils import procs
 import json
 from datetime import datetime
 
 
 
 approval_bp = Blueprint('approval', __name__)
+logger = logging.getLogger(__name__)
 
 @approval_bp.route('/api/approval-data/<int:daily_id>', methods=['PUT', 'OPTION'])
 @cross_origin(origins=["http://localhost:5173", "http://localhost:5174"])
@@ -26,47 +33,45 @@ def approve_data(daily_id):
         return '', 204
     try:
         data = request.get_json()
-        print("Received Data:", data)
         status = data.get('status')
         remarks = data.get('remarks')
 
-        # Use stored procedure with text()
-        db.session.execute(
-            text('EXEC spApproveDailyData :daily_id, :status, :remarks'),
-            {'daily_id': daily_id, 'status': status, 'remarks': remarks}
-        )
-
+        daily_record = Daily.query.get(daily_id)
 
+        # Use stored procedure
+        procs.call('spApproveDailyData', daily_id=daily_id, status=status, remarks=remarks)
+        if daily_record:
+            refresh_rollups([rollup_key(daily_record.branchId, daily_record.sourceType, daily_record.sourceName,
+                                        daily_record.date)])
 
         # Commit the transaction
         db.session.commit()
 
+        if daily_record:
+            invalidate(DAILY_APPROVED, branch_id=daily_record.branchId, source_type_id=daily_record.sourceType,
+                       source_name_id=daily_record.sourceName, record_date=daily_record.date)
+            notify_approval_status_change(daily_id, status, daily_record.branchId, 'daily')
+
 
 
         return jsonify({'message': 'Approval updated successfully'})
     except Exception as e:
         db.session.rollback()
-        print("Error in approve_data", e)
+        logger.exception('Error in approve_data')
         return jsonify({'message': f'failed to update approval: {str(e)}'}), 500
 
 @approval_bp.route('/api/approval-monthly-data', methods=['GET'])
 @cross_origin(origins=["http://localhost:5173", "http://localhost:5174"])
 def get_approval_monthly_data():
     try:
-        # Use stored procedure with text()
-        result = db.session.execute(text('EXEC spGetApprovalMonthlyData'))
-        items = result.fetchall()
-
-        # Convert to list of dictionaries - handle the conversion properly
-        monthly_data = []
-        for row in items:
-            # Convert row to dictionary using _mapping attribute
-            row_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
-            monthly_data.append(row_dict)
-
-        return jsonify(monthly_data)
+        # Use stored procedure
+        result = procs.call('spGetApprovalMonthlyData')
+        fmt = stream_format()
+        if fmt:
+            return stream_rows(result, fmt=fmt)
+        return jsonify(PLAIN_ROWS.fetch_all(result))
     except Exception as e:
-        print("Error in get_approval_monthly_data", e)
+        logger.exception('Error in get_approval_monthly_data')
         return jsonify({'message': f'failed to fetch approval monthly data: {str(e)}'}), 500
 
 @approval_bp.route('/api/approval-monthly-data/<int:monthly_id>', methods=['PUT', 'OPTIONS'])
@@ -80,43 +85,151 @@ def approve_monthly_data(monthly_id):
         remarks = data.get('remarks')
         comment = data.get('comment')
 
-        # Use stored procedure with text()
-        db.session.execute(
-            text('EXEC spApproveMonthlyData :monthly_id, :status, :remarks, :comment'),
-            {'monthly_id': monthly_id, 'status': status, 'remarks': remarks, 'comment': comment}
-        )
+        monthly_record = Monthly.query.get(monthly_id)
+
+        # Use stored procedure
+        procs.call('spApproveMonthlyData', monthly_id=monthly_id, status=status, remarks=remarks,
+                   comment=comment)
 
         # Commit the transaction
         db.session.commit()
 
+        if monthly_record:
+            invalidate(MONTHLY_APPROVED, branch_id=monthly_record.branchId)
+            notify_approval_status_change(monthly_id, status, monthly_record.branchId, 'monthly')
+
         return jsonify({'message': 'Monthly Approval updated successfully'})
     except Exception as e:
         db.session.rollback()
-        print("Error in approve_monthly_data", e)
+        logger.exception('Error in approve_monthly_data')
         return jsonify({'message': f'failed to update monthly approval: {str(e)}'}), 500
 
+APPROVAL_BULK_LIMIT = 1000
+
+def resolve_status(status):
+    """Status id for a status name ('Accepted') or id, as sent by the approval pages"""
+    if to_int(status) is not None:
+        found = Status.query.get(to_int(status))
+    else:
+        found = Status.query.filter_by(statusName=status).first()
+    return found.id if found else None
+
+def prepare_bulk_approval(current_user, model):
+    """Validate a bulk approval body: (status id, records to update, per-id results) or an error response"""
+    if current_user.roleId not in (1, 2, 3):
+        return None, (jsonify({'message': 'Unauthorized'}), 403)
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return None, (jsonify({'message': 'Expected a non-empty list of ids'}), 400)
+    if len(ids) > APPROVAL_BULK_LIMIT:
+        return None, (jsonify({'message': f'At most {APPROVAL_BULK_LIMIT} records can be approved at once'}), 400)
+    status_id = resolve_status(data.get('status'))
+    if status_id is None:
+        return None, (jsonify({'message': 'Invalid status'}), 400)
+
+    record_ids = [to_int(record_id) for record_id in ids]
+    records = {record.id: record for record in model.query.filter(model.id.in_(set(record_ids) - {None})).all()}
+    results, approved = [], {}
+    for raw_id, record_id in zip(ids, record_ids):
+        record = records.get(record_id)
+        if record_id is None:
+            # No normalised form to report, so echo what was sent
+            results.append({'id': raw_id, 'success': False, 'message': 'Invalid id'})
+        elif record is None:
+            results.append({'id': record_id, 'success': False, 'message': 'Record not found'})
+        elif not can_access_branch(current_user, record.branchId):
+            results.append({'id': record_id, 'success': False,
+                            'message': 'You can only approve records for your assigned branch'})
+        else:
+            results.append({'id': record_id, 'success': True})
+            approved[record_id] = record
+    params = {'status': status_id}
+    return (params, approved, results), None
+
+def bulk_approval_response(results, label):
+    updated_count = sum(1 for item in results if item['success'])
+    return jsonify({
+        'message': f'{updated_count} of {len(results)} {label} records updated',
+        'updated': updated_count,
+        'failed': len(results) - updated_count,
+        'results': results
+    }), 200 if updated_count else 400
+
+def mark_not_updated(results, updated_ids):
+    # Records deleted between the lookup and the UPDATE
+    for item in results:
+        if item['success'] and item['id'] not in updated_ids:
+            item.update(success=False, message='Record was not updated')
+
+@approval_bp.route('/api/approval-data/bulk', methods=['PUT'])
+@token_required
+def approve_data_bulk(current_user):
+    """Approve or reject many daily records in one set-based UPDATE, reporting the outcome per id"""
+    prepared, error = prepare_bulk_approval(current_user, Daily)
+    if error:
+        return error
+    params, approved, results = prepared
+    try:
+        if approved:
+            updated_ids = {row.id for row in procs.rows('spApproveDailyBatch', **params, ids=list(approved))}
+            refresh_rollups(rollup_key(record.branchId, record.sourceType, record.sourceName, record.date)
+                            for record in approved.values())
+            db.session.commit()
+            mark_not_updated(results, updated_ids)
+
+            invalidate_many(DAILY_APPROVED, [
+                {'branch_id': record.branchId, 'source_type_id': record.sourceType,
+                 'source_name_id': record.sourceName, 'record_date': record.date}
+                for record in approved.values() if record.id in updated_ids
+            ])
+            # The emitter coalesces these into one dailyDataChanged per branch
+            for record_id in updated_ids:
+                notify_approval_status_change(record_id, params['status'], approved[record_id].branchId, 'daily')
+
+        return bulk_approval_response(results, 'daily')
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Error in approve_data_bulk')
+        return jsonify({'message': f'failed to update approvals: {str(e)}'}), 500
+
+@approval_bp.route('/api/approval-monthly-data/bulk', methods=['PUT'])
+@token_required
+def approve_monthly_data_bulk(current_user):
+    """Approve or reject many monthly records in one set-based UPDATE, reporting the outcome per id"""
+    prepared, error = prepare_bulk_approval(current_user, Monthly)
+    if error:
+        return error
+    params, approved, results = prepared
+    try:
+        if approved:
+            updated_ids = {row.id for row in procs.rows('spApproveMonthlyBatch', **params, ids=list(approved))}
+            db.session.commit()
+            mark_not_updated(results, updated_ids)
+
+            invalidate_many(MONTHLY_APPROVED, [
+                {'branch_id': branch_id}
+                for branch_id in {approved[record_id].branchId for record_id in updated_ids}
+            ])
+            for record_id in updated_ids:
+                notify_approval_status_change(record_id, params['status'], approved[record_id].branchId, 'monthly')
+
+        return bulk_approval_response(results, 'monthly')
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Error in approve_monthly_data_bulk')
+        return jsonify({'message': f'failed to update monthly approvals: {str(e)}'}), 500
+
 @approval_bp.route('/api/encoder-monthly-data', methods=['GET'])
 @cross_origin(origins=["http://localhost:5173", "http://localhost:5174"])
 @token_required
 def get_encoder_monthly_data(current_user):
     try:
         # Use stored procedure with user's branch ID
-        result = db.session.execute(
-            text('EXEC spGetEncoderMonthlyData :branch_id'),
-            {'branch_id': current_user.branchId}
-        )
-        items = result.fetchall()
-
-        # Convert to list of dictionaries - handle the conversion properly
-        monthly_data = []
-        for row in items:
-            # Convert row to dictionary using _mapping attribute
-            row_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
-            monthly_data.append(row_dict)
-
-        return jsonify(monthly_data)
+        result = procs.call('spGetEncoderMonthlyData', branch_id=current_user.branchId)
+        return jsonify(PLAIN_ROWS.fetch_all(result))
     except Exception as e:
-        print("Error in get_encoder_monthly_data", e)
+        logger.exception('Error in get_encoder_monthly_data')
         return jsonify({'message': f'failed to fetch encoder monthly data: {str(e)}'}), 500
 
 @approval_bp.route('/api/monthly/<int:id>', methods=['GET'])
@@ -125,13 +238,8 @@ def get_encoder_monthly_data(current_user):
 def get_monthly(current_user, id):
     try:
         # Use stored procedure with user permissions
-        result = db.session.execute(
-            text('EXEC spGetMonthlyById :monthly_id, :user_id, :user_role_id, :user_branch_id'),
-            {'monthly_id': id, 'user_id': current_user.id, 'user_role_id': current_user.roleId,
-             'user_branch_id': current_user.branchId}
-        )
-
-        monthly_data = result.fetchone()
+        monthly_data = procs.first('spGetMonthlyById', monthly_id=id, user_id=current_user.id,
+                                   user_role_id=current_user.roleId, user_branch_id=current_user.branchId)
         if not monthly_data:
             return jsonify({'message': 'Record not found'}), 404
 
@@ -160,16 +268,20 @@ def update_monthly(current_user, id):
         # Convert data to JSON string for stored procedure
         data_json = json.dumps(data)
 
+        monthly_record = Monthly.query.get(id)
+
         # Use stored procedure
-        db.session.execute(
-            text('EXEC spUpdateMonthlyRecord :monthly_id, :user_id, :user_role_id, :user_branch_id, :data_json'),
-            {'monthly_id': id, 'user_id': current_user.id, 'user_role_id': current_user.roleId,
-             'user_branch_id': current_user.branchId, 'data_json': data_json}
-        )
+        procs.call('spUpdateMonthlyRecord', monthly_id=id, user_id=current_user.id,
+                   user_role_id=current_user.roleId, user_branch_id=current_user.branchId,
+                   data_json=data_json)
 
         # Commit the transaction
         db.session.commit()
 
+        if monthly_record:
+            invalidate(MONTHLY_UPDATED, branch_id=monthly_record.branchId)
+            notify_monthly_data_change(monthly_record.branchId, 'update', record_id=id)
+
         return jsonify({'message': 'Monthly record updated successfully'})
 
     except Exception as e:
@@ -193,13 +305,8 @@ def update_monthly(current_user, id):
 def get_monthly_by_id(current_user, id):
     try:
         # Use stored procedure with user permissions
-        result = db.session.execute(
-            text('EXEC spGetMonthlyByIdWithRoles :monthly_id, :user_id, :user_role_id, :user_branch_id'),
-            {'monthly_id': id, 'user_id': current_user.id, 'user_role_id': current_user.roleId,
-             'user_branch_id': current_user.branchId}
-        )
-
-        monthly_data = result.fetchone()
+        monthly_data = procs.first('spGetMonthlyByIdWithRoles', monthly_id=id, user_id=current_user.id,
+                                   user_role_id=current_user.roleId, user_branch_id=current_user.branchId)
         if not monthly_data:
             return jsonify({'message': 'Monthly record not found'}), 404
 
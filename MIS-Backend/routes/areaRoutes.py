@@ -1,10 +1,12 @@
-from flask import Blueprint, jsonify, current_app
+import logging
+from flask import Blueprint, jsonify
 from models.Area import Area
 from utils.auth import token_required
 from sqlalchemy import text
 from models.db import db
 
 area_bp = Blueprint('area', __name__)
+logger = logging.getLogger(__name__)
 
 @area_bp.route('/api/areas', methods=['GET'])
 @token_required
@@ -47,9 +49,7 @@ def test_areas():
             }), 404
 
     except Exception as e:
-        current_app.logger.error(f"Error in test_areas: {str(e)}")
-        import traceback
-        current_app.logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception('Error in test_areas')
         return jsonify({
             'status': 'error',
             'message': f'Error testing areas: {str(e)}'
@@ -1,10 +1,14 @@
+import logging
 from flask import Blueprint,request, jsonify,current_app
 from models import db, User
 import jwt
-from datetime import datetime,timedelta
+from datetime import datetime
 from sqlalchemy import text
+from utils import procs
+from utils.auth import TOKEN_LIFETIME
 
 auth_bp =Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
 
 @auth_bp.route('/api/auth/login', methods=['POST'])
 def login():
@@ -15,16 +19,10 @@ def login():
             return jsonify({'message': 'Missing username or password'}), 400
 
         # Use stored procedure for authentication
-        result = db.session.execute(
-            text('EXEC spAuthenticateUser :username, :password'),
-            {'username': data['username'], 'password': data['password']}
-        )
-
-        user_data = result.fetchone()
-        result.close()  # <-- This is important!
+        user_data = procs.first('spAuthenticateUser', username=data['username'], password=data['password'])
 
         if not user_data:
-            print("Invalid Credentials")
+            logger.info('Invalid credentials', extra={'userName': data['username']})
             return jsonify({'message': 'Invalid username or password'}), 401
 
         user_dict = dict(user_data._mapping) if hasattr(user_data, '_mapping') else dict(user_data)
@@ -44,7 +42,8 @@ def login():
             'user_id': user_dict['id'],
             'branchId': user_dict['branchId'],
             'roleId': user_dict['roleId'],
-            'exp': datetime.utcnow() + timedelta(hours=1)
+            'iat': datetime.utcnow(),
+            'exp': datetime.utcnow() + TOKEN_LIFETIME
         }, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
 
         return jsonify({
@@ -62,19 +61,20 @@ def login():
 
     except Exception as e:
         error_message = str(e)
-        print(f"Login error: {error_message}")
         if 'Invalid username or password' in error_message:
+            logger.info('Invalid credentials')
             return jsonify({'message': 'Invalid username or password'}), 401
         elif 'Account is inactive' in error_message:
+            logger.info('Login to inactive account')
             return jsonify({'message': 'Account is inactive'}), 401
         else:
+            logger.exception('Login error')
             return jsonify({'message': f'Login failed: {error_message}'}), 500
 
 @auth_bp.route('/api/auth/register', methods=['POST'])
 def register():
     try:
         data = request.get_json()
-        print("Received Data", data)
 
         # Validate required fields
         required_fields = ['userName', 'firstName', 'lastName', 'email', 'password', 'roleId']
@@ -90,42 +90,16 @@ def register():
         if branch_id in [None, '', 'null', 0, '0']:
             branch_id = None
 
-            # Print before calling the stored procedure
-            print("Calling spRegisterUser with:", {
-                'userName': data['userName'],
-                'firstName': data['firstName'],
-                'lastName': data['lastName'],
-                'email': data['email'],
-                'password': data['password'],
-                'roleId': data['roleId'],
-                'areaId': area_id,
-                'branchId': branch_id
-            })
-
         # Use stored procedure for registration
-        result = db.session.execute(
-            text(
-                'EXEC spRegisterUser :userName, :firstName, :lastName, :email, :password, :roleId, :areaId, :branchId'),
-            {
-                'userName': data['userName'],
-                'firstName': data['firstName'],
-                'lastName': data['lastName'],
-                'email': data['email'],
-                'password': data['password'],
-                'roleId': data['roleId'],
-                'areaId': area_id,
-                'branchId': branch_id
-            }
-        )
+        result = procs.call('spRegisterUser', userName=data['userName'], firstName=data['firstName'],
+                            lastName=data['lastName'], email=data['email'], password=data['password'],
+                            roleId=data['roleId'], areaId=area_id, branchId=branch_id)
 
-        # Print after calling the stored procedure
-        print("Stored procedure executed.")
-        print("Stored procedure executed, about to fetchone()")
         # Get the created user data
         user_data = result.fetchone()
-        print("Fetched user_data:", user_data)
         result.close()
         db.session.commit()
+        logger.info('User registered', extra={'userName': data['userName'], 'roleId': data['roleId']})
 
         if user_data:
             # Convert to dictionary
@@ -156,4 +130,5 @@ def register():
         elif 'Email already exists' in error_message:
             return jsonify({'message': 'Email already exists'}), 400
         else:
+            logger.exception('Registration error')
             return jsonify({'message': f'Failed to create user: {error_message}'}), 500
@@ -1,3 +1,4 @@
+import logging
 from flask import Blueprint, request, jsonify
 from models.Branch import Branch
 from models.branchSource import BranchSource
@@ -5,16 +6,20 @@ from models.branchSourceName import BranchSourceName
 from models.sourceName import SourceName
 from models.db import db
 from sqlalchemy import text
+from utils import procs
 from utils.auth import token_required
-from config import cache
+from utils.cache_util import (cached_view, invalidate, branch_details_key, branch_tag, BRANCH_LIST_TAG,
+                              BRANCH_CHANGED)
 
 
 
 branch_bp = Blueprint('branch', __name__)
+logger = logging.getLogger(__name__)
 
 @branch_bp.route('/api/branches', methods=['GET'])
 @token_required
-@cache.cached(timeout=300, key_prefix='branches_active')
+@cached_view(lambda current_user: 'branches_active', timeout=300,
+             tags=lambda current_user: [BRANCH_LIST_TAG])
 def get_all_branches(current_user):
     try:
         # Use the view instead of ORM
@@ -33,7 +38,8 @@ def get_all_branches(current_user):
 
 @branch_bp.route('/api/branches/inactive', methods=['GET'])
 @token_required
-@cache.cached(timeout=300, key_prefix='branches_inactive')
+@cached_view(lambda current_user: 'branches_inactive', timeout=300,
+             tags=lambda current_user: [BRANCH_LIST_TAG])
 def get_inactive_branches(current_user):
     try:
         # Use the view instead of ORM
@@ -58,31 +64,16 @@ def create_branch(current_user):
         data = request.get_json()
 
         # Use stored procedure for creating branch
-        result = db.session.execute(
-            text('EXEC spCreateBranch :areaId, :branchName, :isActive'),
-            {
-                'areaId': data['areaId'],
-                'branchName': data['branchName'],
-                'isActive': data.get('isActive', True)
-            }
-        )
-
-        # Get the created branch data
-        branch_data = result.fetchone()
+        branch_data = procs.first('spCreateBranch', areaId=data['areaId'], branchName=data['branchName'],
+                                  isActive=data.get('isActive', True))
         db.session.commit()
 
         if branch_data:
             # Convert to dictionary
             branch_dict = dict(branch_data._mapping) if hasattr(branch_data, '_mapping') else dict(branch_data)
-            
-            # Clear cache for simple cache (doesn't support delete_pattern)
-            try:
-                cache.delete_pattern('branches:*')
-                cache.delete_pattern('branch_details:*')
-            except AttributeError:
-                # For simple cache, clear all cache
-                cache.clear()
-                
+
+            invalidate(BRANCH_CHANGED, branch_id=branch_dict['id'])
+
             return jsonify(branch_dict['id']), 201
         else:
             return jsonify({'message': 'Failed to create branch'}), 500
@@ -101,7 +92,6 @@ def create_branch(current_user):
 def add_branch(current_user):
     try:
         data = request.json
-        print("Received Data", data)
         area_id = data['areaId']
         branch_name = data['branchName']
         source_type_ids = data['sourceTypeIds']
@@ -110,23 +100,12 @@ def add_branch(current_user):
         source_type_ids_string = ','.join(map(str, source_type_ids))
 
         # Use stored procedure for creating branch with sources
-        print(f"About to execute stored procedure with: areaId={area_id}, branchName={branch_name}, sourceTypeIds={source_type_ids_string}")
-        
-        result = db.session.execute(
-            text('EXEC spAddBranchWithSources :areaId, :branchName, :sourceTypeIds'),
-            {
-                'areaId': area_id,
-                'branchName': branch_name,
-                'sourceTypeIds': source_type_ids_string
-            }
-        )
+        result = procs.call('spAddBranchWithSources', areaId=area_id, branchName=branch_name,
+                            sourceTypeIds=source_type_ids_string)
 
-        print(f"Stored procedure executed. Result returns rows: {result.returns_rows}")
-        
         # Get the created branch ID
         if result.returns_rows:
             branch_data = result.fetchone()
-            print(f"Fetched branch data: {branch_data}")
             
             if branch_data:
                 # Convert to dictionary
@@ -135,14 +114,8 @@ def add_branch(current_user):
                 # Commit only after successful data retrieval
                 db.session.commit()
 
-                # Clear cache for simple cache (doesn't support delete_pattern)
-                try:
-                    cache.delete_pattern('branches:*')
-                    cache.delete_pattern('branch_details:*')
-                except AttributeError:
-                    # For simple cache, clear all cache
-                    cache.clear()
-                
+                invalidate(BRANCH_CHANGED, branch_id=branch_dict['branchId'])
+
                 return jsonify({'branchId': branch_dict['branchId']}), 201
             else:
                 # Don't commit if no data returned
@@ -150,7 +123,7 @@ def add_branch(current_user):
                 return jsonify({'message': 'Failed to create branch'}), 500
         else:
             # Stored procedure didn't return rows, try to get the branch ID manually
-            print("Stored procedure didn't return rows, trying to get branch ID manually")
+            logger.info("spAddBranchWithSources returned no rows; looking up the new branch id")
             db.session.commit()
             
             # Query for the newly created branch
@@ -163,14 +136,8 @@ def add_branch(current_user):
             )
             branch_row = branch_result.fetchone()
 
-            # Clear cache for simple cache (doesn't support delete_pattern)
-            try:
-                cache.delete_pattern('branches:*')
-                cache.delete_pattern('branch_details:*')
-            except AttributeError:
-                # For simple cache, clear all cache
-                cache.clear()
-            
+            invalidate(BRANCH_CHANGED, branch_id=branch_row[0] if branch_row else None)
+
             if branch_row:
                 return jsonify({'branchId': branch_row[0]}), 201
             else:
@@ -178,8 +145,7 @@ def add_branch(current_user):
 
     except Exception as e:
         db.session.rollback()
-        import traceback
-        print(traceback.format_exc())
+        logger.exception('Error in add_branch')
         error_message = str(e)
 
         if 'Branch name already exists in this area' in error_message:
@@ -189,32 +155,26 @@ def add_branch(current_user):
 
 @branch_bp.route('/api/branch/<int:branch_id>/details', methods=['GET'])
 @token_required
-@cache.memoize(timeout=300)
-def get_branch_details(branch_id):
+@cached_view(lambda current_user, branch_id: branch_details_key(branch_id), timeout=300,
+             tags=lambda current_user, branch_id: [branch_tag(branch_id)])
+def get_branch_details(current_user, branch_id):
     try:
         # Use stored procedure to get branch details
-        result = db.session.execute(
-            text('EXEC spGetBranchDetails :branchId'),
-            {'branchId': branch_id}
-        )
+        result = procs.result_sets('spGetBranchDetails', branchId=branch_id)
 
-        # Get all result sets
-        branch_data = result.fetchall()
+        # Branch rows (one per source type), then source names
+        branch_data = result[0] if result else []
 
         if not branch_data:
             return jsonify({'error': 'Branch not found'}), 404
 
-        # Get the next result set (source names)
-        result.nextset()
-        source_names_data = result.fetchall()
+        source_names_data = result[1] if len(result) > 1 else []
 
         # Process branch and source types data
         branch_info = None
         source_types = []
 
-        for row in branch_data:
-            row_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
-
+        for row_dict in branch_data:
             # Get branch info from first row
             if branch_info is None:
                 branch_info = {
@@ -233,8 +193,7 @@ def get_branch_details(branch_id):
 
         # Process source names data
         source_names = []
-        for row in source_names_data:
-            row_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
+        for row_dict in source_names_data:
             source_names.append({
                 'id': row_dict['sourceNameId'],
                 'name': row_dict['sourceName'],
@@ -261,21 +220,12 @@ def get_branch_details(branch_id):
 def toggle_branch_active(current_user, branch_id):
     try:
         # Use stored procedure to toggle branch status
-        db.session.execute(
-            text('EXEC spToggleBranchActive :branchId'),
-            {'branchId': branch_id}
-        )
+        procs.call('spToggleBranchActive', branchId=branch_id)
 
         # Commit the transaction
         db.session.commit()
 
-        # Clear cache for simple cache (doesn't support delete_pattern)
-        try:
-            cache.delete_pattern('branches:*')
-            cache.delete_pattern('branch_details:*')
-        except AttributeError:
-            # For simple cache, clear all cache
-            cache.clear()
+        invalidate(BRANCH_CHANGED, branch_id=branch_id)
 
         # Get the updated branch to return the new status
         result = db.session.execute(
@@ -3,7 +3,7 @@ from models.db import db
 from models.branchSource import BranchSource
 from models.sourceType import SourceType
 from models.Branch import Branch
-from sqlalchemy import text
+from utils import procs
 
 branch_source_bp = Blueprint('branch_source', __name__)
 
@@ -15,15 +15,8 @@ def create_branch_source():
     is_active = data.get('isActive', True)
 
     try:
-        result = db.session.execute(
-            text('EXEC spCreateBranchSource :branchId, :sourceTypeId, :isActive'),
-            {
-                'branchId': branch_id,
-                'sourceTypeId': source_type_id,
-                'isActive': is_active
-            }
-        )
-        branch_source = result.fetchone()
+        branch_source = procs.first('spCreateBranchSource', branchId=branch_id, sourceTypeId=source_type_id,
+                                    isActive=is_active)
         db.session.commit()
 
         if branch_source:
@@ -4,27 +4,18 @@ from models.Branch import Branch
 from models.branchSourceName import BranchSourceName
 from models.sourceName import SourceName
 from models.sourceType import SourceType
-from sqlalchemy import text
-from config import cache
+from utils import procs
+from utils.cache_util import (cached_view, invalidate, branch_source_name_links_key, branch_source_names_tags,
+                              SOURCE_CHANGED)
 
 branch_source_name_bp = Blueprint('branch_source_name', __name__)
 
-def invalidate_branch_source_cache(branch_id, source_type_id):
-    """Clear cache when branch source names change"""
-    # Invalidate the specific branch source names cache
-    cache.delete_memoized('get_branch_source_names', branch_id, source_type_id)
-    # Also invalidate source names cache from daily routes
-    cache.delete_memoized('get_all_source_names')
-
 @branch_source_name_bp.route('/api/branch/<int:branch_id>/source-names', methods=['GET'])
-@cache.memoize(timeout=600)
+@cached_view(lambda branch_id: branch_source_name_links_key(branch_id, request.args.get('sourceTypeId', type=int)),
+             timeout=600, tags=branch_source_names_tags)
 def get_branch_source_names(branch_id):
     source_type_id = request.args.get('sourceTypeId', type=int)
-    result = db.session.execute(
-        text('EXEC spGetBranchSourceNames :branchId, :sourceTypeId'),
-        {'branchId': branch_id, 'sourceTypeId': source_type_id}
-    )
-    rows = result.fetchall()
+    rows = procs.rows('spGetBranchSourceNames', branchId=branch_id, sourceTypeId=source_type_id)
     output = [
         {
             'id': row.sourceNameId,
@@ -46,20 +37,13 @@ def create_branch_source_name():
     is_active = data.get('isActive', True)
 
     try:
-        result = db.session.execute(
-            text('EXEC spCreateBranchSourceName :branchId, :sourceNameId, :isActive'),
-            {
-                'branchId': branch_id,
-                'sourceNameId': source_name_id,
-                'isActive': is_active
-            }
-        )
-        bsn = result.fetchone()
+        bsn = procs.first('spCreateBranchSourceName', branchId=branch_id, sourceNameId=source_name_id,
+                          isActive=is_active)
         db.session.commit()
 
         source_name = SourceName.query.get(source_name_id)
         if source_name:
-            invalidate_branch_source_cache(branch_id, source_name.sourceTypeId)
+            invalidate(SOURCE_CHANGED, branch_id=branch_id, source_type_id=source_name.sourceTypeId)
 
         if bsn:
             bsn_dict = dict(bsn._mapping) if hasattr(bsn, '_mapping') else dict(bsn)
@@ -1,52 +1,110 @@
+import base64
+import binascii
+import math
+from datetime import date
 from flask import Blueprint, jsonify, request
 from models.Daily import Daily
-from models.User import User
-from models.Branch import Branch
-from models.Area import Area
 from models.db import db
 from models.Status import Status
-from utils.auth import token_required
+from utils.auth import token_required, can_access_branch
 from models.sourceName import SourceName
 from models.sourceType import SourceType
 from models.requiredFields import RequiredFields
-from sqlalchemy import text
-from config import cache
-import pytz
+from utils import procs
+from utils.cache_util import cached_view, invalidate, invalidate_many, BRANCH_LIST_TAG, DAILY_CREATED, DAILY_UPDATED
+from utils.streaming import stream_format, stream_rows
+from utils.serializers import RowSerializer, to_manila_iso
+from utils.rollups import rollup_key, refresh_rollups
+from socket_events import notify_daily_data_change
 
 
 daily_bp = Blueprint('daily', __name__)
 
-def invalidate_daily_cache(user_id, role_id, branch_id):
-    """Clear cache when daily data changes"""
-    # Clear cache for simple cache (doesn't support delete_memoized with strings)
+DAILY_PAGE_SIZE = 100
+DAILY_MAX_PAGE_SIZE = 500
+# Any of these switches GET /api/daily from the legacy full list to a keyset page
+DAILY_PAGE_PARAMS = ('limit', 'cursor', 'branchId', 'sourceTypeId', 'sourceNameId',
+                     'status', 'dateFrom', 'dateTo', 'includeTotal')
+
+def encode_cursor(record_date, record_id):
+    # Daily.date is nullable; undated rows sort last and get an empty date
+    record_date = record_date.isoformat()[:10] if record_date else ''
+    return base64.urlsafe_b64encode(f'{record_date}|{record_id}'.encode()).decode()
+
+def decode_cursor(cursor):
+    """(date or None, id) of the last row on the previous page"""
+    record_date, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return (date.fromisoformat(record_date) if record_date else None), int(record_id)
+
+DAILY_ROWS = RowSerializer({'encodedAt': to_manila_iso})
+
+def daily_page_filters(current_user):
+    """Stored procedure parameters for the requested filters, or raise ValueError"""
+    args = request.args
+    status = args.get('status')
+    date_from, date_to = args.get('dateFrom'), args.get('dateTo')
+    return {
+        'userRoleId': current_user.roleId,
+        'userBranchId': current_user.branchId,
+        'branchId': int(args['branchId']) if args.get('branchId') else None,
+        'sourceTypeId': int(args['sourceTypeId']) if args.get('sourceTypeId') else None,
+        'sourceNameId': int(args['sourceNameId']) if args.get('sourceNameId') else None,
+        'statusId': int(status) if status and status.isdigit() else None,
+        'statusName': status if status and not status.isdigit() else None,
+        'dateFrom': date.fromisoformat(date_from) if date_from else None,
+        'dateTo': date.fromisoformat(date_to) if date_to else None,
+    }
+
+def get_daily_page(current_user):
+    """One keyset page of Daily rows, newest first, as {items, nextCursor[, total]}"""
     try:
-        cache.delete_memoized('get_all_source_names')
-        # Invalidate dashboard cache since daily data affects approval counts
-        cache.delete_memoized('dashboard_stats', user_id, role_id, branch_id)
-        cache.delete_memoized('approval_counts', user_id, role_id, branch_id)
-    except (TypeError, AttributeError):
-        # For simple cache, clear all cache
-        cache.clear()
+        filters = daily_page_filters(current_user)
+    except ValueError:
+        return jsonify({'message': 'Invalid filter parameters'}), 400
+    if filters['branchId'] and not can_access_branch(current_user, filters['branchId']):
+        return jsonify({'message': 'Unauthorized to access this branch'}), 403
+
+    try:
+        limit = int(request.args.get('limit', DAILY_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'message': 'Invalid limit'}), 400
+    limit = max(1, min(limit, DAILY_MAX_PAGE_SIZE))
+
+    cursor_date, cursor_id = None, None
+    if request.args.get('cursor'):
+        try:
+            cursor_date, cursor_id = decode_cursor(request.args['cursor'])
+        except (ValueError, TypeError, binascii.Error):
+            return jsonify({'message': 'Invalid cursor'}), 400
+
+    # Fetch one extra row to learn whether another page follows
+    rows = procs.rows('spGetDailyReportsPage', **filters, cursorDate=cursor_date, cursorId=cursor_id,
+                      pageSize=limit + 1, countOnly=0)
+
+    items = DAILY_ROWS.serialize(rows[0]._fields if rows else (), rows[:limit])
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]._mapping
+        next_cursor = encode_cursor(last['date'], last['id'])
+    response = {'items': items, 'nextCursor': next_cursor}
+
+    if request.args.get('includeTotal', '').lower() in ('1', 'true'):
+        total = procs.first('spGetDailyReportsPage', **filters, pageSize=0, countOnly=1)
+        response['total'] = total._mapping['totalCount'] if total else 0
+    return jsonify(response)
 
 @daily_bp.route('/api/daily', methods=['GET'])
 @token_required
 def get_all_daily(current_user):
     try:
-        result = db.session.execute(
-            text('EXEC spGetAllDailyReports :userId, :roleId'),
-            {'userId': current_user.id, 'roleId': current_user.roleId}
-        )
-        rows = result.fetchall()
-        result_list = []
-        for row in rows:
-            row_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
-            # Convert encodedAt to Manila timezone if present
-            if row_dict.get('encodedAt'):
-                import pytz
-                row_dict['encodedAt'] = row_dict['encodedAt'].replace(tzinfo=pytz.UTC).astimezone(
-                    pytz.timezone("Asia/Manila")).isoformat()
-            result_list.append(row_dict)
-        return jsonify(result_list)
+        if any(param in request.args for param in DAILY_PAGE_PARAMS):
+            return get_daily_page(current_user)
+
+        result = procs.call('spGetAllDailyReports', userId=current_user.id, roleId=current_user.roleId)
+        fmt = stream_format()
+        if fmt:
+            return stream_rows(result, DAILY_ROWS, fmt)
+        return jsonify(DAILY_ROWS.fetch_all(result))
     except Exception as e:
         return jsonify({'message': f'Failed to fetch daily reports: {str(e)}'}), 500
 
@@ -55,10 +113,6 @@ def get_all_daily(current_user):
 @token_required
 def create_daily(current_user):
     try:
-        user = User.query.get(current_user.id)
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-
         data = request.get_json()
 
 
@@ -69,44 +123,42 @@ def create_daily(current_user):
 
         correct_branch_id = source_name_obj.branchId
 
-        if user.roleId in [3, 4]:
-            if str(correct_branch_id) != str(user.branchId):
-                return jsonify({'message': 'You can only submit data for your assigned branch'}), 403
-
-        result = db.session.execute(
-            text(
-                'EXEC spCreateDaily :monthlyId, :sourceType, :sourceName, :byUser, :date, :productionVolume, :operationHours, :serviceInterruption, :totalHoursServiceInterruption, :electricityConsumption, :VFDFrequency, :spotFlow, :spotPressure, :timeSpotMeasurements, :lineVoltage1, :lineVoltage2, :lineVoltage3, :lineCurrent1, :lineCurrent2, :lineCurrent3, :comment, :isActive, :branchId, :areaId'),
-            {
-                'monthlyId': data.get('monthlyId'),
-                'sourceType': data.get('sourceType'),
-                'sourceName': source_name_id,
-                'byUser': current_user.id,
-                'date': data.get('date'),
-                'productionVolume': data.get('productionVolume'),
-                'operationHours': data.get('operationHours'),
-                'serviceInterruption': data.get('serviceInterruption'),
-                'totalHoursServiceInterruption': data.get('totalHoursServiceInterruption'),
-                'electricityConsumption': data.get('electricityConsumption'),
-                'VFDFrequency': data.get('VFDFrequency'),
-                'spotFlow': data.get('spotFlow'),
-                'spotPressure': data.get('spotPressure'),
-                'timeSpotMeasurements': data.get('timeSpotMeasurements'),
-                'lineVoltage1': data.get('lineVoltage1'),
-                'lineVoltage2': data.get('lineVoltage2'),
-                'lineVoltage3': data.get('lineVoltage3'),
-                'lineCurrent1': data.get('lineCurrent1'),
-                'lineCurrent2': data.get('lineCurrent2'),
-                'lineCurrent3': data.get('lineCurrent3'),
-                'comment': data.get('comment'),
-                'isActive': data.get('isActive', True),
-                'branchId': correct_branch_id,
-                'areaId': data.get('areaId')
-            }
-        )
-        new_id = result.fetchone()[0]
+        if not can_access_branch(current_user, correct_branch_id):
+            return jsonify({'message': 'You can only submit data for your assigned branch'}), 403
+
+        new_id = procs.first(
+            'spCreateDaily',
+            monthlyId=data.get('monthlyId'),
+            sourceType=data.get('sourceType'),
+            sourceName=source_name_id,
+            byUser=current_user.id,
+            date=data.get('date'),
+            productionVolume=data.get('productionVolume'),
+            operationHours=data.get('operationHours'),
+            serviceInterruption=data.get('serviceInterruption'),
+            totalHoursServiceInterruption=data.get('totalHoursServiceInterruption'),
+            electricityConsumption=data.get('electricityConsumption'),
+            VFDFrequency=data.get('VFDFrequency'),
+            spotFlow=data.get('spotFlow'),
+            spotPressure=data.get('spotPressure'),
+            timeSpotMeasurements=data.get('timeSpotMeasurements'),
+            lineVoltage1=data.get('lineVoltage1'),
+            lineVoltage2=data.get('lineVoltage2'),
+            lineVoltage3=data.get('lineVoltage3'),
+            lineCurrent1=data.get('lineCurrent1'),
+            lineCurrent2=data.get('lineCurrent2'),
+            lineCurrent3=data.get('lineCurrent3'),
+            comment=data.get('comment'),
+            isActive=data.get('isActive', True),
+            branchId=correct_branch_id,
+            areaId=data.get('areaId')
+        )[0]
+        refresh_rollups([rollup_key(correct_branch_id, data.get('sourceType'), source_name_id, data.get('date'))])
         db.session.commit()
 
-        invalidate_daily_cache(current_user.id, current_user.roleId, current_user.branchId)
+        invalidate(DAILY_CREATED, branch_id=correct_branch_id, source_type_id=data.get('sourceType'),
+                   source_name_id=source_name_id, record_date=data.get('date'))
+        notify_daily_data_change(correct_branch_id, 'create', record_id=new_id)
 
         return jsonify({
             'message': 'Daily record created successfully',
@@ -117,19 +169,134 @@ def create_daily(current_user):
         db.session.rollback()
         return jsonify({'message': f'failed to create daily records: {str(e)}'}), 500
 
+DAILY_BULK_LIMIT = 500
+# Copied from the request into the OPENJSON payload, coerced the way procs binds spCreateDaily.
+# sourceType, sourceName and branchId come from the resolved source name instead.
+DAILY_BULK_FIELDS = dict(monthlyId=procs.INT, **procs.DAILY_MEASUREMENTS, comment=procs.STR, isActive=procs.BOOL,
+                         areaId=procs.INT)
+
+def to_int(value):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+def bulk_row_values(item):
+    """(values, None) for a bulk daily record, or (None, field) naming the first value that does not coerce"""
+    values = {}
+    for field, coerce in DAILY_BULK_FIELDS.items():
+        try:
+            value = coerce(item.get(field))
+        except (ValueError, TypeError):
+            return None, field
+        # NaN and infinity are not valid JSON, so OPENJSON would reject the whole batch
+        if isinstance(value, float) and not math.isfinite(value):
+            return None, field
+        values[field] = value
+    return values, None
+
+@daily_bp.route('/api/daily/bulk', methods=['POST'])
+@token_required
+def create_daily_bulk(current_user):
+    """Create many daily records in one transaction, reporting success or failure per row"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not data:
+        return jsonify({'message': 'Expected a non-empty array of daily records'}), 400
+    if len(data) > DAILY_BULK_LIMIT:
+        return jsonify({'message': f'At most {DAILY_BULK_LIMIT} records can be submitted at once'}), 400
+
+    try:
+        # One lookup and one branch check per distinct source name rather than per row
+        source_name_ids = {to_int(item.get('sourceName')) for item in data if isinstance(item, dict)}
+        source_names = {
+            source_name.id: source_name
+            for source_name in SourceName.query.filter(SourceName.id.in_(source_name_ids - {None})).all()
+        }
+        allowed = {
+            source_id: can_access_branch(current_user, source_name.branchId)
+            for source_id, source_name in source_names.items()
+        }
+
+        results = [None] * len(data)
+        rows = []
+        for index, item in enumerate(data):
+            if not isinstance(item, dict):
+                results[index] = {'index': index, 'success': False, 'message': 'Invalid record'}
+                continue
+            source_name = source_names.get(to_int(item.get('sourceName')))
+            if not source_name:
+                results[index] = {'index': index, 'success': False, 'message': 'Source name not found'}
+                continue
+            if not allowed[source_name.id]:
+                results[index] = {'index': index, 'success': False,
+                                  'message': 'You can only submit data for your assigned branch'}
+                continue
+            # Rollups and cache keys are bucketed by source type, so it must be the source name's own
+            if item.get('sourceType') is not None and to_int(item.get('sourceType')) != source_name.sourceTypeId:
+                results[index] = {'index': index, 'success': False,
+                                  'message': 'Source type does not match the source name'}
+                continue
+            try:
+                record_date = date.fromisoformat(str(item.get('date'))[:10])
+            except ValueError:
+                results[index] = {'index': index, 'success': False, 'message': 'Invalid date'}
+                continue
+
+            row, invalid_field = bulk_row_values(item)
+            if invalid_field:
+                results[index] = {'index': index, 'success': False, 'message': f'Invalid value for {invalid_field}'}
+                continue
+            row.update(rowIndex=index, sourceType=source_name.sourceTypeId, sourceName=source_name.id,
+                       date=record_date.isoformat(), branchId=source_name.branchId)
+            rows.append(row)
+
+        if rows:
+            created = {row_index: new_id
+                       for row_index, new_id in procs.rows('spCreateDailyBatch', rows=rows, byUser=current_user.id)}
+            refresh_rollups(rollup_key(row['branchId'], row['sourceType'], row['sourceName'], row['date'])
+                            for row in rows)
+            db.session.commit()
+
+            for row in rows:
+                new_id = created.get(row['rowIndex'])
+                results[row['rowIndex']] = (
+                    {'index': row['rowIndex'], 'success': True, 'id': new_id} if new_id is not None
+                    else {'index': row['rowIndex'], 'success': False, 'message': 'Record was not created'}
+                )
+
+            invalidate_many(DAILY_CREATED, {
+                (row['branchId'], row['sourceType'], row['sourceName'], row['date'][:7]): {
+                    'branch_id': row['branchId'], 'source_type_id': row['sourceType'],
+                    'source_name_id': row['sourceName'], 'record_date': row['date']
+                }
+                for row in rows
+            }.values())
+            # The emitter coalesces these into one dailyDataChanged per branch
+            for row in rows:
+                if row['rowIndex'] in created:
+                    notify_daily_data_change(row['branchId'], 'create', record_id=created[row['rowIndex']])
+
+        created_count = sum(1 for item in results if item['success'])
+        return jsonify({
+            'message': f'{created_count} of {len(data)} daily records created',
+            'created': created_count,
+            'failed': len(data) - created_count,
+            'results': results
+        }), 201 if created_count else 400
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'failed to create daily records: {str(e)}'}), 500
+
 @daily_bp.route('/api/source-names', methods=['GET'])
 @token_required
-@cache.memoize(timeout=600)
+@cached_view(lambda current_user: 'source_names_all', timeout=600,
+             tags=lambda current_user: [BRANCH_LIST_TAG])
 def get_all_source_names(current_user):
-    user = User.query.get(current_user.id)
-    if not user:
-        return jsonify({'message': 'User not found'}), 404
-
-    if user.roleId not in [1, 2]:
+    if current_user.roleId not in [1, 2]:
         return jsonify({'message': 'Forbidden'}), 403
 
-    result = db.session.execute(text('EXEC spGetAllSourceNames'))
-    rows = result.fetchall()
+    rows = procs.rows('spGetAllSourceNames')
     output = [
         {
             'id': row.id,
@@ -148,30 +315,18 @@ def get_all_source_names(current_user):
 @token_required
 def get_daily_by_id(current_user, id):
     try:
-        user = User.query.get(current_user.id)
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-
-        result = db.session.execute(
-            text('EXEC spGetDailyById :dailyId'),
-            {'dailyId': id}
-        )
-        row = result.fetchone()
+        row = procs.first('spGetDailyById', dailyId=id)
         if not row:
             return jsonify({'message': 'Daily record not found'}), 404
 
         row_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
 
         # Access control for branch admin/encoder
-        if user.roleId in [3, 4]:
-            if row_dict['branchId'] != user.branchId:
-                return jsonify({'message': 'you can only access records from your assigned branch'}), 403
+        if not can_access_branch(current_user, row_dict['branchId']):
+            return jsonify({'message': 'you can only access records from your assigned branch'}), 403
 
         # Convert encodedAt and date to proper format
-        import pytz
-        if row_dict.get('encodedAt'):
-            row_dict['encodedAt'] = row_dict['encodedAt'].replace(tzinfo=pytz.UTC).astimezone(
-                pytz.timezone("Asia/Manila")).isoformat()
+        row_dict['encodedAt'] = to_manila_iso(row_dict.get('encodedAt'))
         if row_dict.get('date'):
             row_dict['date'] = row_dict['date'].isoformat()
 
@@ -186,10 +341,6 @@ def get_daily_by_id(current_user, id):
 @token_required
 def update_daily(current_user, id):
     try:
-        user = User.query.get(current_user.id)
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-
         daily_record = Daily.query.get(id)
         if not daily_record:
             return jsonify({'message': 'Daily record not found'}), 404
@@ -197,8 +348,8 @@ def update_daily(current_user, id):
         data = request.get_json()
 
         # Access control and field filtering for encoders
-        if user.roleId == 4:
-            if daily_record.branchId != user.branchId:
+        if current_user.roleId == 4:
+            if daily_record.branchId != current_user.branchId:
                 return jsonify({'message': 'You can only edit from your assigned branch'}), 403
 
             status_obj = Status.query.get(daily_record.status)
@@ -255,13 +406,13 @@ def update_daily(current_user, id):
             'isActive': filtered_data.get('isActive')
         }
 
-        db.session.execute(
-            text(
-                'EXEC spUpdateDaily :id, :productionVolume, :operationHours, :serviceInterruption, :totalHoursServiceInterruption, :electricityConsumption, :VFDFrequency, :spotFlow, :spotPressure, :timeSpotMeasurements, :lineVoltage1, :lineVoltage2, :lineVoltage3, :lineCurrent1, :lineCurrent2, :lineCurrent3, :comment, :status, :isActive'),
-            params
-        )
+        procs.call('spUpdateDaily', **params)
+        refresh_rollups([rollup_key(daily_record.branchId, daily_record.sourceType, daily_record.sourceName,
+                                    daily_record.date)])
         db.session.commit()
-        invalidate_daily_cache(current_user.id, current_user.roleId, current_user.branchId)
+        invalidate(DAILY_UPDATED, branch_id=daily_record.branchId, source_type_id=daily_record.sourceType,
+                   source_name_id=daily_record.sourceName, record_date=daily_record.date)
+        notify_daily_data_change(daily_record.branchId, 'update', record_id=id, status=params.get('status'))
         return jsonify({'message': 'Daily record updated successfully'})
 
 
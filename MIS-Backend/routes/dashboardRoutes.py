@@ -1,26 +1,28 @@
-from flask import Blueprint, jsonify
+import hashlib
+import json
+from flask import Blueprint, current_app, jsonify, request
 from models.User import User
 from models.Area import Area
 from models.Branch import Branch
 from models.Status import Status
 from models.Daily import Daily
 from models.Monthly import Monthly
-from models.db import db
-from sqlalchemy import text
-from config import cache
+from utils.cache_util import cached_view, user_scoped, user_tags, user_key, get_tagged, set_tagged, tag_versions
 from utils.auth import token_required
+from utils import procs
+from utils.realtime import get_live_counters
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+DASHBOARD_TAGS = user_tags()
+
 @dashboard_bp.route('/api/dashboard-stats', methods=['GET'])
 @token_required
-@cache.memoize(timeout=120)
+@cached_view(user_scoped('dashboard_stats'), timeout=120, tags=DASHBOARD_TAGS)
 def dashboard_stats(current_user):
     try:
-        result = db.session.execute(
-            text('EXEC GetDashboardStats @UserRoleId=:role, @UserBranchId=:branch'),
-            {'role': current_user.roleId, 'branch': current_user.branchId}
-        )
+        result = procs.rows('GetDashboardStats', UserRoleId=current_user.roleId,
+                            UserBranchId=current_user.branchId)
         stats = {}
         for row in result:
             stats[row.MetricName] = row.MetricValue
@@ -30,17 +32,15 @@ def dashboard_stats(current_user):
 
 @dashboard_bp.route('/api/branch-dashboard-stats', methods=['GET'])
 @token_required
-@cache.memoize(timeout=120)
+@cached_view(user_scoped('branch_dashboard_stats'), timeout=120, tags=DASHBOARD_TAGS)
 def branch_dashboard_stats(current_user):
     if current_user.roleId != 3:
         return jsonify({'message': 'Unauthorized'}), 403
 
     try:
         # Call the same stored procedure
-        result = db.session.execute(
-            text('EXEC GetDashboardStats @UserRoleId=:role, @UserBranchId=:branch'),
-            {'role': current_user.roleId, 'branch': current_user.branchId}
-        )
+        result = procs.rows('GetDashboardStats', UserRoleId=current_user.roleId,
+                            UserBranchId=current_user.branchId)
 
         stats = {}
         for row in result:
@@ -52,17 +52,15 @@ def branch_dashboard_stats(current_user):
 
 @dashboard_bp.route('/api/encoder-dashboard-stats', methods=['GET'])
 @token_required
-@cache.memoize(timeout=120)
+@cached_view(user_scoped('encoder_dashboard_stats'), timeout=120, tags=DASHBOARD_TAGS)
 def encoder_dashboard_stats(current_user):
     if current_user.roleId != 4:
         return jsonify({'message': 'Unauthorized'}), 403
 
     try:
         # Call the same stored procedure
-        result = db.session.execute(
-            text('EXEC GetDashboardStats @UserRoleId=:role, @UserBranchId=:branch'),
-            {'role': current_user.roleId, 'branch': current_user.branchId}
-        )
+        result = procs.rows('GetDashboardStats', UserRoleId=current_user.roleId,
+                            UserBranchId=current_user.branchId)
 
         stats = {}
         for row in result:
@@ -73,14 +71,12 @@ def encoder_dashboard_stats(current_user):
         return jsonify({'message': f'Error fetching encoder dashboard stats: {str(e)}'}), 500
 @dashboard_bp.route('/api/approval-counts', methods=['GET'])
 @token_required
-@cache.memoize(timeout=60)
+@cached_view(user_scoped('approval_counts'), timeout=60, tags=DASHBOARD_TAGS)
 def approval_counts(current_user):
     try:
         # Call the new stored procedure to get both daily and monthly approval counts
-        result = db.session.execute(
-            text('EXEC GetApprovalCounts @UserRoleId=:role, @UserBranchId=:branch'),
-            {'role': current_user.roleId, 'branch': current_user.branchId}
-        )
+        result = procs.rows('GetApprovalCounts', UserRoleId=current_user.roleId,
+                            UserBranchId=current_user.branchId)
 
         counts = {}
         for row in result:
@@ -88,4 +84,47 @@ def approval_counts(current_user):
 
         return jsonify(counts)
     except Exception as e:
-        return jsonify({'message': f'Error fetching approval counts: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'message': f'Error fetching approval counts: {str(e)}'}), 500
+
+def metric_value(value):
+    # The summary proc returns every value as FLOAT; counts go back out as integers
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+@dashboard_bp.route('/api/dashboard/summary', methods=['GET'])
+@token_required
+def dashboard_summary(current_user):
+    """Stats and approval counts as one cached snapshot, revalidated with ETag/If-None-Match"""
+    try:
+        key = user_key('dashboard_summary', current_user)
+        snapshot = get_tagged(key)
+        if snapshot is None:
+            versions = tag_versions(DASHBOARD_TAGS(current_user))
+            result = procs.rows('spGetDashboardSummary', UserRoleId=current_user.roleId,
+                                UserBranchId=current_user.branchId)
+            summary = {'stats': {}, 'approvalCounts': {}}
+            for row in result:
+                summary[row.section][row.name] = metric_value(row.value)
+            etag = hashlib.sha1(json.dumps(summary, sort_keys=True).encode()).hexdigest()
+            snapshot = {'etag': etag, 'summary': summary}
+            set_tagged(key, snapshot, versions, timeout=60)
+
+        # Unchanged since the client's last poll: no body to serialize or send
+        if request.if_none_match.contains(snapshot['etag']):
+            response = current_app.response_class(status=304)
+        else:
+            response = jsonify(snapshot['summary'])
+        response.set_etag(snapshot['etag'])
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    except Exception as e:
+        return jsonify({'message': f'Error fetching dashboard summary: {str(e)}'}), 500
+
+@dashboard_bp.route('/api/dashboard/live-counters', methods=['GET'])
+@token_required
+def live_counters(current_user):
+    """Initial pending counters for clients that then follow countersChanged over Socket.IO"""
+    try:
+        scope = 'all' if current_user.roleId in (1, 2) else current_user.branchId
+        return jsonify({'branchId': scope, **get_live_counters(scope)})
+    except Exception as e:
+        return jsonify({'message': f'Error fetching live counters: {str(e)}'}), 500
@@ -0,0 +1,18 @@
+import hmac
+from flask import Blueprint, current_app, jsonify, request
+from utils.metrics import render, EXPOSITION_CONTENT_TYPE
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, stored procedure, cache, pool and Socket.IO metrics for Prometheus to scrape"""
+    expected = current_app.config.get('METRICS_TOKEN')
+    if expected:
+        supplied = request.headers.get('Authorization', '').split(' ')[-1]
+        if not hmac.compare_digest(supplied, expected):
+            return jsonify({'message': 'Forbidden'}), 403
+    try:
+        return current_app.response_class(render(), mimetype=None, content_type=EXPOSITION_CONTENT_TYPE)
+    except Exception as e:
+        return jsonify({'message': f'Failed to render metrics: {str(e)}'}), 500
@@ -1,3 +1,4 @@
+import logging
 from flask import Blueprint, request, jsonify
 from sqlalchemy.util.typing import resolve_name_to_real_class_name
 
@@ -5,103 +6,103 @@ import calendar
 
 from models.Monthly import Monthly
 from models.db import db
-from models.User import User
 from models.Daily import Daily
 from models.sourceType import SourceType
 from models.sourceName import SourceName
 from datetime import datetime, date
-from utils.auth import token_required
+from utils.auth import token_required, can_access_branch
 from flask_cors import cross_origin
 from models.Area import Area
 from models.Branch import Branch
 from models.Status import Status
-from sqlalchemy import text
-from config import cache
+from models.DailyMonthlyRollup import DailyMonthlyRollup
+from utils.rollups import get_completion_mask, month_mask, missing_days as missing_days_in, COMPLETION_MASK_TIMEOUT
+from utils import procs
+from utils.cache_util import (get_cached_daily_sums, set_cached_daily_sums, daily_sums_versions, invalidate,
+                              completion_matrix_key, get_tagged, set_tagged, tag_versions, branch_sources_tag,
+                              completion_year_tag, MONTHLY_CREATED)
+from utils.streaming import stream_format, stream_rows
+from utils.serializers import RowSerializer, PLAIN_ROWS, convert_to_float
+from socket_events import notify_monthly_data_change
 
 monthly_bp = Blueprint('monthly', __name__)
-
-def invalidate_monthly_cache(user_id, role_id, branch_id):
-    """Clear cache when monthly data changes"""
-    # Clear cache for simple cache (doesn't support delete_memoized with strings)
-    try:
-        # Invalidate daily sums cache
-        cache.delete_memoized('get_daily_sums')
-        cache.delete_memoized('get_daily_sums_batch')
-        # Invalidate dashboard cache since monthly data affects approval counts
-        cache.delete_memoized('dashboard_stats', user_id, role_id, branch_id)
-        cache.delete_memoized('approval_counts', user_id, role_id, branch_id)
-    except (TypeError, AttributeError):
-        # For simple cache, clear all cache
-        cache.clear()
+logger = logging.getLogger(__name__)
 
 def sum_daily_fields(branch_id, source_type_id, year, month):
     try:
         if not year or not month:
-            print("Error in sum_daily_fields: year or month is empty")
+            logger.warning('sum_daily_fields: year or month is empty')
             return None
 
         try:
             month = int(month)
             year = int(year)
-        except (ValueError, TypeError) as e:
-            print(f"Error in sum_daily_fields: Invalid month/year values = {str(e)}")
+        except (ValueError, TypeError):
+            logger.warning('sum_daily_fields: invalid month/year', extra={'year': year, 'month': month})
             return None
 
         if not (1 <= month <= 12):
-            print(f"Error in sum_daily_fields: Invalid month value - {month}")
-            return None
-
-        result = db.session.execute(
-            text('EXEC spSumDailyFields :branchId, :sourceTypeId, :year, :month'),
-            {
-                'branchId': branch_id,
-                'sourceTypeId': source_type_id,
-                'year': year,
-                'month': month
-            }
-        )
-        row = result.fetchone()
-        if not row or all(v is None for v in row):
+            logger.warning('sum_daily_fields: invalid month', extra={'month': month})
             return None
 
-        sums = {
-            'productionVolume': row.productionVolume,
-            'operationHours': row.operationHours,
-            'serviceInterruption': row.serviceInterruption,
-            'totalHoursServiceInterruption': row.totalHoursServiceInterruption,
-            'electricityConsumption': row.electricityConsumption
-        }
-        return sums
-    except Exception as e:
-        print(f"Error in sum_daily_fields: {str(e)}")
+        key = (int(branch_id), int(source_type_id), year, month)
+        return sum_daily_fields_batch([key]).get(key)
+    except Exception:
+        logger.exception('Error in sum_daily_fields')
         return None
 
+DAILY_SUM_FIELDS = (
+    'productionVolume',
+    'operationHours',
+    'serviceInterruption',
+    'totalHoursServiceInterruption',
+    'electricityConsumption'
+)
+
+def empty_daily_sums():
+    return {field: 0 for field in DAILY_SUM_FIELDS}
+
+def sum_daily_fields_batch(keys):
+    """Sum daily fields for many (branchId, sourceTypeId, year, month) tuples in one call"""
+    if not keys:
+        return {}
+
+    requests = [
+        {'branchId': branch_id, 'sourceTypeId': source_type_id, 'year': year, 'month': month}
+        for branch_id, source_type_id, year, month in keys
+    ]
+
+    sums_by_key = {}
+    for row in procs.rows('spSumDailyFieldsBatch', requests=requests):
+        key = (row.branchId, row.sourceTypeId, row.year, row.month)
+        if all(getattr(row, field) is None for field in DAILY_SUM_FIELDS):
+            sums_by_key[key] = None
+        else:
+            sums_by_key[key] = {field: getattr(row, field) for field in DAILY_SUM_FIELDS}
+    return sums_by_key
+
+def get_daily_sums_for_keys(keys):
+    """Serve daily sums from the per-tuple cache and query only the misses"""
+    keys = set(keys)
+    sums_by_key = get_cached_daily_sums(keys)
+    misses = keys - sums_by_key.keys()
+    if misses:
+        versions = daily_sums_versions(misses)
+        fetched = sum_daily_fields_batch(misses)
+        fetched = {key: fetched.get(key) or empty_daily_sums() for key in misses}
+        set_cached_daily_sums(fetched, versions)
+        sums_by_key.update(fetched)
+    return sums_by_key
+
 def validate_daily_completion(branch_id, source_name_id, year, month):
     try:
         year = int(year)
         month = int(month)
         days_in_month = calendar.monthrange(year, month)[1]
 
-        # Use raw DB-API connection for multiple result sets
-        conn = db.engine.raw_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                "EXEC spValidateDailyCompletion ?, ?, ?, ?",
-                (branch_id, source_name_id, year, month)
-            )
-
-            # First result set: missing days
-            missing_days = [row[0] for row in cursor.fetchall()]
-
-            # Move to next result set: completed days
-            cursor.nextset()
-            completed_days_row = cursor.fetchone()
-            completed_days = completed_days_row[0] if completed_days_row else 0
-
-        finally:
-            cursor.close()
-            conn.close()
+        mask = get_completion_mask(int(branch_id), int(source_name_id), year, month)
+        missing_days = missing_days_in(mask, days_in_month)
+        completed_days = days_in_month - len(missing_days)
 
         is_valid = len(missing_days) == 0
         total_days = days_in_month
@@ -127,75 +128,39 @@ def validate_daily_completion(branch_id, source_name_id, year, month):
 
         return is_valid, missing_days, total_days, completed_days, error_message
     except Exception as e:
-        print(f"Error in validate_daily_completion: {str(e)}")
+        logger.exception('Error in validate_daily_completion')
         return False, [], 0, 0, f"Error checking daily completion: {str(e)}"
 
 @monthly_bp.route('/api/monthly', methods=['GET', 'OPTIONS'])
 @cross_origin("http://localhost:5173", "http://localhost;5174")
 @token_required
 def get_all_monthly(current_user):
-    user = User.query.get(current_user.id)
-    if not user:
-        return jsonify({'message': 'User not found'}), 404
-
-    result = db.session.execute(
-        text('EXEC spGetAllMonthly :userId, :roleId'),
-        {'userId': current_user.id, 'roleId': user.roleId}
-    )
-    rows = result.fetchall()
-
-    def convert_to_float(value):
-        try:
-            if isinstance(value, (int, float)):
-                return float(value)
-            if value is None or value == '':
-                return 0
-            return float(value)
-        except (ValueError, TypeError):
-            return 0
-
-    output = []
-    for row in rows:
-        row_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
-        # Convert numeric fields to float if needed
-        for key in [
-            'productionVolumeAutoSum', 'operationHoursAutoSum',
-            'serviceInterruptionAutoSum', 'totalHoursServiceInterruptionAutoSum',
-            'electricityConsumption', 'electricityCost', 'bulkCost', 'bulkOuttake',
-            'WTPCost', 'WTPVolume', 'disinfectionCost', 'disinfectionAmount',
-            'otherTreatmentCost', 'emergencyLitersConsumed', 'emergencyFuelCost',
-            'emergencyTotalHoursUsed', 'gensetLitersConsumed', 'gensetFuelCost'
-        ]:
-            if key in row_dict:
-                row_dict[key] = convert_to_float(row_dict[key])
-        output.append(row_dict)
-    return jsonify(output)
-
-def convert_to_float(value):
-    try:
-        if isinstance(value, (int, float)):
-            return float(value)
-        if value is None or value == '':
-            return 0.0
-        return float(value)
-    except (ValueError, TypeError):
-        return 0.0
+    result = procs.call('spGetAllMonthly', userId=current_user.id, roleId=current_user.roleId)
+    fmt = stream_format()
+    if fmt:
+        return stream_rows(result, MONTHLY_ROWS, fmt)
+    return jsonify(MONTHLY_ROWS.fetch_all(result))
+
+MONTHLY_FLOAT_FIELDS = (
+    'productionVolumeAutoSum', 'operationHoursAutoSum',
+    'serviceInterruptionAutoSum', 'totalHoursServiceInterruptionAutoSum',
+    'electricityConsumption', 'electricityCost', 'bulkCost', 'bulkOuttake',
+    'WTPCost', 'WTPVolume', 'disinfectionCost', 'disinfectionAmount',
+    'otherTreatmentCost', 'emergencyLitersConsumed', 'emergencyFuelCost',
+    'emergencyTotalHoursUsed', 'gensetLitersConsumed', 'gensetFuelCost'
+)
+MONTHLY_ROWS = RowSerializer({field: convert_to_float for field in MONTHLY_FLOAT_FIELDS})
 
 @monthly_bp.route('/api/monthly', methods=['POST'])
 @token_required
 def create_monthly(current_user):
     try:
-        user = User.query.get(current_user.id)
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-
         data = request.get_json()
         if data is None:
             return jsonify({'message': 'No data received'}), 400
 
-        if user.roleId in [3, 4]:
-            if str(data.get('branchId')) != str(user.branchId):
-                return jsonify({'message': 'You can only submit data for your assigned branch'}), 403
+        if not can_access_branch(current_user, data.get('branchId')):
+            return jsonify({'message': 'You can only submit data for your assigned branch'}), 403
 
         branch_id = data.get('branchId')
         source_name_id = data.get('sourceName')
@@ -248,52 +213,44 @@ def create_monthly(current_user):
             if field not in data:
                 data[field] = 0
 
-        result = db.session.execute(
-            text('EXEC spCreateMonthly :branchId, :sourceType, :sourceName, :status, :byUser, :month, :year, '
-                 ':productionVolume, :operationHours, :serviceInterruption, :totalHoursServiceInterruption, '
-                 ':electricityConsumption, :electricityCost, :bulkCost, :bulkOuttake, :bulkProvider, '
-                 ':WTPCost, :WTPSource, :WTPVolume, :disinfectionMode, :disinfectantCost, '
-                 ':disinfectionAmount, :disinfectionBrandType, :otherTreatmentCost, '
-                 ':emergencyLitersConsumed, :emergencyFuelCost, :emergencyTotalHoursUsed, '
-                 ':gensetLitersConsumed, :gensetFuelCost, :isActive, :comment'),
-            {
-                'branchId': data.get('branchId'),
-                'sourceType': data.get('sourceType'),
-                'sourceName': data.get('sourceName'),
-                'status': data.get('status', 2),
-                'byUser': current_user.id,
-                'month': data.get('month'),
-                'year': data.get('year'),
-                'productionVolume': data.get('productionVolume'),
-                'operationHours': data.get('operationHours'),
-                'serviceInterruption': data.get('serviceInterruption'),
-                'totalHoursServiceInterruption': data.get('totalHoursServiceInterruption'),
-                'electricityConsumption': data.get('electricityConsumption'),
-                'electricityCost': data.get('electricityCost'),
-                'bulkCost': data.get('bulkCost'),
-                'bulkOuttake': data.get('bulkOuttake'),
-                'bulkProvider': data.get('bulkProvider'),
-                'WTPCost': data.get('WTPCost'),
-                'WTPSource': data.get('WTPSource'),
-                'WTPVolume': data.get('WTPVolume'),
-                'disinfectionMode': data.get('disinfectionMode'),
-                'disinfectantCost': data.get('disinfectantCost'),
-                'disinfectionAmount': data.get('disinfectionAmount'),
-                'disinfectionBrandType': data.get('disinfectionBrandType'),
-                'otherTreatmentCost': data.get('otherTreatmentCost'),
-                'emergencyLitersConsumed': data.get('emergencyLitersConsumed'),
-                'emergencyFuelCost': data.get('emergencyFuelCost'),
-                'emergencyTotalHoursUsed': data.get('emergencyTotalHoursUsed'),
-                'gensetLitersConsumed': data.get('gensetLitersConsumed'),
-                'gensetFuelCost': data.get('gensetFuelCost'),
-                'isActive': data.get('isActive', True),
-                'comment': data.get('comment')
-            }
-        )
-        new_id = result.fetchone()[0]
+        new_id = procs.first(
+            'spCreateMonthly',
+            branchId=data.get('branchId'),
+            sourceType=data.get('sourceType'),
+            sourceName=data.get('sourceName'),
+            status=data.get('status', 2),
+            byUser=current_user.id,
+            month=data.get('month'),
+            year=data.get('year'),
+            productionVolume=data.get('productionVolume'),
+            operationHours=data.get('operationHours'),
+            serviceInterruption=data.get('serviceInterruption'),
+            totalHoursServiceInterruption=data.get('totalHoursServiceInterruption'),
+            electricityConsumption=data.get('electricityConsumption'),
+            electricityCost=data.get('electricityCost'),
+            bulkCost=data.get('bulkCost'),
+            bulkOuttake=data.get('bulkOuttake'),
+            bulkProvider=data.get('bulkProvider'),
+            WTPCost=data.get('WTPCost'),
+            WTPSource=data.get('WTPSource'),
+            WTPVolume=data.get('WTPVolume'),
+            disinfectionMode=data.get('disinfectionMode'),
+            disinfectantCost=data.get('disinfectantCost'),
+            disinfectionAmount=data.get('disinfectionAmount'),
+            disinfectionBrandType=data.get('disinfectionBrandType'),
+            otherTreatmentCost=data.get('otherTreatmentCost'),
+            emergencyLitersConsumed=data.get('emergencyLitersConsumed'),
+            emergencyFuelCost=data.get('emergencyFuelCost'),
+            emergencyTotalHoursUsed=data.get('emergencyTotalHoursUsed'),
+            gensetLitersConsumed=data.get('gensetLitersConsumed'),
+            gensetFuelCost=data.get('gensetFuelCost'),
+            isActive=data.get('isActive', True),
+            comment=data.get('comment')
+        )[0]
         db.session.commit()
 
-        invalidate_monthly_cache(current_user.id, current_user.roleId, current_user.branchId)
+        invalidate(MONTHLY_CREATED, branch_id=branch_id)
+        notify_monthly_data_change(branch_id, 'create', record_id=new_id, status=data.get('status', 2))
 
         return jsonify({
             'message': 'Monthly record created successfully',
@@ -301,7 +258,7 @@ def create_monthly(current_user):
         }), 201
     except Exception as e:
         db.session.rollback()
-        print("Error in create_monthly:", str(e))
+        logger.exception('Error in create_monthly')
         return jsonify({'message': f'failed to create monthly record: {str(e)}'}), 500
 
 @monthly_bp.route('/api/monthly-data', methods=['GET', 'OPTIONS'])
@@ -311,37 +268,17 @@ def get_filtered_monthly(current_user):
     try:
         source_type_id = request.args.get('sourceTypeId', type=int)
         branch_id = request.args.get('branchId', type=int)
-        year = request.args.get('year', type=int)
 
-        user = User.query.get(current_user.id)
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-
-        result = db.session.execute(
-            text('EXEC spGetFilteredMonthly :userId, :roleId, :sourceTypeId, :branchId'),
-            {
-                'userId': current_user.id,
-                'roleId': user.roleId,
-                'sourceTypeId': source_type_id,
-                'branchId': branch_id,
-                'year': year
-            }
-        )
-        rows = result.fetchall()
-
-        output = []
-        for row in rows:
-            row_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
-            output.append(row_dict)
-        return jsonify(output)
+        result = procs.call('spGetFilteredMonthly', userId=current_user.id, roleId=current_user.roleId,
+                            sourceTypeId=source_type_id, branchId=branch_id)
+        return jsonify(PLAIN_ROWS.fetch_all(result))
 
     except Exception as e:
-        print(f"Error in get_filtered_monthly: {str(e)}")
+        logger.exception('Error in get_filtered_monthly')
         return jsonify({'message': f'failed to fetch monthly data: {str(e)}'}), 500
 
 @monthly_bp.route('/api/daily-sums', methods=['GET'])
 @token_required
-@cache.memoize(timeout=300)
 def get_daily_sums(current_user):
     try:
         branch_id = request.args.get('branchId', type=int)
@@ -352,48 +289,21 @@ def get_daily_sums(current_user):
         if not all([branch_id, source_type_id, month, year]):
             return jsonify({'message': 'Missing required parameters'}), 400
 
-        user = User.query.get(current_user.id)
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
+        if not can_access_branch(current_user, branch_id):
+            return jsonify({'message': 'You can only view data for your assigned branch'}), 403
 
-        if user.roleId in [3, 4]:
-            if str(branch_id) != str(user.branchId):
-                return jsonify({'message': 'You can only view data for your assigned branch'}), 403
+        if not (1 <= month <= 12) or not (1 <= year <= 9999):
+            return jsonify({'message': 'Invalid month or year value'}), 400
 
-        result = db.session.execute(
-            text('EXEC spSumDailyFields :branchId, :sourceTypeId, :year, :month'),
-            {
-                'branchId': branch_id,
-                'sourceTypeId': source_type_id,
-                'year': year,
-                'month': month
-            }
-        )
-        row = result.fetchone()
-        if not row or all(v is None for v in row):
-            return jsonify({
-                'productionVolume': 0,
-                'operationHours': 0,
-                'serviceInterruption': 0,
-                'totalHoursServiceInterruption': 0,
-                'electricityConsumption': 0
-            })
-        sums = {
-            'productionVolume': row.productionVolume,
-            'operationHours': row.operationHours,
-            'serviceInterruption': row.serviceInterruption,
-            'totalHoursServiceInterruption': row.totalHoursServiceInterruption,
-            'electricityConsumption': row.electricityConsumption
-        }
-        return jsonify(sums)
-    except Exception as e:
-        print(f"Error in get_daily_sums: {str(e)}")
-        return jsonify({'message': f'failed to fetch daily sums'}), 500
+        key = (branch_id, source_type_id, year, month)
+        return jsonify(get_daily_sums_for_keys([key])[key])
+    except Exception:
+        logger.exception('Error in get_daily_sums')
+        return jsonify({'message': 'failed to fetch daily sums'}), 500
 
 
 @monthly_bp.route('/api/daily-sums/batch', methods=['POST'])
 @token_required
-@cache.memoize(timeout=300)
 def get_daily_sums_batch(current_user):
     try:
         data = request.get_json()
@@ -401,85 +311,54 @@ def get_daily_sums_batch(current_user):
         if not isinstance(requests, list):
             return jsonify({'message': 'Invalid request format'}), 400
 
-        user = User.query.get(current_user.id)
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-
         results = []
+        # (index into results, (branchId, sourceTypeId, year, month)) for items to aggregate
+        pending = []
         for req in requests:
             branch_id = req.get('branchId')
             source_type_id = req.get('sourceTypeId')
             month = req.get('month')
             year = req.get('year')
 
+            item = {
+                'branchId': branch_id,
+                'sourceTypeId': source_type_id,
+                'month': month,
+                'year': year
+            }
+
             if not all([branch_id, source_type_id, month, year]):
+                results.append({**item, 'error': 'Missing required parameters', **empty_daily_sums()})
+                continue
+
+            if not can_access_branch(current_user, branch_id):
                 results.append({
-                    'branchId': branch_id,
-                    'sourceTypeId': source_type_id,
-                    'month': month,
-                    'year': year,
-                    'error': 'Missing required parameters',
-                    'productionVolume': 0,
-                    'operationHours': 0,
-                    'serviceInterruption': 0,
-                    'totalHoursServiceInterruption': 0,
-                    'electricityConsumption': 0
+                    **item,
+                    'error': 'You can only view data for your assigned branch',
+                    **empty_daily_sums()
                 })
                 continue
 
-            if user.roleId in [3, 4]:
-                if str(branch_id) != str(user.branchId):
-                    results.append({
-                        'branchId': branch_id,
-                        'sourceTypeId': source_type_id,
-                        'month': month,
-                        'year': year,
-                        'error': 'You can only view data for your assigned branch',
-                        'productionVolume': 0,
-                        'operationHours': 0,
-                        'serviceInterruption': 0,
-                        'totalHoursServiceInterruption': 0,
-                        'electricityConsumption': 0
-                    })
-                    continue
-
-            # Call the stored procedure for each batch item
-            result = db.session.execute(
-                text('EXEC spSumDailyFields :branchId, :sourceTypeId, :year, :month'),
-                {
-                    'branchId': branch_id,
-                    'sourceTypeId': source_type_id,
-                    'year': year,
-                    'month': month
-                }
-            )
-            row = result.fetchone()
-            if not row or all(v is None for v in row):
-                sums = {
-                    'productionVolume': 0,
-                    'operationHours': 0,
-                    'serviceInterruption': 0,
-                    'totalHoursServiceInterruption': 0,
-                    'electricityConsumption': 0
-                }
-            else:
-                sums = {
-                    'productionVolume': row.productionVolume,
-                    'operationHours': row.operationHours,
-                    'serviceInterruption': row.serviceInterruption,
-                    'totalHoursServiceInterruption': row.totalHoursServiceInterruption,
-                    'electricityConsumption': row.electricityConsumption
-                }
-            results.append({
-                'branchId': branch_id,
-                'sourceTypeId': source_type_id,
-                'month': month,
-                'year': year,
-                **sums
-            })
+            try:
+                key = (int(branch_id), int(source_type_id), int(year), int(month))
+            except (ValueError, TypeError):
+                results.append({**item, 'error': 'Invalid parameters', **empty_daily_sums()})
+                continue
+
+            if not (1 <= key[3] <= 12) or not (1 <= key[2] <= 9999):
+                results.append({**item, 'error': 'Invalid month or year value', **empty_daily_sums()})
+                continue
+
+            results.append(item)
+            pending.append((len(results) - 1, key))
+
+        sums_by_key = get_daily_sums_for_keys(key for _, key in pending)
+        for index, key in pending:
+            results[index].update(sums_by_key[key])
+
         return jsonify({'results': results})
     except Exception as e:
-        print(f"Error in get_daily_sums_batch: {str(e)}")
+        logger.exception('Error in get_daily_sums_batch')
         return jsonify({'message': f'failed to fetch daily sums batch: {str(e)}'}), 500
 
 @monthly_bp.route('/api/validate-daily-completion', methods=['POST'])
@@ -513,5 +392,59 @@ def validate_daily_completion_endpoint(current_user):
         }), 200
 
     except Exception as e:
-        print(f"Error in validate_daily_completion_endpoint: {str(e)}")
-        return jsonify({'message': f'Error validating daily completion: {str(e)}'}), 500
\ No newline at end of file
+        logger.exception('Error in validate_daily_completion_endpoint')
+        return jsonify({'message': f'Error validating daily completion: {str(e)}'}), 500
+
+@monthly_bp.route('/api/daily-completion/matrix', methods=['GET'])
+@token_required
+def get_completion_matrix(current_user):
+    """Accepted-day completion of every source name in a branch, month by month for one year"""
+    if current_user.roleId not in [1, 2, 3]:
+        return jsonify({'message': 'Forbidden'}), 403
+    try:
+        branch_id = request.args.get('branchId', type=int)
+        year = request.args.get('year', type=int)
+        if not branch_id or not year:
+            return jsonify({'message': 'Missing required parameters'}), 400
+        if not can_access_branch(current_user, branch_id):
+            return jsonify({'message': 'You can only view data for your assigned branch'}), 403
+
+        key = completion_matrix_key(branch_id, year)
+        matrix = get_tagged(key)
+        if matrix is None:
+            # The matrix lists the branch's source names, so source changes must evict it too
+            versions = tag_versions([branch_sources_tag(branch_id), completion_year_tag(branch_id, year)])
+            masks = {}
+            for rollup in DailyMonthlyRollup.query.filter_by(branchId=branch_id, year=year):
+                masks[(rollup.sourceName, rollup.month)] = (
+                    masks.get((rollup.sourceName, rollup.month), 0) | (rollup.acceptedDaysMask or 0)
+                )
+
+            sources = []
+            for source_name in SourceName.query.filter_by(branchId=branch_id).order_by(SourceName.id):
+                months = []
+                for month in range(1, 13):
+                    days_in_month = calendar.monthrange(year, month)[1]
+                    mask = masks.get((source_name.id, month), 0) & month_mask(days_in_month)
+                    missing = missing_days_in(mask, days_in_month)
+                    months.append({
+                        'month': month,
+                        'acceptedDaysMask': mask,
+                        'acceptedDays': days_in_month - len(missing),
+                        'totalDays': days_in_month,
+                        'missingDays': missing,
+                        'isComplete': not missing
+                    })
+                sources.append({
+                    'sourceNameId': source_name.id,
+                    'sourceName': source_name.sourceName,
+                    'sourceTypeId': source_name.sourceTypeId,
+                    'months': months
+                })
+            matrix = {'branchId': branch_id, 'year': year, 'sources': sources}
+            set_tagged(key, matrix, versions, timeout=COMPLETION_MASK_TIMEOUT)
+
+        return jsonify(matrix)
+    except Exception as e:
+        logger.exception('Error in get_completion_matrix')
+        return jsonify({'message': f'failed to fetch completion matrix: {str(e)}'}), 500
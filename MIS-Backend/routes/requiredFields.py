@@ -1,9 +1,8 @@
 from flask import Blueprint, request, jsonify
 from models.db import db
 from models.requiredFields import RequiredFields
-from models.User import User
-from utils.auth import token_required
-from sqlalchemy import text
+from utils.auth import token_required, can_access_branch
+from utils import procs
 
 required_fields_bp = Blueprint('required_fields', __name__)
 
@@ -11,19 +10,10 @@ required_fields_bp = Blueprint('required_fields', __name__)
 @token_required
 def get_required_fields(current_user, branch_id):
     try:
-        user = User.query.get(current_user.id)
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
+        if not can_access_branch(current_user, branch_id):
+            return jsonify({'message': 'You can only view required fields for your assigned branch'}), 403
 
-        if user.roleId in [3, 4]:
-            if str(branch_id) != str(user.branchId):
-                return jsonify({'message': 'You can only view required fields for your assigned branch'}), 403
-
-        result = db.session.execute(
-            text('EXEC spGetRequiredFields :branchId'),
-            {'branchId': branch_id}
-        )
-        rows = result.fetchall()
+        rows = procs.rows('spGetRequiredFields', branchId=branch_id)
 
         daily_fields = [row.fieldKey for row in rows if row.formType == 'daily']
         monthly_fields = [row.fieldKey for row in rows if row.formType == 'monthly']
@@ -40,13 +30,8 @@ def get_required_fields(current_user, branch_id):
 @token_required
 def update_required_fields(current_user, branch_id):
     try:
-        user = User.query.get(current_user.id)
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-
-        if user.roleId in [3, 4]:
-            if str(branch_id) != str(user.branchId):
-                return jsonify({'message': 'You can only update required fields for your assigned branch'}), 403
+        if not can_access_branch(current_user, branch_id):
+            return jsonify({'message': 'You can only update required fields for your assigned branch'}), 403
 
         data = request.get_json()
         form_type = data.get('type')
@@ -58,10 +43,7 @@ def update_required_fields(current_user, branch_id):
         # Convert fields list to comma-separated string
         fields_str = ','.join(fields)
 
-        db.session.execute(
-            text('EXEC spUpdateRequiredFields :branchId, :formType, :fields'),
-            {'branchId': branch_id, 'formType': form_type, 'fields': fields_str}
-        )
+        procs.call('spUpdateRequiredFields', branchId=branch_id, formType=form_type, fields=fields_str)
         db.session.commit()
 
         return jsonify({
@@ -1,8 +1,7 @@
 from flask import Blueprint, jsonify
 from models.Role import Role
 from utils.auth import token_required
-from sqlalchemy import text
-from models.db import db
+from utils import procs
 
 role_bp = Blueprint('role', __name__)
 
@@ -10,8 +9,7 @@ role_bp = Blueprint('role', __name__)
 @token_required
 def get_all_roles(current_user):
     try:
-        result = db.session.execute(text('EXEC spGetAllRoles'))
-        rows = result.fetchall()
+        rows = procs.rows('spGetAllRoles')
         roles = [
             {
                 'id': row.id,
@@ -4,8 +4,7 @@ from models.sourceType import SourceType
 from utils.auth import token_required
 from models.branchSource import BranchSource
 from models.branchSourceName import BranchSourceName
-from models.db import db
-from sqlalchemy import text
+from utils import procs
 
 
 
@@ -20,11 +19,7 @@ def my_branch_source_names(current_user):
     branch_id = current_user.branchId
     source_type_id = request.args.get('sourceTypeId', type=int)
 
-    result = db.session.execute(
-        text('EXEC spGetMyBranchSourceNames :branchId, :sourceTypeId'),
-        {'branchId': branch_id, 'sourceTypeId': source_type_id}
-    )
-    rows = result.fetchall()
+    rows = procs.rows('spGetMyBranchSourceNames', branchId=branch_id, sourceTypeId=source_type_id)
     source_names = [
         dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
         for row in rows
@@ -38,11 +33,7 @@ def my_branch_source_types(current_user):
         return jsonify({'message': 'Unauthorized'}), 403
     branch_id = current_user.branchId
 
-    result = db.session.execute(
-        text('EXEC spGetMyBranchSourceTypes :branchId'),
-        {'branchId': branch_id}
-    )
-    rows = result.fetchall()
+    rows = procs.rows('spGetMyBranchSourceTypes', branchId=branch_id)
     source_types = [
         dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
         for row in rows
@@ -1,38 +1,26 @@
+import logging
 from flask import Blueprint, request, jsonify
 from models.db import db
 from models.sourceName import SourceName
 from models.branchSourceName import BranchSourceName
 from models.sourceType import SourceType
-from sqlalchemy import text
-from config import cache
+from utils import procs
+from utils.cache_util import (cached_view, invalidate, branch_source_names_key, branch_source_names_tags,
+                              SOURCE_CHANGED)
 
 source_name_bp = Blueprint('source_name', __name__)
-
-def invalidate_source_name_cache(branch_id, source_type_id):
-    """Clear cache when source name data changes"""
-    # Invalidate branch source names cache
-    cache.delete_memoized('get_source_names_for_branch', branch_id, source_type_id)
-    # Also invalidate other related caches
-    cache.delete_memoized('get_all_source_names')
-    cache.delete_memoized('get_branch_source_names', branch_id, source_type_id)
+logger = logging.getLogger(__name__)
 
 @source_name_bp.route('/api/source-name', methods=['POST'])
 def create_source_name():
     data = request.json
 
-    result = db.session.execute(
-        text('EXEC spCreateSourceName :sourceName, :sourceTypeId, :branchId, :isActive'),
-        {
-            'sourceName': data['sourceName'],
-            'sourceTypeId': data['sourceTypeId'],
-            'branchId': data['branchId'],
-            'isActive': data.get('isActive', True)
-        }
-    )
-    source_name = result.fetchone()
+    source_name = procs.first('spCreateSourceName', sourceName=data['sourceName'],
+                              sourceTypeId=data['sourceTypeId'], branchId=data['branchId'],
+                              isActive=data.get('isActive', True))
     db.session.commit()
 
-    invalidate_source_name_cache(data['branchId'], data['sourceTypeId'])
+    invalidate(SOURCE_CHANGED, branch_id=data['branchId'], source_type_id=data['sourceTypeId'])
 
     if source_name:
         source_name_dict = dict(source_name._mapping) if hasattr(source_name, '_mapping') else dict(source_name)
@@ -41,15 +29,12 @@ def create_source_name():
         return jsonify({'message': 'Failed to create source name'}), 500
 
 @source_name_bp.route('/api/branch/<int:branch_id>/source-names', methods=['GET'])
-@cache.memoize(timeout=600)
+@cached_view(lambda branch_id: branch_source_names_key(branch_id, request.args.get('sourceTypeId', type=int)),
+             timeout=600, tags=branch_source_names_tags)
 def get_source_names_for_branch(branch_id):
     source_type_id = request.args.get('sourceTypeId', type=int)
 
-    result = db.session.execute(
-        text('EXEC spGetSourceNamesForBranch :branchId, :sourceTypeId'),
-        {'branchId': branch_id, 'sourceTypeId': source_type_id}
-    )
-    rows = result.fetchall()
+    rows = procs.rows('spGetSourceNamesForBranch', branchId=branch_id, sourceTypeId=source_type_id)
 
     output = [
         {
@@ -67,16 +52,12 @@ def get_source_names_for_branch(branch_id):
 @source_name_bp.route('/api/source-name/<int:source_name_id>/toggle-active', methods=['PUT'])
 def toggle_source_name_active(source_name_id):
     try:
-        result = db.session.execute(
-            text('EXEC spToggleSourceNameActive :sourceNameId'),
-            {'sourceNameId': source_name_id}
-        )
-        updated = result.fetchone()
+        updated = procs.first('spToggleSourceNameActive', sourceNameId=source_name_id)
         db.session.commit()
 
         if updated:
             updated_dict = dict(updated._mapping) if hasattr(updated, '_mapping') else dict(updated)
-            invalidate_source_name_cache(updated_dict['branchId'], updated_dict['sourceTypeId'])
+            invalidate(SOURCE_CHANGED, branch_id=updated_dict['branchId'], source_type_id=updated_dict['sourceTypeId'])
             return jsonify(updated_dict), 200
         else:
             return jsonify({'message': 'Source name not found'}), 404
@@ -92,29 +73,17 @@ def update_source_name(source_name_id):
     if not new_name:
         return jsonify({'message': 'No new source name provided'}), 400
 
-    conn = db.engine.raw_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute("EXEC spUpdateSourceName ?, ?", (source_name_id, new_name))
-        # Skip any result sets until we get to the SELECT
-        while True:
-            if cursor.description is not None:
-                break
-            if not cursor.nextset():
-                break
-        row = cursor.fetchone()
-        conn.commit()
-        if row:
-            # If you want column names, use cursor.description
-            columns = [col[0] for col in cursor.description]
-            updated_dict = dict(zip(columns, row))
-            invalidate_source_name_cache(updated_dict['branchId'], updated_dict['sourceTypeId'])
+        # The procedure emits row counts before its SELECT; result_sets() skips them
+        result = procs.result_sets('spUpdateSourceName', sourceNameId=source_name_id, sourceName=new_name)
+        db.session.commit()
+        if result and result[0]:
+            updated_dict = result[0][0]
+            invalidate(SOURCE_CHANGED, branch_id=updated_dict['branchId'], source_type_id=updated_dict['sourceTypeId'])
             return jsonify(updated_dict), 200
         else:
             return jsonify({'message': 'Source name not found'}), 404
     except Exception as e:
-        conn.rollback()
-        print('Update error:', e)
+        db.session.rollback()
+        logger.exception('Error in update_source_name')
         return jsonify({'message': f'Failed to update source name: {str(e)}'}), 500
-    finally:
-        conn.close()
\ No newline at end of file
@@ -1,12 +1,18 @@
 from flask import Blueprint, jsonify, request
 from models.User import User
 from models.db import db
-from utils.auth import token_required
-from sqlalchemy import text
+from utils.auth import token_required, evict_principal, revoke_tokens
+from utils.streaming import stream_format, stream_rows
+from utils.serializers import PLAIN_ROWS
+from utils import procs
 from flask_cors import cross_origin
 
 user_bp = Blueprint('user', __name__)
 
+def access_scope(user_id):
+    """(roleId, branchId) as stored, read past the session's identity map"""
+    return tuple(db.session.query(User.roleId, User.branchId).filter(User.id == user_id).first() or ())
+
 @user_bp.route('/api/user/profile', methods=['GET', 'OPTIONS'])
 @cross_origin(origins=["http://localhost:5173", "http://localhost:5174"])
 @token_required
@@ -14,11 +20,7 @@ def get_profile(current_user):
     if request.method == 'OPTIONS':
         return '', 204
     try:
-        result = db.session.execute(
-            text('EXEC spGetUserProfile :userId'),
-            {'userId': current_user.id}
-        )
-        row = result.fetchone()
+        row = procs.first('spGetUserProfile', userId=current_user.id)
         if row:
             user_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
             return jsonify(user_dict)
@@ -32,13 +34,11 @@ def get_profile(current_user):
 @token_required
 def get_all_users(current_user):
     try:
-        result = db.session.execute(text('EXEC spGetAllUsers'))
-        rows = result.fetchall()
-        users = [
-            dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
-            for row in rows
-        ]
-        return jsonify(users)
+        result = procs.call('spGetAllUsers')
+        fmt = stream_format()
+        if fmt:
+            return stream_rows(result, fmt=fmt)
+        return jsonify(PLAIN_ROWS.fetch_all(result))
     except Exception as e:
         return jsonify({'message': f'failed to get users: {str(e)}'}), 500
 
@@ -47,12 +47,9 @@ def get_all_users(current_user):
 @token_required
 def toggle_user_active(current_user, user_id):
     try:
-        result = db.session.execute(
-            text('EXEC spToggleUserActive :userId'),
-            {'userId': user_id}
-        )
-        updated = result.fetchone()
+        updated = procs.first('spToggleUserActive', userId=user_id)
         db.session.commit()
+        revoke_tokens(user_id)
 
         if updated:
             updated_dict = dict(updated._mapping) if hasattr(updated, '_mapping') else dict(updated)
@@ -77,20 +74,16 @@ def update_profile(current_user):
             if field not in data or not data[field].strip():
                 return jsonify({'message': f'Missing or empty required field: {field}'}), 400
 
-        result = db.session.execute(
-            text('EXEC spUpdateUserProfileDetails :userId, :roleName, :username, :firstName, :lastName'),
-            {
-                'userId': current_user.id,
-                'roleName': data['roleName'],
-                'username': data['username'],
-                'firstName': data['firstName'],
-                'lastName': data['lastName']
-            }
-        )
-
-        updated_user = result.fetchone()
-        result.close()
+        before = access_scope(current_user.id)
+        updated_user = procs.first('spUpdateUserProfileDetails', userId=current_user.id,
+                                   roleName=data['roleName'], username=data['username'],
+                                   firstName=data['firstName'], lastName=data['lastName'])
         db.session.commit()
+        if access_scope(current_user.id) != before:
+            # Claims-trusted tokens carry roleId/branchId, so existing tokens must stop working
+            revoke_tokens(current_user.id)
+        else:
+            evict_principal(current_user.id)
 
         if updated_user:
             user_dict = dict(updated_user._mapping) if hasattr(updated_user, '_mapping') else dict(updated_user)
@@ -119,16 +112,7 @@ def change_password(current_user):
             return jsonify({'message': 'Passwords do not match'}), 400
 
         # Call stored procedure to change password
-        result = db.session.execute(
-            text('EXEC spChangeUserPassword :userId, :newPassword'),
-            {
-                'userId': current_user.id,
-                'newPassword': data['password']
-            }
-        )
-
-        success = result.fetchone()
-        result.close()
+        success = procs.first('spChangeUserPassword', userId=current_user.id, newPassword=data['password'])
         db.session.commit()
 
         if success:
@@ -1,107 +1,100 @@
 # MIS-Backend/socket_events.py
+import logging
 from flask_socketio import emit, join_room, leave_room
-from main import socketio
+from config import socketio
 from flask import request
-import json
-from datetime import datetime
+from utils.auth import authenticate
+from utils.realtime import rooms_for, get_live_counters, publish_change
+from utils.metrics import record_emit
+
+logger = logging.getLogger(__name__)
+
+# Principal of every connected client, by Socket.IO session id
+connected_users = {}
 
 
 @socketio.on('connect')
-def handle_connect():
-    print(f'Client connected: {request.sid}')
+def handle_connect(auth=None):
+    """Authenticate with the same JWT as the REST API and join the user's rooms"""
+    token = (auth or {}).get('token') if isinstance(auth, dict) else None
+    current_user, error = authenticate(token)
+    if error:
+        logger.info('Rejected socket connection', extra={'sid': request.sid, 'sampled': True})
+        return False
+
+    connected_users[request.sid] = (current_user.roleId, current_user.branchId)
+    for room in rooms_for(current_user.roleId, current_user.branchId):
+        join_room(room)
+    logger.info('Client connected', extra={'sid': request.sid, 'sampled': True})
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    print(f'Client disconnected: {request.sid}')
+    connected_users.pop(request.sid, None)
+    logger.info('Client disconnected', extra={'sid': request.sid, 'sampled': True})
 
 
 @socketio.on('joinRoom')
 def handle_join_room(data):
-    """Join a room based on user role and branch"""
+    """Join a role/branch room; only admins may follow branches other than their own"""
     try:
-        role = data.get('role')
+        role_id, user_branch_id = connected_users.get(request.sid, (None, None))
         branch_id = data.get('branchId')
+        if role_id is None or not branch_id:
+            return
+        if role_id not in (1, 2) and str(branch_id) != str(user_branch_id):
+            emit('error', {'message': 'You can only join rooms for your assigned branch'})
+            record_emit('error')
+            return
 
-        if role and branch_id:
-            room = f"role_{role}_branch_{branch_id}"
-            join_room(room)
-            print(f'Client {request.sid} joined room: {room}')
-
-            # Also join a general branch room for all users in that branch
-            branch_room = f"branch_{branch_id}"
-            join_room(branch_room)
-            print(f'Client {request.sid} joined branch room: {branch_room}')
+        room = f"role_{role_id}_branch_{branch_id}"
+        join_room(room)
+        branch_room = f"branch_{branch_id}"
+        join_room(branch_room)
+        logger.debug('Client joined rooms', extra={'sid': request.sid, 'rooms': [room, branch_room]})
 
-            emit('roomJoined', {'room': room, 'branchRoom': branch_room})
-    except Exception as e:
-        print(f'Error joining room: {e}')
+        emit('roomJoined', {'room': room, 'branchRoom': branch_room})
+        record_emit('roomJoined')
+    except Exception:
+        logger.exception('Error joining room')
 
 
 @socketio.on('leaveRoom')
 def handle_leave_room(data):
     """Leave a room"""
     try:
-        role = data.get('role')
+        role_id, _ = connected_users.get(request.sid, (None, None))
         branch_id = data.get('branchId')
 
-        if role and branch_id:
-            room = f"role_{role}_branch_{branch_id}"
-            leave_room(room)
-            print(f'Client {request.sid} left room: {room}')
-    except Exception as e:
-        print(f'Error leaving room: {e}')
+        if role_id and branch_id:
+            leave_room(f"role_{role_id}_branch_{branch_id}")
+            leave_room(f"branch_{branch_id}")
+            logger.debug('Client left rooms', extra={'sid': request.sid, 'branchId': branch_id})
+    except Exception:
+        logger.exception('Error leaving room')
 
 
-def notify_approval_status_change(record_id, new_status, branch_id, record_type='daily'):
-    """Notify all users in a branch about approval status change"""
-    try:
-        data = {
-            'recordId': record_id,
-            'status': new_status,
-            'branchId': branch_id,
-            'recordType': record_type,
-            'timestamp': str(datetime.now())
-        }
+@socketio.on('subscribeCounters')
+def handle_subscribe_counters(data=None):
+    """Send the current live counters once; later changes arrive as countersChanged"""
+    role_id, branch_id = connected_users.get(request.sid, (None, None))
+    if role_id is None:
+        return
+    scope = 'all' if role_id in (1, 2) else branch_id
+    emit('countersChanged', {'branchId': scope, **get_live_counters(scope)})
+    record_emit('countersChanged')
 
-        # Emit to all users in the branch
-        room = f"branch_{branch_id}"
-        socketio.emit('approvalStatusChanged', data, room=room)
-        print(f'Approval status change notified to room {room}: {data}')
 
-    except Exception as e:
-        print(f'Error notifying approval status change: {e}')
+def notify_approval_status_change(record_id, new_status, branch_id, record_type='daily'):
+    """Notify all users in a branch about approval status change"""
+    publish_change(record_type, 'approved', branch_id, record_id=record_id, status=new_status)
 
 
-def notify_daily_data_change(branch_id, action='update'):
+def notify_daily_data_change(branch_id, action='update', record_id=None, status=None, changes=None):
     """Notify about daily data changes"""
-    try:
-        data = {
-            'branchId': branch_id,
-            'action': action,
-            'timestamp': str(datetime.now())
-        }
+    publish_change('daily', action, branch_id, record_id=record_id, status=status, changes=changes)
 
-        room = f"branch_{branch_id}"
-        socketio.emit('dailyDataChanged', data, room=room)
-        print(f'Daily data change notified to room {room}: {data}')
 
-    except Exception as e:
-        print(f'Error notifying daily data change: {e}')
-
-
-def notify_monthly_data_change(branch_id, action='update'):
+def notify_monthly_data_change(branch_id, action='update', record_id=None, status=None, changes=None):
     """Notify about monthly data changes"""
-    try:
-        data = {
-            'branchId': branch_id,
-            'action': action,
-            'timestamp': str(datetime.now())
-        }
-
-        room = f"branch_{branch_id}"
-        socketio.emit('monthlyDataChanged', data, room=room)
-        print(f'Monthly data change notified to room {room}: {data}')
-
-    except Exception as e:
-        print(f'Error notifying monthly data change: {e}')
\ No newline at end of file
+    publish_change('monthly', action, branch_id, record_id=record_id, status=status, changes=changes)
@@ -0,0 +1,22 @@
+import os
+
+# An in-memory SQLite app: enough for the pure-Python logic, no SQL Server needed
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.setdefault('REDIS_AVAILABLE', 'false')
+
+import pytest
+from config import cache
+from main import create_app
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        cache.clear()
+        yield
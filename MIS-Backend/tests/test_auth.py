@@ -0,0 +1,38 @@
+import time
+from flask import Flask
+import pytest
+from utils.auth import revoke_tokens, is_revoked, init_auth
+
+
+def test_token_without_revocation_is_valid(app_context):
+    assert not is_revoked({'user_id': 1, 'iat': int(time.time())})
+
+def test_tokens_issued_before_the_revocation_are_rejected(app_context):
+    revoke_tokens(1)
+    assert is_revoked({'user_id': 1, 'iat': int(time.time()) - 5})
+    assert not is_revoked({'user_id': 2, 'iat': int(time.time()) - 5})
+
+def test_token_issued_in_the_revoking_second_stays_valid(app_context, monkeypatch):
+    monkeypatch.setattr(time, 'time', lambda: 1_700_000_000.9)
+    revoke_tokens(1)
+    # e.g. the user logs in again right after a role change
+    assert not is_revoked({'user_id': 1, 'iat': 1_700_000_000})
+    assert is_revoked({'user_id': 1, 'iat': 1_699_999_999})
+
+def test_token_without_iat_is_rejected_once_revoked(app_context):
+    revoke_tokens(1)
+    assert is_revoked({'user_id': 1})
+
+@pytest.mark.parametrize('cache_type', ['simple', 'SimpleCache', 'flask_caching.backends.SimpleCache', 'null'])
+def test_trusted_claims_need_a_shared_cache(cache_type):
+    app = Flask(__name__)
+    app.config.update(AUTH_TRUST_CLAIMS=True, CACHE_TYPE=cache_type)
+    with pytest.raises(RuntimeError):
+        init_auth(app)
+
+def test_trusted_claims_with_redis_or_without_the_option():
+    app = Flask(__name__)
+    app.config.update(AUTH_TRUST_CLAIMS=True, CACHE_TYPE='redis')
+    init_auth(app)
+    app.config.update(AUTH_TRUST_CLAIMS=False, CACHE_TYPE='simple')
+    init_auth(app)
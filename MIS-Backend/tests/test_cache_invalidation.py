@@ -0,0 +1,62 @@
+from config import cache
+from utils.cache_util import (invalidate, invalidate_many, tag_versions, get_tagged, set_tagged, branch_tag,
+                              daily_sums_key, daily_sums_tag, completion_mask_key, completion_mask_tag,
+                              completion_year_tag, completion_matrix_key, branch_sources_tag,
+                              branch_source_names_key, branch_source_name_links_key, BRANCH_LIST_TAG,
+                              DAILY_APPROVED, BRANCH_CHANGED, SOURCE_CHANGED)
+
+DAILY = {'branch_id': 1, 'source_type_id': 2, 'source_name_id': 10, 'record_date': '2024-03-05'}
+
+
+def moved(tags, event, contexts):
+    before = tag_versions(tags)
+    invalidate_many(event, contexts)
+    after = tag_versions(tags)
+    return {tag for tag in tags if before[tag] != after[tag]}
+
+def test_daily_event_deletes_keys_of_its_month(app_context):
+    keys = [daily_sums_key(1, 2, 2024, 3), completion_mask_key(1, 10, 2024, 3), completion_matrix_key(1, 2024)]
+    untouched = daily_sums_key(1, 2, 2024, 4)
+    cache.set_many({key: 'x' for key in keys + [untouched]})
+    invalidate(DAILY_APPROVED, **DAILY)
+    assert [cache.get(key) for key in keys] == [None, None, None]
+    assert cache.get(untouched) == 'x'
+
+def test_daily_event_moves_only_its_own_tags(app_context):
+    tags = [daily_sums_tag(1, 2, 2024, 3), completion_mask_tag(1, 10, 2024, 3), completion_year_tag(1, 2024),
+            daily_sums_tag(1, 2, 2024, 4), completion_year_tag(2, 2024), branch_tag(1)]
+    assert moved(tags, DAILY_APPROVED, [DAILY]) == set(tags[:3])
+
+def test_ids_are_normalised_before_the_rules_run(app_context):
+    tags = [daily_sums_tag(1, 2, 2024, 3)]
+    assert moved(tags, DAILY_APPROVED, [dict(DAILY, branch_id='1', source_type_id='2')]) == set(tags)
+
+def test_branch_change_leaves_other_branches_and_admin_scope(app_context):
+    tags = [branch_tag(1), branch_tag(2), branch_tag('all'), BRANCH_LIST_TAG]
+    assert moved(tags, BRANCH_CHANGED, [{'branch_id': 1}]) == {branch_tag(1), BRANCH_LIST_TAG}
+
+def test_unknown_branch_change_evicts_admin_scope(app_context):
+    tags = [branch_tag('all'), BRANCH_LIST_TAG]
+    assert moved(tags, BRANCH_CHANGED, [{'branch_id': None}]) == set(tags)
+
+def test_source_change_evicts_both_branch_source_name_views(app_context):
+    keys = [branch_source_names_key(1, None), branch_source_names_key(1, 2),
+            branch_source_name_links_key(1, None), branch_source_name_links_key(1, 2)]
+    cache.set_many({key: 'x' for key in keys})
+    assert moved([branch_sources_tag(1)], SOURCE_CHANGED, [{'branch_id': 1, 'source_type_id': 2}])
+    assert [cache.get(key) for key in keys] == [None] * 4
+
+def test_tagged_value_is_served_until_its_tag_moves(app_context):
+    tags = [daily_sums_tag(1, 2, 2024, 3)]
+    set_tagged('entry', 'value', tag_versions(tags))
+    assert get_tagged('entry') == 'value'
+    invalidate(DAILY_APPROVED, **DAILY)
+    assert get_tagged('entry') is None
+
+def test_value_computed_across_an_invalidation_is_not_current(app_context):
+    tags = [completion_mask_tag(1, 10, 2024, 3)]
+    versions = tag_versions(tags)
+    # An approval commits while the value is being computed
+    invalidate(DAILY_APPROVED, **DAILY)
+    set_tagged('entry', 'stale', versions)
+    assert get_tagged('entry') is None
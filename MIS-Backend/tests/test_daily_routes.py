@@ -0,0 +1,38 @@
+import binascii
+from datetime import date, datetime
+import pytest
+from routes.dailyRoutes import encode_cursor, decode_cursor, to_int, bulk_row_values
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(date(2024, 3, 5), 42)) == (date(2024, 3, 5), 42)
+
+def test_cursor_drops_the_time_of_day():
+    assert decode_cursor(encode_cursor(datetime(2024, 3, 5, 13, 30), 7)) == (date(2024, 3, 5), 7)
+
+def test_cursor_for_an_undated_row():
+    assert decode_cursor(encode_cursor(None, 9)) == (None, 9)
+
+@pytest.mark.parametrize('cursor', ['not-base64!', 'bm9waXBl', encode_cursor(date(2024, 1, 1), 'x')])
+def test_malformed_cursor_raises(cursor):
+    with pytest.raises((ValueError, TypeError, binascii.Error)):
+        decode_cursor(cursor)
+
+@pytest.mark.parametrize('value, expected', [(5, 5), ('12', 12), (3.9, 3), (None, None), ('', None), ('abc', None)])
+def test_to_int(value, expected):
+    assert to_int(value) == expected
+
+def test_bulk_row_values_coerces_like_the_procedures():
+    values, invalid = bulk_row_values({'productionVolume': '12.5', 'monthlyId': '', 'isActive': 'true',
+                                       'comment': 7, 'ignored': 'x'})
+    assert invalid is None
+    assert values['productionVolume'] == 12.5
+    assert values['monthlyId'] is None
+    assert values['isActive'] is True
+    assert values['comment'] == '7'
+    assert 'ignored' not in values
+
+@pytest.mark.parametrize('field, value', [('productionVolume', 'abc'), ('spotFlow', 'NaN'),
+                                          ('lineVoltage1', 'inf'), ('isActive', 'maybe'), ('areaId', '1.5')])
+def test_bulk_row_values_names_the_bad_field(field, value):
+    assert bulk_row_values({field: value}) == (None, field)
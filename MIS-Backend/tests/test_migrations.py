@@ -0,0 +1,45 @@
+import pytest
+from utils import migrations
+from utils.migrations import checksum, pending_migrations, split_batches, expected_objects
+
+
+@pytest.fixture
+def scripts(tmp_path, monkeypatch):
+    """Three migration files in a temporary directory, and their checksums as if all were applied"""
+    for name, sql in (('0001_a.sql', 'SELECT 1'), ('0002_b.sql', 'SELECT 2'), ('0003_c.sql', 'SELECT 3'),
+                      ('notes.txt', 'ignored'), ('draft.sql', 'ignored')):
+        (tmp_path / name).write_text(sql, encoding='utf-8')
+    monkeypatch.setattr(migrations, 'MIGRATIONS_DIR', str(tmp_path))
+    return tmp_path, {'0001_a': checksum('SELECT 1'), '0002_b': checksum('SELECT 2'), '0003_c': checksum('SELECT 3')}
+
+def versions(pending):
+    return [version for version, _, _ in pending]
+
+def test_nothing_pending_when_every_checksum_matches(scripts):
+    _, applied = scripts
+    assert pending_migrations(applied) == []
+
+def test_fresh_database_runs_everything_in_order(scripts):
+    assert versions(pending_migrations({})) == ['0001_a', '0002_b', '0003_c']
+
+def test_new_migration_runs_alone(scripts):
+    _, applied = scripts
+    del applied['0003_c']
+    assert versions(pending_migrations(applied)) == ['0003_c']
+
+def test_edited_old_migration_reruns_everything_after_it(scripts):
+    directory, applied = scripts
+    (directory / '0002_b.sql').write_text('SELECT 22', encoding='utf-8')
+    pending = pending_migrations(applied)
+    assert versions(pending) == ['0002_b', '0003_c']
+    assert pending[0][1:] == ('SELECT 22', checksum('SELECT 22'))
+
+def test_split_batches_on_go_lines():
+    sql = 'CREATE TABLE t (go INT)\nGO\n  go ;\nSELECT 1\n\nGO\n'
+    assert split_batches(sql) == ['CREATE TABLE t (go INT)', 'SELECT 1']
+
+def test_expected_objects_cover_what_daily_writes_need():
+    tables, indexes, procedures = expected_objects()
+    assert 'DailyMonthlyRollup' in tables
+    assert {'spRefreshDailyMonthlyRollup', 'spSumDailyFieldsBatch', 'spGetDailyReportsPage'} <= procedures
+    assert ('Daily', 'IX_Daily_Date_Id') in indexes
@@ -0,0 +1,57 @@
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+from utils.serializers import RowSerializer, convert_to_float, number_to_float, column_types
+
+
+class FakeResult:
+    def __init__(self, description, rows):
+        self.cursor = SimpleNamespace(description=description)
+        self.rows = rows
+
+    def keys(self):
+        return [column[0] for column in self.cursor.description]
+
+    def fetchall(self):
+        # Fetching everything soft-closes a real cursor
+        self.cursor = None
+        return self.rows
+
+
+@pytest.mark.parametrize('value, expected', [(None, 0.0), ('', 0.0), ('abc', 0.0), ('1.5', 1.5),
+                                             (Decimal('2.25'), 2.25), (3, 3.0)])
+def test_convert_to_float(value, expected):
+    assert convert_to_float(value) == expected
+
+def test_plain_rows_are_zipped_with_their_keys():
+    assert RowSerializer().serialize(('a', 'b'), [(1, 2), (3, 4)]) == [{'a': 1, 'b': 2}, {'a': 3, 'b': 4}]
+
+def test_empty_batch():
+    assert RowSerializer({'a': convert_to_float}).serialize(('a',), []) == []
+
+def test_numeric_columns_get_the_typed_converter():
+    serializer = RowSerializer({'a': convert_to_float, 'b': convert_to_float})
+    _, plan = serializer.plan(('a', 'b', 'c'), (Decimal, str, int))
+    assert plan == [(0, number_to_float), (1, convert_to_float)]
+
+def test_plan_is_compiled_once_per_shape():
+    serializer = RowSerializer({'a': convert_to_float})
+    assert serializer.plan(('a',), (Decimal,))[1] is serializer.plan(['a'], [Decimal])[1]
+    assert serializer.plan(('a',), (str,))[1] is not serializer.plan(('a',), (Decimal,))[1]
+
+def test_fetch_all_reads_types_before_fetching():
+    description = [('a', Decimal, None, None, None, None, True), ('b', None, None, None, None, None, True)]
+    result = FakeResult(description, [(Decimal('2'), 'bad'), (None, '4')])
+    assert column_types(result) == (Decimal, None)
+    serializer = RowSerializer({'a': convert_to_float, 'b': convert_to_float})
+    assert serializer.fetch_all(result) == [{'a': 2.0, 'b': 0.0}, {'a': 0.0, 'b': 4.0}]
+
+def test_row_converter_matches_serialize():
+    serializer = RowSerializer({'a': convert_to_float})
+    convert = serializer.for_result(FakeResult([('a', Decimal), ('b', str)], []))
+    assert convert((Decimal('1.5'), 'x')) == {'a': 1.5, 'b': 'x'}
+
+def test_unknown_column_types_fall_back_to_the_tolerant_converter():
+    assert column_types(SimpleNamespace()) == ()
+    serializer = RowSerializer({'a': convert_to_float})
+    assert serializer.serialize(('a',), [('oops',)]) == [{'a': 0.0}]
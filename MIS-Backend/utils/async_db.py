@@ -0,0 +1,56 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import text
+from models.db import db
+from utils.serializers import PLAIN_ROWS
+from utils import procs
+from utils.queries import current_tracker, tracking
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Shared worker threads for stored procedure calls, sized by ASYNC_DB_WORKERS"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=current_app.config.get('ASYNC_DB_WORKERS', 8),
+                                               thread_name_prefix='async-db')
+    return _executor
+
+def _run_proc(app, sql, params, tracker=None):
+    # Each call checks out its own pooled connection, so calls never share a transaction
+    with app.app_context(), tracking(tracker):
+        with db.engine.connect() as connection:
+            if sql in procs.registry:
+                proc, statement, bound = procs.prepare(sql, params or {})
+                with procs.observe(proc, bound) as observation:
+                    result = connection.execute(statement, bound)
+                    rows = PLAIN_ROWS.fetch_all(result) if result.returns_rows else []
+                    observation['rows'] = len(rows)
+                return rows
+            result = connection.execute(text(sql), params or {})
+            return PLAIN_ROWS.fetch_all(result) if result.returns_rows else []
+
+def submit_proc(sql, params=None):
+    """Start a registered procedure (by name, keyword params) or a raw query on the executor
+    and return its Future of row dicts"""
+    app = current_app._get_current_object()
+    return get_executor().submit(_run_proc, app, sql, params, current_tracker())
+
+async def run_proc(sql, params=None):
+    """Await a stored procedure without blocking the event loop"""
+    return await asyncio.wrap_future(submit_proc(sql, params))
+
+async def gather_procs(*calls):
+    """Run independent (sql, params) calls concurrently; results come back in call order"""
+    return await asyncio.gather(*(run_proc(sql, params) for sql, params in calls))
+
+def run_procs(*calls):
+    """gather_procs() for synchronous views"""
+    futures = [submit_proc(sql, params) for sql, params in calls]
+    return [future.result() for future in futures]
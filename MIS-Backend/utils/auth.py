@@ -1,23 +1,123 @@
+import inspect
+import time
+from datetime import timedelta
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
 import jwt
+from config import cache
 from models.User import User
+from utils.cache_util import get_tagged, set_tagged, tag_versions, invalidate_tags, user_tag
+
+TOKEN_LIFETIME = timedelta(hours=1)
+PRINCIPAL_TIMEOUT = 60
+PRINCIPAL_FIELDS = ('id', 'roleId', 'areaId', 'branchId', 'userName', 'firstName', 'lastName', 'email', 'isActive')
+BRANCH_SCOPED_ROLES = [3, 4]
+BRANCH_ADMIN_ROLE = 3
+# Cache backends private to one process; a revocation stored there never reaches the other workers
+PROCESS_LOCAL_CACHES = ('simple', 'simplecache', 'null', 'nullcache')
+
+def principal_key(user_id, issued_at):
+    return f'principal:{user_id}:{issued_at}'
+
+def revoked_key(user_id):
+    return f'revoked_user:{user_id}'
+
+def load_principal(data):
+    """Resolve the user behind a decoded token once per request, sharing it briefly across workers"""
+    if 'current_user' in g:
+        return g.current_user
+
+    key = principal_key(data['user_id'], data.get('iat'))
+    fields = get_tagged(key)
+    if fields is not None:
+        # Detached copy of the row; handlers only read the principal's columns
+        current_user = User(**fields)
+    else:
+        versions = tag_versions([user_tag(data['user_id'])])
+        current_user = User.query.get(data['user_id'])
+        if current_user:
+            set_tagged(key, {field: getattr(current_user, field) for field in PRINCIPAL_FIELDS},
+                       versions, timeout=PRINCIPAL_TIMEOUT)
+
+    g.current_user = current_user
+    return current_user
+
+def principal_from_claims(data):
+    """Build the principal from verified token claims without touching the database"""
+    if 'current_user' not in g:
+        g.current_user = User(id=data['user_id'], roleId=data['roleId'], branchId=data['branchId'])
+    return g.current_user
+
+def evict_principal(user_id):
+    """Drop cached principals for a user whose account details just changed"""
+    invalidate_tags(user_tag(user_id))
+
+def revoke_tokens(user_id):
+    """Reject every token issued to the user before this second, e.g. after deactivation"""
+    evict_principal(user_id)
+    # Whole seconds, like the iat claim, so a token issued right after this (re-login) stays valid
+    cache.set(revoked_key(user_id), int(time.time()), timeout=int(TOKEN_LIFETIME.total_seconds()))
+
+def is_revoked(data):
+    revoked_at = cache.get(revoked_key(data['user_id']))
+    return revoked_at is not None and data.get('iat', 0) < revoked_at
+
+def init_auth(app):
+    """Refuse AUTH_TRUST_CLAIMS unless revocations are stored where every worker sees them"""
+    cache_type = str(app.config.get('CACHE_TYPE', 'null')).rsplit('.', 1)[-1].lower()
+    if app.config.get('AUTH_TRUST_CLAIMS') and cache_type in PROCESS_LOCAL_CACHES:
+        raise RuntimeError(
+            f'AUTH_TRUST_CLAIMS needs a shared cache for token revocation, but CACHE_TYPE is {cache_type}. '
+            'Set REDIS_AVAILABLE=true or turn AUTH_TRUST_CLAIMS off.'
+        )
+
+def can_access_branch(current_user, branch_id):
+    """Branch admins and encoders are limited to their assigned branch"""
+    if current_user.roleId in BRANCH_SCOPED_ROLES:
+        return str(branch_id) == str(current_user.branchId)
+    return True
+
+def authenticate(token=None):
+    """(current_user, None) for a valid bearer token, otherwise (None, error response)"""
+    token = token or request.headers.get('Authorization')
+    if not token:
+        return None, (jsonify({'message': 'Token is missing'}), 401)
+    try:
+        token = token.split(' ')[-1]
+        data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+        if current_app.config.get('AUTH_TRUST_CLAIMS') and 'roleId' in data and 'branchId' in data:
+            if is_revoked(data):
+                return None, (jsonify({'message': 'Token has been revoked'}), 401)
+            current_user = principal_from_claims(data)
+        else:
+            current_user = load_principal(data)
+            if not current_user:
+                return None, (jsonify({'message': 'User not found'}), 401)
+            if current_user.isActive is False:
+                return None, (jsonify({'message': 'Account is inactive'}), 401)
+    except Exception:
+        return None, (jsonify({'message': 'Token is invalid'}), 401)
+    return current_user, None
 
 def token_required(f):
+    # Async views stay coroutine functions so Flask runs them on an event loop
+    if inspect.iscoroutinefunction(f):
+        @wraps(f)
+        async def decorated_async(*args, **kwargs):
+            if request.method == 'OPTIONS':
+                return await f(None, *args, **kwargs)
+            current_user, error = authenticate()
+            if error:
+                return error
+            return await f(current_user, *args, **kwargs)
+        return decorated_async
+
     @wraps(f)
     def decorated(*args, **kwargs):
         if request.method == 'OPTIONS':
             return f(None, *args, **kwargs)
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-        try:
-            token = token.split(' ')[1]
-            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
-            if not current_user:
-                return jsonify({'message': 'User not found'}), 401
-        except Exception:
-            return jsonify({'message': 'Token is invalid'}), 401
+        current_user, error = authenticate()
+        if error:
+            return error
         return f(current_user, *args, **kwargs)
-    return decorated
\ No newline at end of file
+    return decorated
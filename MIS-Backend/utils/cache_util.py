@@ -1,9 +1,340 @@
 # utils/cache_utils.py
-from flask_caching import cache
-
-def invalidate_dashboard_cache(user_id, role_id, branch_id):
-    """Clear dashboard cache when data changes"""
-    cache.delete_memoized('dashboard_stats', user_id, role_id, branch_id)
-    cache.delete_memoized('branch_dashboard_stats', user_id, role_id, branch_id)
-    cache.delete_memoized('encoder_dashboard_stats', user_id, role_id, branch_id)
-    cache.delete_memoized('approval_counts', user_id, role_id, branch_id)
\ No newline at end of file
+import time
+from datetime import date, datetime
+from functools import wraps
+from flask import current_app, request
+from config import cache
+from utils.metrics import record_cache
+
+DAILY_SUMS_TIMEOUT = 300
+
+# Domain events that make cached responses stale
+DAILY_CREATED = 'daily_created'
+DAILY_UPDATED = 'daily_updated'
+DAILY_APPROVED = 'daily_approved'
+MONTHLY_CREATED = 'monthly_created'
+MONTHLY_UPDATED = 'monthly_updated'
+MONTHLY_APPROVED = 'monthly_approved'
+BRANCH_CHANGED = 'branch_changed'
+SOURCE_CHANGED = 'source_changed'
+
+DAILY_EVENTS = (DAILY_CREATED, DAILY_UPDATED, DAILY_APPROVED)
+MONTHLY_EVENTS = (MONTHLY_CREATED, MONTHLY_UPDATED, MONTHLY_APPROVED)
+
+ADMIN_ROLES = (1, 2)
+BRANCH_ROLES = (3, 4)
+
+DASHBOARD_VIEWS = ('dashboard_stats', 'branch_dashboard_stats', 'encoder_dashboard_stats', 'approval_counts',
+                   'dashboard_summary')
+
+_invalidation_rules = {}
+_tag_rules = {}
+
+
+def cache_scope(role_id, branch_id):
+    """Admins see every branch, so their cached responses are shared across branches"""
+    return 'all' if role_id in ADMIN_ROLES else branch_id
+
+def user_key(name, current_user, *parts):
+    return ':'.join(str(p) for p in (name, current_user.roleId,
+                                     cache_scope(current_user.roleId, current_user.branchId), *parts))
+
+def role_keys(name, branch_id, *parts):
+    """Every user_key() a change in branch_id can affect"""
+    keys = [':'.join(str(p) for p in (name, role_id, 'all', *parts)) for role_id in ADMIN_ROLES]
+    keys += [':'.join(str(p) for p in (name, role_id, branch_id, *parts)) for role_id in BRANCH_ROLES]
+    return keys
+
+def daily_sums_key(branch_id, source_type_id, year, month):
+    return f'daily_sums:{branch_id}:{source_type_id}:{year}:{month}'
+
+def completion_mask_key(branch_id, source_name_id, year, month):
+    return f'completion_mask:{branch_id}:{source_name_id}:{year}:{month}'
+
+def completion_matrix_key(branch_id, year):
+    return f'completion_matrix:{branch_id}:{year}'
+
+def branch_details_key(branch_id):
+    return f'branch_details:{branch_id}'
+
+def branch_source_names_key(branch_id, source_type_id=None):
+    return f'branch_source_names:{branch_id}:{source_type_id}'
+
+def branch_source_name_links_key(branch_id, source_type_id=None):
+    """Same URL as branch_source_names_key() in the other blueprint, but a different proc and payload"""
+    return f'branch_source_name_links:{branch_id}:{source_type_id}'
+
+
+# Tags group cached entries into namespaces that can be evicted together.
+# 'branch:all' covers admin-scoped entries that aggregate every branch; it only moves
+# for changes that cannot be pinned to one branch.
+def branch_tag(branch_id):
+    return f'branch:{branch_id}'
+
+# Entries that list every branch, which adding, renaming or toggling any one branch changes
+BRANCH_LIST_TAG = 'branchList'
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+def branch_sources_tag(branch_id):
+    """Entries that embed a branch's list of source names"""
+    return f'branchSources:{branch_id}'
+
+def daily_sums_tag(branch_id, source_type_id, year, month):
+    return f'dailySums:{branch_id}:{source_type_id}:{year}:{month}'
+
+def completion_mask_tag(branch_id, source_name_id, year, month):
+    return f'completionMask:{branch_id}:{source_name_id}:{year}:{month}'
+
+def completion_year_tag(branch_id, year):
+    """Every completion entry of a branch and year, e.g. the completion matrix"""
+    return f'completionYear:{branch_id}:{year}'
+
+def _tag_version_key(tag):
+    return f'tag_version:{tag}'
+
+def tag_versions(tags):
+    """Current version of every tag, creating versions for tags seen for the first time"""
+    tags = list(dict.fromkeys(tags))
+    if not tags:
+        return {}
+    versions = dict(zip(tags, cache.get_many(*[_tag_version_key(tag) for tag in tags])))
+    for tag in [tag for tag, version in versions.items() if version is None]:
+        cache.add(_tag_version_key(tag), time.time_ns(), timeout=0)
+        versions[tag] = cache.get(_tag_version_key(tag))
+    return versions
+
+def invalidate_tags(*tags):
+    """Evict every cached entry carrying any of the tags by moving the tag to a new version"""
+    if tags:
+        cache.set_many({_tag_version_key(tag): time.time_ns() for tag in set(tags)}, timeout=0)
+
+def _is_current(versions, current):
+    return all(current.get(tag) == version for tag, version in versions.items())
+
+
+def get_tagged(key):
+    """Cached value for key, or None when it is missing or one of its tags has moved on"""
+    entry = cache.get(key)
+    if entry is None:
+        record_cache(key, False)
+        return None
+    value, versions = entry
+    current = _is_current(versions, tag_versions(versions))
+    record_cache(key, current)
+    return value if current else None
+
+def set_tagged(key, value, versions, timeout=None):
+    """Store value under tag_versions(tags) as read *before* the value was computed.
+
+    Reading the versions after computing would let an invalidation that lands meanwhile
+    stamp the stale value as current.
+    """
+    cache.set(key, (value, versions), timeout=timeout)
+
+
+def cached_view(key_builder, timeout=None, tags=None):
+    """Cache a view's response under an explicit key so invalidation rules can target it.
+
+    key_builder and tags receive the same arguments as the view. Only 200 responses are cached.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            key = key_builder(*args, **kwargs)
+            cached = get_tagged(key)
+            if cached is not None:
+                body, mimetype = cached
+                return current_app.response_class(body, mimetype=mimetype)
+
+            versions = tag_versions(tags(*args, **kwargs) if tags else [])
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                set_tagged(key, (response.get_data(), response.mimetype), versions, timeout=timeout)
+            return response
+        return decorated
+    return decorator
+
+def user_scoped(name, query_arg=None):
+    """Key builder for views whose result depends on the caller's role and branch"""
+    def builder(current_user, *args, **kwargs):
+        if query_arg:
+            return user_key(name, current_user, request.args.get(query_arg, type=int))
+        return user_key(name, current_user)
+    return builder
+
+def user_tags(*extra):
+    """Tag builder matching user_scoped(): the caller's branch scope and role"""
+    def builder(current_user, *args, **kwargs):
+        return [branch_tag(cache_scope(current_user.roleId, current_user.branchId)), *extra]
+    return builder
+
+
+def invalidates(*events):
+    """Register a rule returning the cache keys an event makes stale"""
+    def decorator(f):
+        for event in events:
+            _invalidation_rules.setdefault(event, []).append(f)
+        return f
+    return decorator
+
+def invalidates_tags(*events):
+    """Register a rule returning the cache tags an event makes stale"""
+    def decorator(f):
+        for event in events:
+            _tag_rules.setdefault(event, []).append(f)
+        return f
+    return decorator
+
+def invalidate(event, **context):
+    """Delete exactly the cached entries and tags affected by a domain event"""
+    return invalidate_many(event, [context])
+
+def invalidate_many(event, contexts):
+    """Invalidate one event for a batch of records, deleting the union of their keys and tags once"""
+    keys, tags = set(), set()
+    for context in contexts:
+        context = dict(context)
+        for name in ('branch_id', 'source_type_id', 'source_name_id'):
+            try:
+                context[name] = int(context[name])
+            except (KeyError, ValueError, TypeError):
+                pass
+        for rule in _invalidation_rules.get(event, []):
+            keys.update(key for key in rule(**context) if key)
+        for rule in _tag_rules.get(event, []):
+            tags.update(tag for tag in rule(**context) if tag)
+
+    delete_keys(keys)
+    invalidate_tags(*tags)
+    return keys, tags
+
+def delete_keys(keys):
+    if not keys:
+        return
+    if current_app.config.get('CACHE_TYPE') == 'redis':
+        cache.delete_many(*keys)
+    else:
+        # SimpleCache.delete_many stops at the first key that isn't cached
+        for key in keys:
+            cache.delete(key)
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return value if isinstance(value, (date, datetime)) else None
+
+@invalidates(*DAILY_EVENTS, *MONTHLY_EVENTS)
+def _dashboard_keys(branch_id=None, **context):
+    keys = []
+    for view in DASHBOARD_VIEWS:
+        keys += role_keys(view, branch_id)
+    return keys
+
+def _daily_sums_period(branch_id, source_type_id, record_date):
+    """(branchId, sourceTypeId, year, month) a daily record counts toward, or None"""
+    record_date = _as_date(record_date)
+    if not record_date or not branch_id or not source_type_id:
+        return None
+    try:
+        return int(branch_id), int(source_type_id), record_date.year, record_date.month
+    except (ValueError, TypeError):
+        return None
+
+@invalidates(*DAILY_EVENTS)
+def _daily_sums_keys(branch_id=None, source_type_id=None, record_date=None, **context):
+    period = _daily_sums_period(branch_id, source_type_id, record_date)
+    return [daily_sums_key(*period)] if period else []
+
+@invalidates_tags(*DAILY_EVENTS)
+def _daily_sums_tags(branch_id=None, source_type_id=None, record_date=None, **context):
+    # Also moves the version, so sums computed while the write was committing are not stored as current
+    period = _daily_sums_period(branch_id, source_type_id, record_date)
+    return [daily_sums_tag(*period)] if period else []
+
+@invalidates(*DAILY_EVENTS)
+def _completion_keys(branch_id=None, source_name_id=None, record_date=None, **context):
+    record_date = _as_date(record_date)
+    if not record_date or not branch_id:
+        return []
+    keys = [completion_matrix_key(branch_id, record_date.year)]
+    if source_name_id:
+        keys.append(completion_mask_key(branch_id, source_name_id, record_date.year, record_date.month))
+    return keys
+
+@invalidates_tags(*DAILY_EVENTS)
+def _completion_tags(branch_id=None, source_name_id=None, record_date=None, **context):
+    # Moves the version too, so a mask read while an approval commits is not stored as current
+    record_date = _as_date(record_date)
+    if not record_date or not branch_id:
+        return []
+    tags = [completion_year_tag(branch_id, record_date.year)]
+    if source_name_id:
+        tags.append(completion_mask_tag(branch_id, source_name_id, record_date.year, record_date.month))
+    return tags
+
+@invalidates_tags(BRANCH_CHANGED)
+def _branch_tags(branch_id=None, **context):
+    # This branch's namespace and the branch lists; admin-scoped entries only when the branch is unknown
+    if not branch_id:
+        return [branch_tag('all'), BRANCH_LIST_TAG]
+    return [branch_tag(branch_id), BRANCH_LIST_TAG]
+
+@invalidates_tags(SOURCE_CHANGED)
+def _source_tags(branch_id=None, **context):
+    # Completion matrices are keyed by year, which a source change cannot enumerate
+    return [branch_sources_tag(branch_id)] if branch_id else []
+
+@invalidates(SOURCE_CHANGED)
+def _source_keys(branch_id=None, source_type_id=None, **context):
+    keys = ['source_names_all', branch_details_key(branch_id)]
+    keys += role_keys('source_types', branch_id)
+    for type_filter in {None, source_type_id}:
+        keys.append(branch_source_names_key(branch_id, type_filter))
+        keys.append(branch_source_name_links_key(branch_id, type_filter))
+        keys += role_keys('source_names', branch_id, type_filter)
+    return keys
+
+
+def branch_source_names_tags(branch_id):
+    return [branch_tag(branch_id)]
+
+def daily_sums_tags(branch_id, source_type_id, year, month):
+    return [branch_tag(branch_id), daily_sums_tag(branch_id, source_type_id, year, month)]
+
+def daily_sums_versions(keys):
+    """Tag versions to read before computing the sums of keys and pass to set_cached_daily_sums()"""
+    return tag_versions(tag for key in keys for tag in daily_sums_tags(*key))
+
+def get_cached_daily_sums(keys):
+    """Return {(branchId, sourceTypeId, year, month): sums} for the tuples found in cache"""
+    keys = list(keys)
+    if not keys:
+        return {}
+    entries = {
+        key: entry
+        for key, entry in zip(keys, cache.get_many(*[daily_sums_key(*key) for key in keys]))
+        if entry is not None
+    }
+    current = tag_versions(tag for _, versions in entries.values() for tag in versions)
+    found = {key: sums for key, (sums, versions) in entries.items() if _is_current(versions, current)}
+    record_cache('daily_sums', True, len(found))
+    record_cache('daily_sums', False, len(keys) - len(found))
+    return found
+
+def set_cached_daily_sums(sums_by_key, versions):
+    """Store sums under the versions from daily_sums_versions(), read before they were computed"""
+    if not sums_by_key:
+        return
+    cache.set_many(
+        {
+            daily_sums_key(*key): (sums, {tag: versions[tag] for tag in daily_sums_tags(*key)})
+            for key, sums in sums_by_key.items()
+        },
+        timeout=DAILY_SUMS_TIMEOUT
+    )
@@ -0,0 +1,127 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request
+from utils.queries import REDACTED, SENSITIVE_PARAMETER
+
+# Attributes every LogRecord has; anything else was passed through extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_handler = None
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hand records to the listener thread; when the queue is full, drop and count instead of blocking"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # Resolve the message and traceback on the calling thread, keeping the traceback separate
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+def dropped_records():
+    """Records discarded so far because the log queue was full"""
+    return _handler.dropped if _handler is not None else 0
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the request they were logged from, while still on the request thread"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.endpoint = request.endpoint
+            record.method = request.method
+            user = g.get('current_user')
+            if user is not None:
+                record.userId = getattr(user, 'id', None)
+                record.roleId = getattr(user, 'roleId', None)
+                record.branchId = getattr(user, 'branchId', None)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a share of records logged with extra={'sampled': True}; warnings and errors always pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if getattr(record, 'sampled', False) and record.levelno < logging.WARNING:
+            return random.random() < self.rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra fields are included, sensitive ones masked"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for name, value in vars(record).items():
+            if name in _RECORD_ATTRIBUTES or name == 'sampled':
+                continue
+            entry[name] = REDACTED if SENSITIVE_PARAMETER.search(name) else value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def init_logging(app):
+    """Route every logger through a bounded queue drained by one background thread.
+
+    Request threads only format the message and enqueue it; writing to stdout happens on the
+    listener thread, so slow consoles or pipes never add latency to a request.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if app.config['LOG_FORMAT'] == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    log_queue = queue.Queue(maxsize=app.config['LOG_QUEUE_SIZE'])
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(app.config['LOG_SAMPLE_RATE']))
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    _handler = handler
+    root.setLevel(app.config['LOG_LEVEL'])
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
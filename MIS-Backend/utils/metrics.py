@@ -0,0 +1,155 @@
+import threading
+import time
+from flask import g, request
+from utils.log import dropped_records
+from utils.pool import Histogram, pool_stats
+from utils.procs import registry
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+EXPOSITION_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Counter:
+    """Monotonic counts keyed by a tuple of label values"""
+
+    def __init__(self):
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.values)
+
+
+class HistogramFamily:
+    """One Histogram per tuple of label values, created on first observation"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        histogram = self.histograms.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(labels, Histogram(self.buckets))
+        histogram.observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            items = list(self.histograms.items())
+        return {labels: histogram.snapshot() for labels, histogram in items}
+
+
+request_latency = HistogramFamily(REQUEST_LATENCY_BUCKETS)
+request_count = Counter()
+cache_lookups = Counter()
+socketio_emits = Counter()
+
+
+def cache_name(key):
+    """Metric label for a cache key: its leading segment, e.g. 'dashboard_stats' for 'dashboard_stats:1:all'"""
+    return str(key).split(':', 1)[0]
+
+def record_cache(key, hit, count=1):
+    cache_lookups.inc((cache_name(key), 'hit' if hit else 'miss'), count)
+
+def record_emit(event, count=1):
+    socketio_emits.inc((event,), count)
+
+
+def init_metrics(app):
+    """Time every request by blueprint and endpoint"""
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # Unmatched URLs share one label so scanners cannot grow the series without bound
+            labels = (request.blueprint or '', request.endpoint or 'unmatched', request.method)
+            request_latency.observe(labels, time.perf_counter() - started)
+            request_count.inc(labels + (str(response.status_code),))
+        return response
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _header(lines, name, kind, help_text):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+def _histogram(lines, name, help_text, label_names, snapshots):
+    _header(lines, name, 'histogram', help_text)
+    for values, snapshot in sorted(snapshots.items()):
+        for bound, count in snapshot['buckets'].items():
+            lines.append(f"{name}_bucket{_labels(label_names, values, [('le', bound)])} {count}")
+        lines.append(f"{name}_sum{_labels(label_names, values)} {snapshot['sum']}")
+        lines.append(f"{name}_count{_labels(label_names, values)} {snapshot['count']}")
+
+def _counter(lines, name, help_text, label_names, values):
+    _header(lines, name, 'counter', help_text)
+    for labels, value in sorted(values.items()):
+        lines.append(f'{name}{_labels(label_names, labels)} {value}')
+
+def _gauge(lines, name, help_text, value):
+    _header(lines, name, 'gauge', help_text)
+    lines.append(f'{name} {value}')
+
+def render():
+    """Every metric in the Prometheus text exposition format"""
+    lines = []
+    _histogram(lines, 'mis_http_request_duration_seconds', 'Request latency by blueprint and endpoint.',
+               ('blueprint', 'endpoint', 'method'), request_latency.snapshot())
+    _counter(lines, 'mis_http_requests_total', 'Requests by blueprint, endpoint and status code.',
+             ('blueprint', 'endpoint', 'method', 'status'), request_count.snapshot())
+
+    procs = [(name, proc.stats) for name, proc in sorted(registry.items()) if proc.stats.calls]
+    _histogram(lines, 'mis_db_procedure_duration_seconds', 'Time spent in each stored procedure call.',
+               ('procedure',), {(name, ): stats.latency.snapshot() for name, stats in procs})
+    _counter(lines, 'mis_db_procedure_errors_total', 'Stored procedure calls that raised.',
+             ('procedure',), {(name, ): stats.errors for name, stats in procs})
+    _counter(lines, 'mis_db_procedure_rows_total', 'Rows returned by stored procedures.',
+             ('procedure',), {(name, ): stats.rows for name, stats in procs})
+
+    _counter(lines, 'mis_cache_lookups_total', 'Cache lookups by cached view or entry name and result.',
+             ('cache', 'result'), cache_lookups.snapshot())
+
+    pool = pool_stats()
+    _histogram(lines, 'mis_db_pool_wait_seconds', 'Time spent waiting for a pooled connection.',
+               (), {(): pool['waitTime']})
+    for field, name, help_text in (
+            ('checkouts', 'mis_db_pool_checkouts_total', 'Connections checked out of the pool.'),
+            ('overflowCheckouts', 'mis_db_pool_overflow_checkouts_total', 'Checkouts served by overflow connections.'),
+            ('timeouts', 'mis_db_pool_timeouts_total', 'Checkouts that gave up waiting.'),
+            ('invalidated', 'mis_db_pool_invalidated_total', 'Connections invalidated after errors.')):
+        _counter(lines, name, help_text, (), {(): pool[field]})
+    for field in ('size', 'checkedout', 'overflow'):
+        if field in pool:
+            _gauge(lines, f'mis_db_pool_{field}', f'Current pool {field}.', pool[field])
+    _gauge(lines, 'mis_db_connections_open', 'Pooled connections currently checked out.',
+           pool['connections']['open'])
+    _counter(lines, 'mis_db_connections_leaked_total', 'Connections returned by garbage collection instead of close().',
+             (), {(): pool['connections']['leaked']})
+
+    _counter(lines, 'mis_socketio_emits_total', 'Socket.IO events emitted by this worker.',
+             ('event',), socketio_emits.snapshot())
+    _counter(lines, 'mis_log_records_dropped_total', 'Log records dropped because the log queue was full.',
+             (), {(): dropped_records()})
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,187 @@
+import hashlib
+import logging
+import os
+import re
+from sqlalchemy import text
+from models.db import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+GO_SEPARATOR = re.compile(r'^\s*GO\s*;?\s*$', re.IGNORECASE | re.MULTILINE)
+INDEX_PATTERN = re.compile(r'CREATE\s+(?:UNIQUE\s+)?NONCLUSTERED\s+INDEX\s+(\w+)\s+ON\s+(?:dbo\.)?\[?(\w+)\]?', re.IGNORECASE)
+PROCEDURE_PATTERN = re.compile(r'CREATE\s+OR\s+ALTER\s+PROCEDURE\s+(?:\[?dbo\]?\.)?\[?(\w+)\]?', re.IGNORECASE)
+TABLE_PATTERN = re.compile(r'CREATE\s+TABLE\s+(?:\[?dbo\]?\.)?\[?(\w+)\]?', re.IGNORECASE)
+
+# Every worker runs migrations at startup; they queue on this lock rather than race
+MIGRATION_LOCK = 'SchemaMigrations'
+MIGRATION_LOCK_TIMEOUT_MS = 5 * 60 * 1000
+
+logger = logging.getLogger(__name__)
+
+CREATE_MIGRATIONS_TABLE = """
+IF OBJECT_ID('dbo.SchemaMigrations', 'U') IS NULL
+    CREATE TABLE dbo.SchemaMigrations (
+        version NVARCHAR(255) NOT NULL PRIMARY KEY,
+        checksum CHAR(64) NOT NULL,
+        appliedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+    )
+"""
+
+
+def migration_files():
+    """[(version, path)] for every NNNN_name.sql file, in version order"""
+    return [
+        (name[:-4], os.path.join(MIGRATIONS_DIR, name))
+        for name in sorted(os.listdir(MIGRATIONS_DIR))
+        if name.endswith('.sql') and name[:4].isdigit()
+    ]
+
+def split_batches(sql):
+    """Split a script on GO lines, the way sqlcmd and SSMS do"""
+    return [batch.strip() for batch in GO_SEPARATOR.split(sql) if batch.strip()]
+
+def checksum(sql):
+    return hashlib.sha256(sql.encode('utf-8')).hexdigest()
+
+def applied_migrations(connection):
+    connection.exec_driver_sql(CREATE_MIGRATIONS_TABLE)
+    rows = connection.execute(text('SELECT version, checksum FROM dbo.SchemaMigrations')).fetchall()
+    return {row.version: row.checksum for row in rows}
+
+def acquire_migration_lock(connection):
+    """Take the session-owned applock that serialises migration runs across processes"""
+    result = connection.exec_driver_sql(
+        "SET NOCOUNT ON; DECLARE @result INT; "
+        "EXEC @result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', "
+        "@LockOwner = 'Session', @LockTimeout = ?; SELECT @result",
+        (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT_MS)
+    ).scalar()
+    connection.commit()
+    if result is None or result < 0:
+        raise RuntimeError(f'Could not acquire the migration lock (sp_getapplock returned {result})')
+
+def release_migration_lock(connection):
+    connection.exec_driver_sql("EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'", (MIGRATION_LOCK,))
+    connection.commit()
+
+def pending_migrations(applied):
+    """[(version, sql, checksum)] to run: everything from the first new or changed file onwards.
+
+    A changed file older than the latest applied migration is re-run together with every
+    migration after it, so later scripts still have the last word on what they redefine.
+    """
+    pending = []
+    for version, path in migration_files():
+        with open(path, encoding='utf-8') as f:
+            sql = f.read()
+        digest = checksum(sql)
+        if pending or applied.get(version) != digest:
+            pending.append((version, sql, digest))
+    return pending
+
+def apply_migrations(engine=None):
+    """Apply new or changed migrations, each in its own transaction. Returns the applied versions.
+
+    Every script is written to be re-runnable (CREATE OR ALTER, IF NOT EXISTS), so a
+    migration whose file changed since it was recorded is applied again, followed by
+    every later one. The whole run holds an applock, so concurrent workers wait their turn
+    and then find nothing left to do.
+    """
+    engine = engine or db.engine
+    if engine.dialect.name != 'mssql':
+        logger.warning('Skipping migrations: unsupported database dialect %s', engine.dialect.name)
+        return []
+
+    newly_applied = []
+    with engine.connect() as connection:
+        acquire_migration_lock(connection)
+        try:
+            with connection.begin():
+                applied = applied_migrations(connection)
+
+            for version, sql, digest in pending_migrations(applied):
+                if version in applied:
+                    logger.warning('Re-applying migration %s', version)
+                with connection.begin():
+                    for batch in split_batches(sql):
+                        connection.exec_driver_sql(batch)
+                    connection.execute(text('DELETE FROM dbo.SchemaMigrations WHERE version = :version'),
+                                       {'version': version})
+                    connection.execute(text('INSERT INTO dbo.SchemaMigrations (version, checksum) VALUES (:version, :checksum)'),
+                                       {'version': version, 'checksum': digest})
+                logger.info('Applied migration %s', version)
+                newly_applied.append(version)
+        finally:
+            release_migration_lock(connection)
+
+    missing = verify_migrations(engine)
+    if missing:
+        raise RuntimeError(f"Migrations applied but objects are missing: {', '.join(missing)}")
+    return newly_applied
+
+def expected_objects():
+    """Tables, indexes (table, name) and stored procedures the migration scripts create"""
+    tables, indexes, procedures = set(), set(), set()
+    for _, path in migration_files():
+        with open(path, encoding='utf-8') as f:
+            sql = f.read()
+        tables.update(TABLE_PATTERN.findall(sql))
+        indexes.update((table, name) for name, table in INDEX_PATTERN.findall(sql))
+        procedures.update(PROCEDURE_PATTERN.findall(sql))
+    return tables, indexes, procedures
+
+def verify_migrations(engine=None):
+    """Names of tables, indexes and procedures from the migration scripts that are missing in the database"""
+    engine = engine or db.engine
+    tables, indexes, procedures = expected_objects()
+    missing = []
+    with engine.connect() as connection:
+        for name in sorted(tables):
+            found = connection.execute(
+                text("SELECT OBJECT_ID(:name, 'U')"), {'name': f'dbo.{name}'}
+            ).scalar()
+            if found is None:
+                missing.append(name)
+        for table, name in sorted(indexes):
+            found = connection.execute(
+                text('SELECT 1 FROM sys.indexes WHERE name = :name AND object_id = OBJECT_ID(:table)'),
+                {'name': name, 'table': f'dbo.{table}'}
+            ).fetchone()
+            if not found:
+                missing.append(f'{table}.{name}')
+        for name in sorted(procedures):
+            found = connection.execute(
+                text("SELECT OBJECT_ID(:name, 'P')"), {'name': f'dbo.{name}'}
+            ).scalar()
+            if found is None:
+                missing.append(name)
+    return missing
+
+def require_migrations(engine=None):
+    """Refuse to start against a database the migrations were never applied to.
+
+    Daily writes and sums depend on objects only the migrations create, so without this
+    check the first create, update or approval would fail instead of the deploy.
+    """
+    engine = engine or db.engine
+    if engine.dialect.name != 'mssql':
+        return
+    missing = verify_migrations(engine)
+    if missing:
+        raise RuntimeError(
+            f"Database objects from migrations/ are missing: {', '.join(missing)}. "
+            "Apply them with `python -m utils.migrations` or start with RUN_MIGRATIONS=true."
+        )
+
+
+if __name__ == '__main__':
+    from flask import Flask
+    from config import Config
+
+    # Not main.create_app(): it refuses to start while migrations are still missing
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    with app.app_context():
+        applied = apply_migrations()
+        print(f"{len(applied)} migration(s) applied" if applied else "Database schema is up to date")
@@ -0,0 +1,149 @@
+import threading
+import time
+import weakref
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from models.db import db
+
+# Upper bounds, in seconds, of the connection wait time histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+# Connections held longer than this are reported as suspected leaks
+CONNECTION_LEAK_SECONDS = 30
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus style: counts of observations <= each bound"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+            else:
+                self.counts[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {'buckets': buckets, 'count': self.count, 'sum': round(self.total, 6)}
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.wait_time = Histogram(WAIT_BUCKETS)
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.invalidated = 0
+        # Connections returned to the pool by garbage collection instead of being closed
+        self.leaked_connections = 0
+        # Checked-out connections by id of their pool record: who took them and when
+        self.checked_out = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection and how often they give up"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            # Only giving up on a full pool; failures to open a connection are not timeouts
+            pool_metrics.incr('timeouts')
+            raise
+        finally:
+            pool_metrics.wait_time.observe(time.perf_counter() - started)
+
+
+def engine_options(database_uri, pool_size, max_overflow, pool_recycle, pool_pre_ping, pool_timeout):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured pool; SQLite keeps SQLAlchemy's own pool choice"""
+    options = {'pool_pre_ping': pool_pre_ping, 'pool_recycle': pool_recycle}
+    if database_uri and not database_uri.startswith('sqlite'):
+        options.update(poolclass=TimedQueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                       pool_timeout=pool_timeout)
+    return options
+
+def init_pool_metrics(app):
+    """Attach pool event listeners to the app's engine"""
+    with app.app_context():
+        pool = db.engine.pool
+
+    @event.listens_for(pool, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_metrics.incr('checkouts')
+        overflow = getattr(pool, 'overflow', None)
+        if overflow and overflow() > 0:
+            pool_metrics.incr('overflow_checkouts')
+        connection_record.info['checked_out_by'] = weakref.ref(connection_proxy)
+        pool_metrics.checked_out[id(connection_record)] = {
+            'endpoint': request.endpoint if has_request_context() else None,
+            'openedAt': time.time()
+        }
+
+    @event.listens_for(pool, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        pool_metrics.checked_out.pop(id(connection_record), None)
+        # close() checks in while the proxy handed out at checkout is still alive; when the
+        # garbage collector returns an unclosed connection that proxy is already gone
+        proxy = connection_record.info.pop('checked_out_by', None)
+        if proxy is not None and proxy() is None:
+            pool_metrics.incr('leaked_connections')
+
+    @event.listens_for(pool, 'detach')
+    def on_detach(dbapi_connection, connection_record):
+        pool_metrics.checked_out.pop(id(connection_record), None)
+        connection_record.info.pop('checked_out_by', None)
+
+    @event.listens_for(pool, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        pool_metrics.incr('invalidated')
+
+def pool_stats():
+    pool = db.engine.pool
+    now = time.time()
+    held = list(pool_metrics.checked_out.values())
+    stats = {
+        'pool': type(pool).__name__,
+        'status': pool.status(),
+        'checkouts': pool_metrics.checkouts,
+        'overflowCheckouts': pool_metrics.overflow_checkouts,
+        'timeouts': pool_metrics.timeouts,
+        'invalidated': pool_metrics.invalidated,
+        'waitTime': pool_metrics.wait_time.snapshot(),
+        'connections': {
+            'open': len(held),
+            'leaked': pool_metrics.leaked_connections,
+            'suspectedLeaks': [
+                {'endpoint': info['endpoint'], 'heldSeconds': round(now - info['openedAt'], 1)}
+                for info in held if now - info['openedAt'] > CONNECTION_LEAK_SECONDS
+            ]
+        }
+    }
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
@@ -0,0 +1,314 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from sqlalchemy import text
+from models.db import db
+from utils.pool import Histogram
+from utils.queries import current_tracker, in_procedure, record_slow_query
+from utils.serializers import PLAIN_ROWS
+
+# Upper bounds, in seconds, of the per-procedure latency histogram buckets
+PROC_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class ProcedureParameterError(ValueError):
+    """Arguments that do not match a procedure's declared signature"""
+
+
+# Parameter types: each coerces a request value to what the driver should bind, None stays NULL
+
+def INT(value):
+    return None if value is None or value == '' else int(value)
+
+def FLOAT(value):
+    return None if value is None or value == '' else float(value)
+
+def STR(value):
+    return None if value is None else str(value)
+
+def BOOL(value):
+    if value is None or isinstance(value, bool):
+        return value
+    if str(value).lower() in ('1', 'true'):
+        return True
+    if str(value).lower() in ('0', 'false'):
+        return False
+    raise ValueError(value)
+
+def DATE(value):
+    if value is None or value == '' or isinstance(value, date):
+        return value or None
+    return date.fromisoformat(str(value)[:10])
+
+def JSON(value):
+    return value if value is None or isinstance(value, str) else json.dumps(value, default=str)
+
+def ANY(value):
+    return value
+
+
+class ProcStats:
+    def __init__(self):
+        self.latency = Histogram(PROC_LATENCY_BUCKETS)
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, rows=None, error=False):
+        self.latency.observe(seconds)
+        with self._lock:
+            self.calls += 1
+            self.errors += int(error)
+            self.rows += rows or 0
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'errorRate': round(self.errors / self.calls, 4) if self.calls else 0.0,
+            'rows': self.rows,
+            'latency': self.latency.snapshot()
+        }
+
+
+class Procedure:
+    """A stored procedure's signature and its EXEC statements, built once and reused on every call.
+
+    Arguments are passed by keyword and bound positionally in declaration order (or as
+    @name=value when named=True). Trailing arguments that are not supplied are left off
+    the EXEC so the procedure's own defaults apply; gaps before a supplied one are NULL.
+    """
+
+    def __init__(self, name, params, required=(), named=False):
+        self.name = name
+        self.params = params
+        self.names = tuple(params)
+        self.required = tuple(required)
+        self.named = named
+        self.stats = ProcStats()
+        self._statements = {}
+
+    def statements(self, count):
+        """(SQLAlchemy text, DBAPI qmark SQL) for an EXEC passing the first count parameters"""
+        if count not in self._statements:
+            names = self.names[:count]
+            bind = ', '.join(f'@{name}=:{name}' if self.named else f':{name}' for name in names)
+            driver = ', '.join(f'@{name}=?' if self.named else '?' for name in names)
+            self._statements[count] = (text(f'EXEC {self.name} {bind}'.rstrip()),
+                                       f'EXEC {self.name} {driver}'.rstrip())
+        return self._statements[count]
+
+    def bind(self, values):
+        """(parameter count, coerced bind values) for keyword arguments, checked against the signature"""
+        unknown = sorted(set(values) - set(self.names))
+        if unknown:
+            raise ProcedureParameterError(f'{self.name} got unexpected parameter(s): {", ".join(unknown)}')
+        missing = [name for name in self.required if values.get(name) is None]
+        if missing:
+            raise ProcedureParameterError(f'{self.name} is missing required parameter(s): {", ".join(missing)}')
+
+        count, bound = 0, {}
+        for index, name in enumerate(self.names):
+            if name not in values:
+                continue
+            try:
+                bound[name] = self.params[name](values[name])
+            except (TypeError, ValueError):
+                raise ProcedureParameterError(f'{self.name}: invalid value for {name}: {values[name]!r}')
+            count = index + 1
+        for name in self.names[:count]:
+            bound.setdefault(name, None)
+        return count, bound
+
+
+registry = {}
+
+
+def register(name, required=(), named=False, **params):
+    """Declare a stored procedure; parameters are given in the procedure's own order"""
+    registry[name] = Procedure(name, params, required, named)
+    return registry[name]
+
+def get(name):
+    try:
+        return registry[name]
+    except KeyError:
+        raise ProcedureParameterError(f'Unknown stored procedure: {name}')
+
+def prepare(name, params):
+    """(procedure, SQLAlchemy statement, bind values) for a call"""
+    proc = get(name)
+    count, bound = proc.bind(params)
+    return proc, proc.statements(count)[0], bound
+
+@contextmanager
+def observe(proc, bound=None, raw=False):
+    """Time a call and record it on the procedure; set observation['rows'] when the rows are known.
+
+    Slow calls are logged with their (redacted) arguments. raw=True marks a call made on the
+    DBAPI cursor, which the engine's statement events never see.
+    """
+    observation = {'rows': None}
+    started = time.perf_counter()
+    try:
+        with in_procedure():
+            yield observation
+    except Exception:
+        proc.stats.record(time.perf_counter() - started, error=True)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        record_slow_query(f'EXEC {proc.name}', seconds, bound)
+        tracker = current_tracker()
+        if raw and tracker is not None:
+            tracker.record(f'EXEC {proc.name}', seconds)
+    proc.stats.record(seconds, observation['rows'])
+
+
+def call(name, **params):
+    """Execute in the request's session and return the SQLAlchemy result (for streaming or scalars)"""
+    proc, statement, bound = prepare(name, params)
+    with observe(proc, bound):
+        return db.session.execute(statement, bound)
+
+def rows(name, **params):
+    """All rows of a single-result-set procedure as SQLAlchemy rows"""
+    proc, statement, bound = prepare(name, params)
+    with observe(proc, bound) as observation:
+        result = db.session.execute(statement, bound).fetchall()
+        observation['rows'] = len(result)
+    return result
+
+def first(name, **params):
+    """The first row, or None"""
+    proc, statement, bound = prepare(name, params)
+    with observe(proc, bound) as observation:
+        result = db.session.execute(statement, bound)
+        row = result.fetchone()
+        # Release the cursor so pyodbc can run the next statement on this connection
+        result.close()
+        observation['rows'] = int(row is not None)
+    return row
+
+def fetch_all(name, serializer=PLAIN_ROWS, **params):
+    """All rows as JSON-ready dicts"""
+    proc, statement, bound = prepare(name, params)
+    with observe(proc, bound) as observation:
+        result = serializer.fetch_all(db.session.execute(statement, bound))
+        observation['rows'] = len(result)
+    return result
+
+def result_sets(name, **params):
+    """Every result set of a multi-result-set procedure, as lists of dicts.
+
+    Runs on the session's DBAPI connection, inside the request transaction, because the
+    SQLAlchemy result cannot move to the next set; sets without columns (row count
+    messages) are skipped.
+    """
+    proc = get(name)
+    count, bound = proc.bind(params)
+    driver_sql = proc.statements(count)[1]
+    with observe(proc, bound, raw=True) as observation:
+        cursor = db.session.connection().connection.cursor()
+        try:
+            cursor.execute(driver_sql, [bound[name] for name in proc.names[:count]])
+            sets = []
+            while True:
+                if cursor.description:
+                    columns = [column[0] for column in cursor.description]
+                    sets.append([dict(zip(columns, row)) for row in cursor.fetchall()])
+                if not cursor.nextset():
+                    break
+        finally:
+            cursor.close()
+        observation['rows'] = sum(len(result) for result in sets)
+    return sets
+
+def proc_stats():
+    return {name: proc.stats.snapshot() for name, proc in sorted(registry.items()) if proc.stats.calls}
+
+
+# Procedures called by the API
+
+register('GetDashboardStats', named=True, UserRoleId=INT, UserBranchId=INT)
+register('GetApprovalCounts', named=True, UserRoleId=INT, UserBranchId=INT)
+register('spGetDashboardSummary', named=True, UserRoleId=INT, UserBranchId=INT)
+
+register('spAuthenticateUser', required=('username', 'password'), username=STR, password=STR)
+register('spRegisterUser', required=('userName', 'password', 'roleId'),
+         userName=STR, firstName=STR, lastName=STR, email=STR, password=STR, roleId=INT, areaId=INT, branchId=INT)
+register('spGetUserProfile', required=('userId',), userId=INT)
+register('spGetAllUsers')
+register('spToggleUserActive', required=('userId',), userId=INT)
+register('spUpdateUserProfileDetails', required=('userId',),
+         userId=INT, roleName=STR, username=STR, firstName=STR, lastName=STR)
+register('spChangeUserPassword', required=('userId', 'newPassword'), userId=INT, newPassword=STR)
+register('spGetAllRoles')
+register('spGetAllStatus')
+
+register('spCreateBranch', required=('areaId', 'branchName'), areaId=INT, branchName=STR, isActive=BOOL)
+register('spAddBranchWithSources', required=('areaId', 'branchName'), areaId=INT, branchName=STR, sourceTypeIds=STR)
+register('spGetBranchDetails', required=('branchId',), branchId=INT)
+register('spToggleBranchActive', required=('branchId',), branchId=INT)
+register('spCreateBranchSource', required=('branchId', 'sourceTypeId'), branchId=INT, sourceTypeId=INT, isActive=BOOL)
+register('spGetBranchSourceNames', branchId=INT, sourceTypeId=INT)
+register('spCreateBranchSourceName', required=('branchId', 'sourceNameId'),
+         branchId=INT, sourceNameId=INT, isActive=BOOL)
+register('spGetMyBranchSourceNames', branchId=INT, sourceTypeId=INT)
+register('spGetMyBranchSourceTypes', branchId=INT)
+register('spGetRequiredFields', required=('branchId',), branchId=INT)
+register('spUpdateRequiredFields', required=('branchId', 'formType'), branchId=INT, formType=STR, fields=STR)
+
+register('spGetAllSourceTypes', roleId=INT, branchId=INT)
+register('spGetAllSourceNames', roleId=INT, branchId=INT, sourceTypeId=INT)
+# The two endpoints that create source names historically passed these in different orders;
+# binding by name is correct whichever order the procedure declares them in
+register('spCreateSourceName', required=('sourceName', 'sourceTypeId', 'branchId'), named=True,
+         sourceName=STR, sourceTypeId=INT, branchId=INT, isActive=BOOL)
+register('spGetSourceNamesForBranch', branchId=INT, sourceTypeId=INT)
+register('spToggleSourceNameActive', required=('sourceNameId',), sourceNameId=INT)
+register('spUpdateSourceName', required=('sourceNameId', 'sourceName'), sourceNameId=INT, sourceName=STR)
+
+DAILY_MEASUREMENTS = dict(
+    productionVolume=FLOAT, operationHours=FLOAT, serviceInterruption=FLOAT, totalHoursServiceInterruption=FLOAT,
+    electricityConsumption=FLOAT, VFDFrequency=FLOAT, spotFlow=FLOAT, spotPressure=FLOAT,
+    timeSpotMeasurements=FLOAT, lineVoltage1=FLOAT, lineVoltage2=FLOAT, lineVoltage3=FLOAT,
+    lineCurrent1=FLOAT, lineCurrent2=FLOAT, lineCurrent3=FLOAT
+)
+register('spGetAllDailyReports', userId=INT, roleId=INT)
+register('spGetDailyReportsPage',
+         userRoleId=INT, userBranchId=INT, branchId=INT, sourceTypeId=INT, sourceNameId=INT, statusId=INT,
+         statusName=STR, dateFrom=DATE, dateTo=DATE, cursorDate=DATE, cursorId=INT, pageSize=INT, countOnly=INT)
+register('spGetDailyById', required=('dailyId',), dailyId=INT)
+register('spCreateDaily', required=('sourceType', 'sourceName', 'byUser', 'date', 'branchId'),
+         monthlyId=INT, sourceType=INT, sourceName=INT, byUser=INT, date=DATE, **DAILY_MEASUREMENTS,
+         comment=STR, isActive=BOOL, branchId=INT, areaId=INT)
+register('spCreateDailyBatch', required=('rows', 'byUser'), rows=JSON, byUser=INT)
+register('spUpdateDaily', required=('id',), id=INT, **DAILY_MEASUREMENTS, comment=STR, status=ANY, isActive=BOOL)
+register('spApproveDailyData', required=('daily_id',), daily_id=INT, status=ANY, remarks=STR)
+register('spApproveDailyBatch', required=('ids', 'status'), ids=JSON, status=INT)
+register('spRefreshDailyMonthlyRollup', required=('keys',), keys=JSON)
+register('spSumDailyFieldsBatch', required=('requests',), requests=JSON)
+
+register('spGetAllMonthly', userId=INT, roleId=INT)
+register('spGetFilteredMonthly', userId=INT, roleId=INT, sourceTypeId=INT, branchId=INT)
+register('spCreateMonthly', required=('branchId', 'byUser'),
+         branchId=INT, sourceType=INT, sourceName=INT, status=INT, byUser=INT, month=ANY, year=INT,
+         productionVolume=FLOAT, operationHours=FLOAT, serviceInterruption=FLOAT,
+         totalHoursServiceInterruption=FLOAT, electricityConsumption=FLOAT, electricityCost=FLOAT,
+         bulkCost=FLOAT, bulkOuttake=STR, bulkProvider=STR, WTPCost=FLOAT, WTPSource=STR, WTPVolume=FLOAT,
+         disinfectionMode=STR, disinfectantCost=FLOAT, disinfectionAmount=FLOAT, disinfectionBrandType=STR,
+         otherTreatmentCost=FLOAT, emergencyLitersConsumed=FLOAT, emergencyFuelCost=FLOAT,
+         emergencyTotalHoursUsed=FLOAT, gensetLitersConsumed=FLOAT, gensetFuelCost=FLOAT,
+         isActive=BOOL, comment=STR)
+register('spGetApprovalMonthlyData')
+register('spGetEncoderMonthlyData', branch_id=INT)
+register('spApproveMonthlyData', required=('monthly_id',), monthly_id=INT, status=ANY, remarks=STR, comment=STR)
+register('spApproveMonthlyBatch', required=('ids', 'status'), ids=JSON, status=INT)
+MONTHLY_ACCESS = dict(monthly_id=INT, user_id=INT, user_role_id=INT, user_branch_id=INT)
+register('spGetMonthlyById', required=('monthly_id',), **MONTHLY_ACCESS)
+register('spGetMonthlyByIdWithRoles', required=('monthly_id',), **MONTHLY_ACCESS)
+register('spUpdateMonthlyRecord', required=('monthly_id',), **MONTHLY_ACCESS, data_json=JSON)
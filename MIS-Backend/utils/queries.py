@@ -0,0 +1,247 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from models.db import db
+
+# Statements longer than this are cut when a shape is logged
+SHAPE_LOG_LENGTH = 200
+# Captured parameter values longer than this are cut
+PARAMETER_LOG_LENGTH = 200
+SLOW_QUERY_FILE_BYTES = 5 * 1024 * 1024
+SLOW_QUERY_FILE_BACKUPS = 5
+REDACTED = '[redacted]'
+# Parameter names whose values never reach the slow query log
+SENSITIVE_PARAMETER = re.compile(r'pass|pwd|secret|token', re.IGNORECASE)
+
+_STRING_LITERAL = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMETER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_local = threading.local()
+logger = logging.getLogger(__name__)
+
+
+def query_shape(statement):
+    """Statement with literals and parameter lists collapsed, so repeats of one query compare equal"""
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _PARAMETER_LIST.sub('(?, ...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryTracker:
+    """Statements executed on behalf of one request, with their total time and repeated shapes"""
+
+    def __init__(self, endpoint=None, request_globals=None):
+        # Kept so statements run on executor threads can still be attributed to the caller
+        self.endpoint = endpoint
+        self.request_globals = request_globals
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement, seconds):
+        shape = query_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def repeated(self, threshold):
+        """(shape, count) for every shape run at least threshold times, most repeated first"""
+        with self._lock:
+            return sorted(((shape, count) for shape, count in self.shapes.items() if count >= threshold),
+                          key=lambda item: -item[1])
+
+
+def current_tracker():
+    """The tracker of the request being served, also inside executor threads working for it"""
+    tracker = getattr(_local, 'tracker', None)
+    if tracker is None and has_request_context():
+        tracker = g.get('query_tracker')
+    return tracker
+
+@contextmanager
+def in_procedure():
+    """Statements run inside are logged by the procedure call itself, under its parameter names"""
+    previous = getattr(_local, 'procedure', False)
+    _local.procedure = True
+    try:
+        yield
+    finally:
+        _local.procedure = previous
+
+@contextmanager
+def tracking(tracker):
+    """Attribute statements run on this thread to tracker, e.g. in an async_db worker"""
+    previous = getattr(_local, 'tracker', None)
+    _local.tracker = tracker
+    try:
+        yield tracker
+    finally:
+        _local.tracker = previous
+
+
+class SlowQueryLog:
+    """The most recent slow statements in a bounded ring, optionally mirrored to a rotating file"""
+
+    def __init__(self, size=200):
+        self.entries = deque(maxlen=size)
+        self.file_logger = None
+        self._lock = threading.Lock()
+
+    def configure(self, size, path=None):
+        with self._lock:
+            self.entries = deque(self.entries, maxlen=size)
+        if path and self.file_logger is None:
+            file_logger = logging.getLogger('mis.slow_queries')
+            file_logger.setLevel(logging.INFO)
+            file_logger.propagate = False
+            file_logger.addHandler(RotatingFileHandler(path, maxBytes=SLOW_QUERY_FILE_BYTES,
+                                                       backupCount=SLOW_QUERY_FILE_BACKUPS))
+            self.file_logger = file_logger
+
+    def add(self, entry):
+        with self._lock:
+            self.entries.append(entry)
+        if self.file_logger:
+            self.file_logger.info(json.dumps(entry, default=str))
+
+    def snapshot(self, limit=None):
+        """Newest first"""
+        with self._lock:
+            entries = list(self.entries)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+
+slow_query_log = SlowQueryLog()
+
+
+def _loggable(value):
+    if isinstance(value, (bytes, bytearray)):
+        return f'<{len(value)} bytes>'
+    if isinstance(value, str) and len(value) > PARAMETER_LOG_LENGTH:
+        return value[:PARAMETER_LOG_LENGTH] + '...'
+    return value if value is None or isinstance(value, (int, float, bool)) else str(value)
+
+def redact(params):
+    """Parameters safe to log: sensitive names are masked, long values cut"""
+    if isinstance(params, dict):
+        return {name: REDACTED if SENSITIVE_PARAMETER.search(str(name)) else _loggable(value)
+                for name, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_loggable(value) for value in params]
+    return None
+
+def _caller():
+    """(endpoint, roleId, branchId) of the request a statement runs for, when there is one"""
+    tracker = current_tracker()
+    if has_request_context():
+        endpoint, request_globals = request.endpoint, g
+    elif tracker is not None:
+        endpoint, request_globals = tracker.endpoint, tracker.request_globals
+    else:
+        return None, None, None
+    user = getattr(request_globals, 'current_user', None)
+    return endpoint, getattr(user, 'roleId', None), getattr(user, 'branchId', None)
+
+def record_slow_query(statement, seconds, params=None):
+    """Add a statement to the slow query log when it ran past SLOW_QUERY_SECONDS and is sampled"""
+    if not has_app_context():
+        return
+    config = current_app.config
+    if seconds < config['SLOW_QUERY_SECONDS'] or random.random() >= config['SLOW_QUERY_SAMPLE_RATE']:
+        return
+    endpoint, role_id, branch_id = _caller()
+    slow_query_log.add({
+        'at': datetime.utcnow().isoformat() + 'Z',
+        'ms': round(seconds * 1000, 1),
+        'statement': _WHITESPACE.sub(' ', statement).strip()[:SHAPE_LOG_LENGTH],
+        'params': redact(params),
+        'endpoint': endpoint,
+        'roleId': role_id,
+        'branchId': branch_id
+    })
+
+def _statement_params(context, parameters, executemany):
+    """Bound values by name where the compiled statement knows them, otherwise positionally"""
+    if executemany:
+        return {'rows': len(parameters)}
+    names = getattr(getattr(context, 'compiled', None), 'positiontup', None)
+    if names and isinstance(parameters, (list, tuple)) and len(names) == len(parameters):
+        return dict(zip(names, parameters))
+    return parameters
+
+
+def _query_fields(tracker, repeated):
+    return {
+        'queries': tracker.count,
+        'dbMs': round(tracker.seconds * 1000, 1),
+        'repeated': [{'count': count, 'shape': shape[:SHAPE_LOG_LENGTH]} for shape, count in repeated]
+    }
+
+def init_query_tracking(app):
+    """Count statements and database time per request and flag repeated query shapes (N+1).
+
+    Outside production the totals go out as response headers; in production a sample of
+    requests, and every request with a repeated shape, is logged instead. Statements slower
+    than SLOW_QUERY_SECONDS also go to the slow query log.
+    """
+    with app.app_context():
+        engine = db.engine
+    slow_query_log.configure(app.config['SLOW_QUERY_LOG_SIZE'], app.config.get('SLOW_QUERY_LOG_FILE'))
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['query_started'].pop()
+        tracker = current_tracker()
+        if tracker is not None:
+            tracker.record(statement, seconds)
+        if not getattr(_local, 'procedure', False):
+            record_slow_query(statement, seconds, _statement_params(context, parameters, executemany))
+
+    @event.listens_for(engine, 'handle_error')
+    def failed_query(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('query_started'):
+            connection.info['query_started'].pop()
+
+    @app.before_request
+    def start_tracking():
+        g.query_tracker = QueryTracker(request.endpoint, g._get_current_object())
+
+    @app.after_request
+    def report_queries(response):
+        tracker = g.pop('query_tracker', None)
+        if tracker is None:
+            return response
+        repeated = tracker.repeated(current_app.config['N_PLUS_ONE_THRESHOLD'])
+
+        if current_app.config.get('FLASK_ENV') != 'production':
+            response.headers['X-DB-Query-Count'] = str(tracker.count)
+            response.headers['X-DB-Query-Time'] = f'{tracker.seconds * 1000:.1f}'
+            response.headers['Server-Timing'] = f'db;dur={tracker.seconds * 1000:.1f};desc="{tracker.count} queries"'
+            if repeated:
+                response.headers['X-DB-Repeated-Queries'] = ', '.join(str(count) for _, count in repeated)
+        if repeated:
+            logger.warning('Repeated query shapes (likely N+1)', extra=_query_fields(tracker, repeated))
+        elif (current_app.config.get('FLASK_ENV') == 'production'
+              and random.random() < current_app.config['QUERY_LOG_SAMPLE_RATE']):
+            logger.info('Request queries', extra=_query_fields(tracker, repeated))
+        return response
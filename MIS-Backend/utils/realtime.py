@@ -0,0 +1,181 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func
+from config import cache, socketio
+from models.db import db
+from models.Daily import Daily
+from models.Monthly import Monthly
+from utils.metrics import record_cache, record_emit
+
+PENDING_STATUS = 2
+LIVE_COUNTERS_TIMEOUT = 3600
+ADMIN_ROOM = 'branch_all'
+ROLES = (1, 2, 3, 4)
+
+logger = logging.getLogger(__name__)
+
+
+def branch_room(branch_id):
+    return f'branch_{branch_id}'
+
+def role_room(role_id, branch_id):
+    return f'role_{role_id}_branch_{branch_id}'
+
+def rooms_for(role_id, branch_id):
+    """Rooms a connected user belongs to; admins follow every branch"""
+    if role_id in (1, 2):
+        return [ADMIN_ROOM, role_room(role_id, 'all')]
+    return [branch_room(branch_id), role_room(role_id, branch_id)]
+
+def branch_audience(branch_id):
+    """Every room that should hear about a change in branch_id"""
+    return [branch_room(branch_id), ADMIN_ROOM] + [role_room(role_id, branch_id) for role_id in ROLES]
+
+
+def live_counters_key(branch_id):
+    return f'live_counters:{branch_id}'
+
+def count_pending(branch_ids):
+    """Pending daily and monthly records for the given branches, read through the filtered pending indexes"""
+    branch_ids = list(branch_ids)
+    counters = {branch_id: {'pendingDaily': 0, 'pendingMonthly': 0} for branch_id in branch_ids}
+    if not branch_ids:
+        return counters
+    for form, model in (('daily', Daily), ('monthly', Monthly)):
+        query = (db.session.query(model.branchId, func.count(model.id))
+                 .filter(model.status == PENDING_STATUS, model.branchId.in_(branch_ids))
+                 .group_by(model.branchId))
+        for row_branch_id, count in query:
+            counters.setdefault(row_branch_id, {'pendingDaily': 0, 'pendingMonthly': 0})
+            counters[row_branch_id]['pending' + form.capitalize()] = count
+    return counters
+
+def count_pending_totals():
+    """Pending daily and monthly records across every branch; a plain count, no per-branch grouping"""
+    return {
+        'pendingDaily': db.session.query(func.count(Daily.id)).filter(Daily.status == PENDING_STATUS).scalar(),
+        'pendingMonthly': db.session.query(func.count(Monthly.id)).filter(Monthly.status == PENDING_STATUS).scalar()
+    }
+
+def refresh_live_counters(branch_ids):
+    """Recount after committed changes and store the counters of the given branches and the admin totals"""
+    by_branch = count_pending(branch_ids)
+    totals = count_pending_totals()
+    cache.set_many({**{live_counters_key(branch_id): counters for branch_id, counters in by_branch.items()},
+                    live_counters_key('all'): totals}, timeout=LIVE_COUNTERS_TIMEOUT)
+    return by_branch, totals
+
+def get_live_counters(branch_id):
+    """Current counters for a branch ('all' for admins), counted on first use"""
+    counters = cache.get(live_counters_key(branch_id))
+    record_cache(live_counters_key(branch_id), counters is not None)
+    if counters is None:
+        counters = count_pending_totals() if branch_id == 'all' else count_pending([branch_id])[branch_id]
+        cache.set(live_counters_key(branch_id), counters, timeout=LIVE_COUNTERS_TIMEOUT)
+    return counters
+
+
+_pending_changes = queue.Queue()
+_emitter_lock = threading.Lock()
+_emitter_started = False
+
+
+def start_emitter(app):
+    """Start the background task that recounts and emits queued changes (once per process)"""
+    global _emitter_started
+    with _emitter_lock:
+        if not _emitter_started:
+            socketio.start_background_task(_emit_changes, app)
+            _emitter_started = True
+
+def _emit_changes(app):
+    while True:
+        batch = [_pending_changes.get()]
+        # Collect whatever else arrives within the window so a burst goes out as one event
+        deadline = time.monotonic() + app.config.get('SOCKETIO_COALESCE_WINDOW', 0.25)
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(_pending_changes.get(timeout=remaining) if remaining > 0
+                             else _pending_changes.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            with app.app_context():
+                emit_changes(batch)
+        finally:
+            for _ in batch:
+                _pending_changes.task_done()
+
+def flush_changes():
+    """Block until every queued change has been emitted (tests and load tests)"""
+    _pending_changes.join()
+
+def publish_change(record_type, action, branch_id, record_id=None, status=None, changes=None):
+    """Queue a committed daily/monthly change for the emitter; returns without waiting on the
+    recount or the message queue so the request is never held up by its subscribers."""
+    start_emitter(current_app._get_current_object())
+    _pending_changes.put({'recordType': record_type, 'action': action, 'branchId': branch_id,
+                          'recordId': record_id, 'status': status, 'changes': changes or {},
+                          'timestamp': datetime.utcnow().isoformat()})
+
+def coalesce(batch):
+    """One summary per (record type, branch): the rooms and event name are the same for all of them"""
+    summaries = {}
+    for change in batch:
+        try:
+            branch_id = int(change['branchId'])
+        except (TypeError, ValueError):
+            logger.warning('Skipping change without a branch',
+                           extra={'recordType': change['recordType'], 'recordId': change['recordId']})
+            continue
+        summary = summaries.setdefault((change['recordType'], branch_id), {
+            'recordType': change['recordType'], 'branchId': branch_id, 'actions': [],
+            'recordIds': [], 'statuses': {}, 'count': 0
+        })
+        summary['count'] += 1
+        if change['action'] not in summary['actions']:
+            summary['actions'].append(change['action'])
+        for record_id in [change['recordId']] + list(change['changes'].get('ids', [])):
+            if record_id is not None and record_id not in summary['recordIds']:
+                summary['recordIds'].append(record_id)
+            if record_id is not None and change['status'] is not None:
+                summary['statuses'][record_id] = change['status']
+        summary['timestamp'] = change['timestamp']
+        # A lone change keeps its single-record fields
+        summary['single'] = change if summary['count'] == 1 else None
+    return list(summaries.values())
+
+def emit_changes(batch):
+    """Push one delta per (record type, branch) for a window of committed changes, then the new counters.
+
+    Failures are logged and swallowed: the changes are already committed and clients
+    can always fall back to fetching.
+    """
+    try:
+        summaries = coalesce(batch)
+        if not summaries:
+            return
+        by_branch, totals = refresh_live_counters({summary['branchId'] for summary in summaries})
+        for summary in summaries:
+            single = summary.pop('single')
+            delta = {
+                **summary,
+                'action': summary['actions'][0] if len(summary['actions']) == 1 else 'batch',
+                'recordId': single['recordId'] if single else None,
+                'status': single['status'] if single else None,
+                'changes': single['changes'] if single else {}
+            }
+            socketio.emit(f"{summary['recordType']}DataChanged", delta, to=branch_audience(summary['branchId']))
+            record_emit(f"{summary['recordType']}DataChanged")
+        for branch_id, counters in by_branch.items():
+            socketio.emit('countersChanged', {'branchId': branch_id, **counters},
+                          to=[room for room in branch_audience(branch_id) if room != ADMIN_ROOM])
+        socketio.emit('countersChanged', {'branchId': 'all', **totals}, to=ADMIN_ROOM)
+        record_emit('countersChanged', len(by_branch) + 1)
+    except Exception:
+        logger.exception('Error publishing changes')
@@ -0,0 +1,59 @@
+from datetime import date, datetime
+from utils import procs
+from models.db import db
+from models.DailyMonthlyRollup import DailyMonthlyRollup
+from utils.cache_util import (completion_mask_key, completion_mask_tag, completion_year_tag, get_tagged, set_tagged,
+                              tag_versions)
+
+
+def rollup_key(branch_id, source_type_id, source_name_id, record_date):
+    """(branchId, sourceType, sourceName, year, month) of a daily record, or None if incomplete"""
+    if isinstance(record_date, str):
+        try:
+            record_date = date.fromisoformat(record_date[:10])
+        except ValueError:
+            return None
+    if not isinstance(record_date, (date, datetime)):
+        return None
+    try:
+        return int(branch_id), int(source_type_id), int(source_name_id), record_date.year, record_date.month
+    except (ValueError, TypeError):
+        return None
+
+def refresh_rollups(keys):
+    """Recompute DailyMonthlyRollup rows in the caller's transaction; commit afterwards"""
+    keys = {key for key in keys if key}
+    if not keys:
+        return
+    procs.call('spRefreshDailyMonthlyRollup', keys=[
+        {'branchId': branch_id, 'sourceType': source_type, 'sourceName': source_name, 'year': year, 'month': month}
+        for branch_id, source_type, source_name, year, month in keys
+    ])
+
+
+COMPLETION_MASK_TIMEOUT = 3600
+
+def month_mask(days_in_month):
+    """Mask with one bit set for every day of the month"""
+    return (1 << days_in_month) - 1
+
+def mask_days(mask):
+    """Days of the month whose bit is set in mask"""
+    return [day for day in range(1, 32) if mask >> (day - 1) & 1]
+
+def missing_days(mask, days_in_month):
+    return mask_days(~mask & month_mask(days_in_month))
+
+def get_completion_mask(branch_id, source_name_id, year, month):
+    """Accepted-days bitmap for one source name and month, mirrored in cache"""
+    key = completion_mask_key(branch_id, source_name_id, year, month)
+    mask = get_tagged(key)
+    if mask is None:
+        versions = tag_versions([completion_mask_tag(branch_id, source_name_id, year, month),
+                                 completion_year_tag(branch_id, year)])
+        mask = 0
+        for (row_mask,) in db.session.query(DailyMonthlyRollup.acceptedDaysMask).filter_by(
+                branchId=branch_id, sourceName=source_name_id, year=year, month=month):
+            mask |= row_mask or 0
+        set_tagged(key, mask, versions, timeout=COMPLETION_MASK_TIMEOUT)
+    return mask
@@ -0,0 +1,99 @@
+from decimal import Decimal
+import pytz
+
+MANILA_TZ = pytz.timezone("Asia/Manila")
+
+
+def convert_to_float(value):
+    """Numeric column as float; missing, blank or malformed values become 0.0"""
+    if value is None:
+        return 0.0
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+def number_to_float(value):
+    """convert_to_float for columns the driver reports as numeric, which need no parsing or error handling"""
+    return 0.0 if value is None else float(value)
+
+def to_manila_iso(value):
+    """Stored UTC timestamps rendered in Manila time"""
+    if not value:
+        return value
+    return value.replace(tzinfo=pytz.UTC).astimezone(MANILA_TZ).isoformat()
+
+
+# Cheaper stand-ins for a converter, keyed by the Python type the driver reports for the column
+TYPED_CONVERTERS = {
+    convert_to_float: {Decimal: number_to_float, float: number_to_float, int: number_to_float}
+}
+
+def column_types(result):
+    """Python type pyodbc reports for each column in cursor.description, or None where it does not say"""
+    description = getattr(getattr(result, 'cursor', None), 'description', None) or ()
+    return tuple(column[1] if isinstance(column[1], type) else None for column in description)
+
+
+class RowSerializer:
+    """Turn stored procedure rows into dicts, converting selected columns.
+
+    The column plan is compiled once per result shape (its column names and reported
+    types), so rows are converted by position instead of looking up every key on every
+    row, and each column gets the cheapest converter its type allows.
+    """
+
+    def __init__(self, converters=None):
+        self.converters = dict(converters or {})
+        self._plans = {}
+
+    def plan(self, keys, types=()):
+        """[(index, converter)] for the columns of this shape that need converting"""
+        keys, types = tuple(keys), tuple(types)
+        plan = self._plans.get((keys, types))
+        if plan is None:
+            plan = self._plans[keys, types] = [
+                (index, self.column_converter(self.converters[key], types[index] if index < len(types) else None))
+                for index, key in enumerate(keys) if key in self.converters
+            ]
+        return keys, plan
+
+    @staticmethod
+    def column_converter(converter, type_code):
+        return TYPED_CONVERTERS.get(converter, {}).get(type_code, converter)
+
+    def row_converter(self, keys, types=()):
+        """row -> dict for one result shape, used when rows arrive one at a time"""
+        keys, plan = self.plan(keys, types)
+        if not plan:
+            return lambda row: dict(zip(keys, row))
+
+        def convert(row):
+            row_dict = dict(zip(keys, row))
+            for index, converter in plan:
+                row_dict[keys[index]] = converter(row[index])
+            return row_dict
+        return convert
+
+    def for_result(self, result):
+        return self.row_converter(result.keys(), column_types(result))
+
+    def serialize(self, keys, rows, types=()):
+        """Convert a fetched batch column by column, then zip the columns back into dicts"""
+        keys, plan = self.plan(keys, types)
+        if not rows:
+            return []
+        if not plan:
+            return [dict(zip(keys, row)) for row in rows]
+        columns = list(zip(*rows))
+        for index, converter in plan:
+            columns[index] = map(converter, columns[index])
+        return [dict(zip(keys, values)) for values in zip(*columns)]
+
+    def fetch_all(self, result):
+        # Read the types first: fetching everything soft-closes the cursor
+        types = column_types(result)
+        return self.serialize(result.keys(), result.fetchall(), types)
+
+
+PLAIN_ROWS = RowSerializer()
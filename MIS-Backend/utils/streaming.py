@@ -0,0 +1,48 @@
+from flask import current_app, request, stream_with_context
+from utils.serializers import PLAIN_ROWS
+
+STREAM_CHUNK_SIZE = 500
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def stream_format():
+    """'ndjson', 'json' or None when the client asked for a regular response.
+
+    Opt in with ?stream=1 (JSON array), ?stream=ndjson or an Accept: application/x-ndjson header.
+    """
+    stream = request.args.get('stream', '').lower()
+    if stream == 'ndjson' or NDJSON_MIMETYPE in request.headers.get('Accept', ''):
+        return 'ndjson'
+    if stream in ('1', 'true', 'json'):
+        return 'json'
+    return None
+
+def iter_rows(result, chunk_size=STREAM_CHUNK_SIZE):
+    """Walk a result set a chunk at a time instead of materializing it with fetchall()"""
+    try:
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        result.close()
+
+def stream_rows(result, serializer=PLAIN_ROWS, fmt='json', chunk_size=STREAM_CHUNK_SIZE):
+    """Stream a result set as a JSON array or NDJSON, encoding one row at a time"""
+    dumps = current_app.json.dumps
+    convert = serializer.for_result(result)
+
+    def generate_json():
+        yield '['
+        for index, row in enumerate(iter_rows(result, chunk_size)):
+            yield (',' if index else '') + dumps(convert(row))
+        yield ']'
+
+    def generate_ndjson():
+        for row in iter_rows(result, chunk_size):
+            yield dumps(convert(row)) + '\n'
+
+    if fmt == 'ndjson':
+        return current_app.response_class(stream_with_context(generate_ndjson()), mimetype=NDJSON_MIMETYPE)
+    return current_app.response_class(stream_with_context(generate_json()), mimetype='application/json')